@@ -0,0 +1,326 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+import psutil
+
+# default weights, relative to the notebooks folder like in choose_model
+WEIGHTS = os.path.join('..', 'models', 'yolov8n.pt')
+
+# benchmark groups that can be selected with only=...
+GROUPS = ('capture', 'split', 'inference')
+
+
+class PeakMemory:
+    """Samples the resident memory of the process on a background thread and keeps the peak (in MB)."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, self._process.memory_info().rss / 2**20)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, self._process.memory_info().rss / 2**20)
+
+
+def percentiles(latencies: list) -> dict:
+    """Returns p50, p90 and p99 of latencies in seconds as milliseconds."""
+    p50, p90, p99 = np.percentile(np.array(latencies) * 1000, [50, 90, 99]) if latencies else (0, 0, 0)
+    return {'p50_ms': round(float(p50), 2), 'p90_ms': round(float(p90), 2), 'p99_ms': round(float(p99), 2)}
+
+
+def make_video(path: str, frames: int = 300, width: int = 640, height: int = 480, fps: float = 30) -> str:
+    """
+    Writes a synthetic video with moving objects on a noisy background, used as stand-in for a camera.
+
+    Args:
+        path (str): Path of the .mp4 file.
+        frames (int): Number of frames. Defaults to 300.
+        width (int): Frame width. Defaults to 640.
+        height (int): Frame height. Defaults to 480.
+        fps (float): Frame rate. Defaults to 30.
+
+    Returns:
+        path (str): Path of the video.
+    """
+    rng = np.random.default_rng(0)
+    background = cv2.resize(rng.integers(60, 200, (height // 8, width // 8, 3), dtype=np.uint8), (width, height))
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for i in range(frames):
+        frame = background.copy()
+        x = int((i * 4) % (width - 120))
+        cv2.rectangle(frame, (x, 100), (x + 120, 220), (40, 40, 200), -1)
+        cv2.circle(frame, (width - 80 - x // 2, height - 120), 50, (200, 160, 40), -1)
+        frame = cv2.add(frame, rng.integers(0, 12, frame.shape, dtype=np.uint8)) # sensor noise
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def make_detect_dataset(path: str, images: int = 500, imgsz: int = 640, classes: int = 3) -> str:
+    """
+    Generates an object detection dataset ('images', 'labels', 'classes.txt') with random boxes.
+
+    Args:
+        path (str): Dataset directory.
+        images (int): Number of images. Defaults to 500.
+        imgsz (int): Image size. Defaults to 640.
+        classes (int): Number of classes. Defaults to 3.
+
+    Returns:
+        path (str): Dataset directory.
+    """
+    rng = np.random.default_rng(0)
+    os.makedirs(os.path.join(path, 'images'), exist_ok=True)
+    os.makedirs(os.path.join(path, 'labels'), exist_ok=True)
+    with open(os.path.join(path, 'classes.txt'), 'w') as file:
+        file.write('\n'.join(f'class{c}' for c in range(classes)) + '\n')
+    for i in range(images):
+        img = cv2.resize(rng.integers(0, 255, (imgsz // 16, imgsz // 16, 3), dtype=np.uint8), (imgsz, imgsz))
+        rows = []
+        for _ in range(rng.integers(1, 5)):
+            w, h = rng.uniform(0.05, 0.4, 2)
+            cx, cy = rng.uniform(w / 2, 1 - w / 2), rng.uniform(h / 2, 1 - h / 2)
+            c = int(rng.integers(classes))
+            cv2.rectangle(img, (int((cx - w / 2) * imgsz), int((cy - h / 2) * imgsz)),
+                          (int((cx + w / 2) * imgsz), int((cy + h / 2) * imgsz)), (80 * c, 255 - 80 * c, 128), -1)
+            rows.append(f'{c} {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}')
+        cv2.imwrite(os.path.join(path, 'images', f'img_{i:05d}.jpg'), img)
+        with open(os.path.join(path, 'labels', f'img_{i:05d}.txt'), 'w') as file:
+            file.write('\n'.join(rows) + '\n')
+    return path
+
+
+def make_cls_dataset(path: str, images: int = 500, imgsz: int = 224, classes: int = 3) -> str:
+    """Generates a classification dataset (<class>_<n>.jpg, class from the filename prefix) with random images."""
+    rng = np.random.default_rng(0)
+    os.makedirs(path, exist_ok=True)
+    for i in range(images):
+        c = i % classes
+        img = np.full((imgsz, imgsz, 3), 60 * c, dtype=np.uint8)
+        img = cv2.add(img, rng.integers(0, 60, img.shape, dtype=np.uint8))
+        cv2.imwrite(os.path.join(path, f'class{c}_{i:05d}.jpg'), img)
+    return path
+
+
+def _timed(function, *args, **kwargs) -> dict:
+    """Runs a function and returns its elapsed seconds and the peak memory."""
+    with PeakMemory() as memory:
+        start = time.perf_counter()
+        function(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+    return {'seconds': round(elapsed, 4), 'peak_memory_mb': round(memory.peak_mb, 1)}
+
+
+def bench_capture(workdir: str, video: str, images: int) -> dict:
+    """capture_images with the synthetic video as camera, without delay."""
+    import device_helpers
+    from image_helpers import capture_images
+
+    cache_path = device_helpers.CACHE_PATH
+    device_helpers.CACHE_PATH = os.path.join(workdir, 'device.json') # keep the video out of the camera cache
+    try:
+        result = _timed(capture_images, images, 'bench', os.path.join(workdir, 'capture'), device=video, delay=0)
+    finally:
+        device_helpers.CACHE_PATH = cache_path
+    result['images_per_sec'] = round(images / result['seconds'], 1)
+    return result
+
+
+def bench_split(workdir: str, images: int) -> dict:
+    """prepare_folder_structure on generated datasets, per mode (dataset generation is not measured)."""
+    from file_handlers import prepare_folder_structure
+
+    results = dict()
+    for mode in ('move', 'manifest', 'link'):
+        path = make_detect_dataset(os.path.join(workdir, f'split_{mode}'), images, imgsz=320)
+        results[f'detect_{mode}'] = _timed(prepare_folder_structure, path, 'DETECT', val_size=0.2, mode=mode)
+    path = make_cls_dataset(os.path.join(workdir, 'split_cls'), images, imgsz=96)
+    results['cls_move'] = _timed(prepare_folder_structure, path, 'CLS', val_size=0.2, test_size=0.5)
+    for r in results.values():
+        r['files_per_sec'] = round(images / r['seconds'], 1)
+    return results
+
+
+def bench_inference(video: str, weights: str, imgsz: int = None) -> dict:
+    """Per-frame latency of the model on the synthetic video and the batched headless throughput."""
+    if not os.path.exists(weights):
+        raise FileNotFoundError(f'{weights} does not exist (the benchmark does not download weights).')
+    from model_helpers import get_model, inference_video
+
+    results = dict()
+    with PeakMemory() as memory:
+        model = get_model(weights)
+        kwargs = {'verbose': False} if imgsz is None else {'verbose': False, 'imgsz': imgsz}
+        cap = cv2.VideoCapture(video)
+        latencies, start = [], time.perf_counter()
+        while True:
+            success, frame = cap.read()
+            if not success:
+                break
+            t0 = time.perf_counter()
+            model(frame, **kwargs)
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+        cap.release()
+    results['frame'] = dict(fps=round(len(latencies) / elapsed, 1), **percentiles(latencies),
+                            peak_memory_mb=round(memory.peak_mb, 1))
+
+    with PeakMemory() as memory:
+        summary = inference_video(video, model, verbose=False, headless=True)
+    results['video_headless'] = {'fps': summary['fps'], 'seconds': summary['seconds'],
+                                 'peak_memory_mb': round(memory.peak_mb, 1)}
+    return results
+
+
+def run_benchmarks(out_path: str = None,
+                   weights: str = WEIGHTS,
+                   images: int = 500,
+                   frames: int = 300,
+                   imgsz: int = None,
+                   only: tuple = GROUPS,
+                   workdir: str = None) -> dict:
+    """
+    Runs the benchmark suite without camera or network. A synthetic video stands in for the camera and
+    datasets are generated in a temporary folder.
+
+    Args:
+        out_path (str): If given, the results are saved to this JSON file. Defaults to None.
+        weights (str): Local model weights. Defaults to WEIGHTS (../models/yolov8n.pt).
+        images (int): Number of images of the generated datasets and of captured images. Defaults to 500.
+        frames (int): Number of frames of the synthetic video. Defaults to 300.
+        imgsz (int): Inference size. Defaults to None (model default).
+        only (tuple): Benchmark groups to run, see GROUPS. Defaults to all.
+        workdir (str): Folder for generated data, removed afterwards. Defaults to None (temporary folder).
+
+    Returns:
+        results (dict): 'meta' (machine and settings) and 'benchmarks' (group -> metrics). A group that
+            failed holds its 'error' instead of metrics.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix='cv_benchmark_')
+    os.makedirs(workdir, exist_ok=True)
+    results = {'meta': {'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                        'platform': platform.platform(),
+                        'python': platform.python_version(),
+                        'opencv': cv2.__version__,
+                        'cpus': os.cpu_count(),
+                        'images': images,
+                        'frames': frames,
+                        'imgsz': imgsz,
+                        'weights': weights},
+               'benchmarks': dict()}
+    try:
+        video = make_video(os.path.join(workdir, 'camera.mp4'), frames)
+        runs = {'capture': lambda: bench_capture(workdir, video, min(images, frames)),
+                'split': lambda: bench_split(workdir, images),
+                'inference': lambda: bench_inference(video, weights, imgsz)}
+        for group in only:
+            print(f'Running benchmark {group} ...')
+            try:
+                results['benchmarks'][group] = runs[group]()
+            except Exception as e:
+                print(f'Benchmark {group} failed: {e}')
+                results['benchmarks'][group] = {'error': str(e)}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if out_path:
+        with open(out_path, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f'Results saved to {out_path}')
+    return results
+
+
+def _flatten(benchmarks: dict, prefix: str = '') -> dict:
+    flat = dict()
+    for key, value in benchmarks.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{prefix}{key}.'))
+        elif isinstance(value, (int, float)):
+            flat[prefix + key] = value
+    return flat
+
+
+def higher_is_better(metric: str) -> bool:
+    """Throughput metrics (fps, .../sec) should rise, times and memory should fall."""
+    return metric.endswith('fps') or metric.endswith('per_sec')
+
+
+def compare_results(current: dict, baseline: dict, threshold: float = 0.1) -> list:
+    """
+    Compares two benchmark results metric by metric.
+
+    Args:
+        current (dict): Results of run_benchmarks.
+        baseline (dict): Earlier results (e.g. loaded from JSON).
+        threshold (float): Relative change that counts as regression. Defaults to 0.1 (10 %).
+
+    Returns:
+        rows (list): (metric, baseline, current, relative change, regression) per metric present in both;
+            the relative change is positive if the metric got better.
+    """
+    now, before = _flatten(current['benchmarks']), _flatten(baseline['benchmarks'])
+    rows = []
+    for metric in sorted(set(now) & set(before)):
+        if before[metric] == 0:
+            continue
+        change = (now[metric] - before[metric]) / abs(before[metric])
+        if not higher_is_better(metric):
+            change = -change
+        rows.append((metric, before[metric], now[metric], round(change, 3), change < -threshold))
+    return rows
+
+
+def print_comparison(rows: list) -> None:
+    """Prints the table of compare_results."""
+    for metric, before, now, change, regression in rows:
+        flag = 'REGRESSION' if regression else ''
+        print(f'{metric:45s} {before:12.2f} -> {now:12.2f} {change:+8.1%} {flag}')
+    print(f'{sum(r[4] for r in rows)} regressions in {len(rows)} metrics.')
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks capturing, dataset preparation and inference.')
+    parser.add_argument('--out', help='JSON file for the results')
+    parser.add_argument('--compare', help='JSON file of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative change counted as regression')
+    parser.add_argument('--weights', default=WEIGHTS, help='local model weights')
+    parser.add_argument('--images', type=int, default=500, help='images per generated dataset')
+    parser.add_argument('--frames', type=int, default=300, help='frames of the synthetic video')
+    parser.add_argument('--imgsz', type=int, default=None, help='inference size')
+    parser.add_argument('--only', nargs='+', choices=GROUPS, default=list(GROUPS), help='benchmark groups')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.out, args.weights, args.images, args.frames, args.imgsz, tuple(args.only))
+    print(json.dumps(results['benchmarks'], indent=2))
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            rows = compare_results(results, json.load(file), args.threshold)
+        print_comparison(rows)
+        return 1 if any(r[4] for r in rows) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
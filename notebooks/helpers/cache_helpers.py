@@ -0,0 +1,254 @@
+import contextlib
+import hashlib
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import yaml
+
+from config import IMAGE_EXTENSIONS
+
+# folder in the dataset directory that holds the caches
+CACHE_DIR = 'cache'
+
+
+def subset_images(path: str, entry: str) -> list:
+    """
+    Resolves a 'train'/'val'/'test' entry of config.yaml to image paths.
+
+    Args:
+        path (str): Dataset directory (config.yaml lies in it).
+        entry (str): Folder or manifest file, relative to path.
+
+    Returns:
+        images (list): Sorted absolute image paths.
+    """
+    target = os.path.join(path, entry)
+    if os.path.isfile(target):
+        with open(target, 'r') as file:
+            lines = [l.strip() for l in file if l.strip()]
+        return sorted(os.path.abspath(os.path.join(path, l)) for l in lines)
+    images = []
+    for root, _, names in os.walk(target):
+        images += [os.path.abspath(os.path.join(root, n)) for n in names if n.lower().endswith(IMAGE_EXTENSIONS)]
+    return sorted(images)
+
+
+def _label_path(image: str) -> str:
+    """YOLO convention: .../images/... -> .../labels/....txt"""
+    sep = os.sep
+    a, b = f'{sep}images{sep}', f'{sep}labels{sep}'
+    return b.join(image.rsplit(a, 1)).rsplit('.', 1)[0] + '.txt'
+
+
+def _read_labels(image: str, task: str, names: list) -> np.ndarray:
+    """Returns the labels of an image: (n, 5) boxes for detection, the class index for classification."""
+    if task == 'CLS':
+        return np.array([[names.index(os.path.basename(os.path.dirname(image)))]], dtype=np.float32)
+    label = _label_path(image)
+    if not os.path.exists(label):
+        return np.zeros((0, 5), dtype=np.float32)
+    with open(label, 'r') as file:
+        rows = [l.split() for l in file if len(l.split()) == 5]
+    return np.array(rows, dtype=np.float32).reshape(-1, 5)
+
+
+def fingerprint(images: list, imgsz: int) -> str:
+    """Hash over path, size and mtime of all source images (and their labels) and the image size."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(imgsz).encode())
+    for image in images:
+        for p in (image, _label_path(image)):
+            try:
+                st = os.stat(p)
+                h.update(f'{p}|{st.st_size}|{st.st_mtime_ns}'.encode())
+            except OSError:
+                h.update(f'{p}|-'.encode())
+    return h.hexdigest()
+
+
+def resize_image(im: np.ndarray, imgsz: int) -> np.ndarray:
+    """Resizes the long side to imgsz while keeping the aspect ratio (like ultralytics in rect mode)."""
+    h0, w0 = im.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r != 1:
+        w, h = min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz)
+        im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+    return im
+
+
+def _cache_files(path: str, subset: str, imgsz: int):
+    base = os.path.join(path, CACHE_DIR, f'{subset}_{imgsz}')
+    return base + '.bin', base + '.json'
+
+
+def build_cache(path: str,
+                imgsz: int = 640,
+                task: str = 'DETECT',
+                workers: int = 8,
+                force: bool = False) -> dict:
+    """
+    Decodes and resizes all images of the subsets in config.yaml once and stores them in one memory-mapped
+    file per subset (cache/<subset>_<imgsz>.bin) with an index of offsets, shapes and labels
+    (cache/<subset>_<imgsz>.json). A cache is rebuilt only if source images or labels changed.
+
+    Args:
+        path (str): Dataset directory with config.yaml (see create_config).
+        imgsz (int): Training image size. Defaults to 640.
+        task (str): Either 'CLS' for classification or 'DETECT' for object detection. Defaults to 'DETECT'.
+        workers (int): Number of threads decoding images. Defaults to 8.
+        force (bool): If True, caches are rebuilt even if they are up to date. Defaults to False.
+
+    Returns:
+        caches (dict): Subset -> path of the cache index.
+
+    Raises:
+        FileNotFoundError: If config.yaml does not exist.
+    """
+    config = os.path.join(path, 'config.yaml')
+    if not os.path.exists(config):
+        raise FileNotFoundError(f'{config} does not exist, run create_config first.')
+    with open(config, 'r') as file:
+        data = yaml.safe_load(file)
+    names = data['names'] if isinstance(data['names'], list) else [data['names'][i] for i in sorted(data['names'])]
+    os.makedirs(os.path.join(path, CACHE_DIR), exist_ok=True)
+
+    caches = dict()
+    for subset in ('train', 'val', 'test'):
+        if subset not in data:
+            continue
+        images = subset_images(path, data[subset])
+        bin_path, index_path = _cache_files(path, subset, imgsz)
+        caches[subset] = index_path
+        fp = fingerprint(images, imgsz)
+        if not force and os.path.exists(index_path) and load_cache_index(index_path).get('fingerprint') == fp:
+            print(f'Cache for {subset} is up to date.')
+            continue
+
+        def decode(image):
+            im = cv2.imread(image)
+            if im is None:
+                return image, None, None
+            return image, im.shape[:2], resize_image(im, imgsz)
+
+        # decode in parallel and append the resized images to one file, chunk by chunk to bound memory
+        entries, offset = [], 0
+        with open(bin_path + '.tmp', 'wb') as out, ThreadPoolExecutor(max_workers=workers) as pool:
+            for start in range(0, len(images), 16 * workers):
+                for image, hw0, im in pool.map(decode, images[start:start + 16 * workers]):
+                    if im is None:
+                        print(f'Skipping unreadable image {image}')
+                        continue
+                    out.write(im.tobytes())
+                    entries.append({'file': image, 'offset': offset, 'shape': list(im.shape), 'hw0': list(hw0),
+                                    'labels': _read_labels(image, task, names).tolist()})
+                    offset += im.nbytes
+        os.replace(bin_path + '.tmp', bin_path)
+        with open(index_path, 'w') as file:
+            json.dump({'fingerprint': fp, 'imgsz': imgsz, 'task': task, 'sources': images, 'entries': entries}, file)
+        print(f'Cached {len(entries)} {subset} images ({offset / 2**20:.0f} MB) under {bin_path}')
+    return caches
+
+
+def load_cache_index(index_path: str) -> dict:
+    with open(index_path, 'r') as file:
+        return json.load(file)
+
+
+class CachedDataset:
+    """
+    Reads images and labels from a cache of build_cache. Images are returned as read-only views into the
+    memory-mapped file (zero-copy); copy them before modifying.
+
+    Args:
+        path (str): Dataset directory.
+        subset (str): 'train', 'val' or 'test'.
+        imgsz (int): Image size the cache was built with. Defaults to 640.
+        check (bool): If True, raises if the source files changed since the cache was built. Defaults to True.
+
+    Raises:
+        FileNotFoundError: If the cache does not exist.
+        RuntimeError: If check is True and the cache is outdated.
+    """
+
+    def __init__(self, path: str, subset: str, imgsz: int = 640, check: bool = True):
+        bin_path, index_path = _cache_files(path, subset, imgsz)
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f'No cache for {subset} with imgsz {imgsz}, run build_cache first.')
+        index = load_cache_index(index_path)
+        self.entries = index['entries']
+        if check and fingerprint(index['sources'], imgsz) != index['fingerprint']:
+            raise RuntimeError(f'The cache for {subset} is outdated, run build_cache again.')
+        self.files = {e['file']: i for i, e in enumerate(self.entries)}
+        self._store = np.memmap(bin_path, dtype=np.uint8, mode='r') if os.path.getsize(bin_path) else np.zeros(0, np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def image(self, i: int) -> np.ndarray:
+        e = self.entries[i]
+        n = int(np.prod(e['shape']))
+        return self._store[e['offset']:e['offset'] + n].reshape(e['shape'])
+
+    def __getitem__(self, i: int):
+        """Returns the image (read-only view) and its labels."""
+        return self.image(i), np.array(self.entries[i]['labels'], dtype=np.float32)
+
+
+@contextlib.contextmanager
+def training_cache(path: str, imgsz: int = 640, subsets: tuple = ('train', 'val')):
+    """
+    Lets ultralytics read detection training images from the caches of build_cache instead of decoding them,
+    for the duration of a with block; images that are not cached are decoded as usual:
+
+        with training_cache(PATH, imgsz=640):
+            model.train(data=DATA_PATH, imgsz=640, ...)
+
+    The image loading of ultralytics is replaced only inside the block and restored afterwards. Dataloader
+    workers see the replacement only if they are forked from this process; with the spawn start method
+    (Windows, macOS, sweep_helpers) the workers import ultralytics anew and decode the images as usual.
+
+    Args:
+        path (str): Dataset directory.
+        imgsz (int): Image size the caches were built with (must match the training imgsz). Defaults to 640.
+        subsets (tuple): Subsets whose caches are used. Defaults to ('train', 'val').
+
+    Yields:
+        cached (int): Number of images served from the caches.
+    """
+    from ultralytics.data.base import BaseDataset
+
+    lookup = dict()
+    for subset in subsets:
+        if os.path.exists(_cache_files(path, subset, imgsz)[1]):
+            cache = CachedDataset(path, subset, imgsz)
+            lookup.update({f: (cache, i) for f, i in cache.files.items()})
+
+    original = BaseDataset.load_image
+
+    def load_image(self, i, rect_mode=True):
+        hit = lookup.get(os.path.abspath(self.im_files[i]))
+        if hit is None or not rect_mode or self.imgsz != imgsz:
+            return original(self, i, rect_mode)
+        cache, j = hit
+        im = np.array(cache.image(j)) # copy, augmentations may change the image in place
+        hw0 = tuple(cache.entries[j]['hw0'])
+        # same buffer handling as BaseDataset.load_image (needed for mosaic augmentation)
+        if self.augment:
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = im, hw0, im.shape[:2]
+            self.buffer.append(i)
+            if len(self.buffer) >= self.max_buffer_length:
+                k = self.buffer.pop(0)
+                if self.cache != 'ram':
+                    self.ims[k], self.im_hw0[k], self.im_hw[k] = None, None, None
+        return im, hw0, im.shape[:2]
+
+    BaseDataset.load_image = load_image
+    print(f'Training reads {len(lookup)} images from the cache.')
+    try:
+        yield len(lookup)
+    finally:
+        BaseDataset.load_image = original
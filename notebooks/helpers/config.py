@@ -1,19 +1,28 @@
 import os
 import re
 
-def set_metadata(task: str):
+# project folder above notebooks/, data and models lie there independent of the working directory
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = os.path.join(PROJECT_DIR, 'data')
+MODELS_DIR = os.path.join(PROJECT_DIR, 'models')
+
+# image files that are captured, moved, split, indexed and cached (capture_images can write .webp)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp')
+
+def set_metadata(task: str, group: str = None):
     """
     Sets metadata for the group.
 
     Args:
         task (str): Specified task [CLS = classification, DETECT = object detection].
+        group (str): Group name. Defaults to None (asked for with input()).
         
     Return:
         group (str): Group name in lowercase and without special characters.
         path (str): Path to the working directory of the group.
 
     Raises:
-        None.
+        ValueError: If the given group name contains the underscore (_) character or is empty.
     """
 
     if task == 'CLS':
@@ -21,8 +30,13 @@ def set_metadata(task: str):
     if task == 'DETECT':
         task_dir = 'detection'
     special_chars = {ord('ä'):'ae', ord('ü'):'ue', ord('ö'):'oe', ord('ß'):'ss'}
-    group = str(input('Gruppenname: ')).lower().strip().translate(special_chars)
-    
+    if group is not None:
+        group = str(group).lower().strip().translate(special_chars)
+        if '_' in group or group == '':
+            raise ValueError(f'Group name {group!r} cannot contain the underscore (_) character or be empty.')
+    else:
+        group = str(input('Gruppenname: ')).lower().strip().translate(special_chars)
+
     while True:
         if '_' in group or group == '':
             print('Group name cannot contain the underscore (_) character or be empty.')
@@ -31,7 +45,7 @@ def set_metadata(task: str):
             break
     
     # Path für den Gruppenordner erstellen
-    path = os.path.join('..', 'data', task_dir, group)
+    path = os.path.join(DATA_DIR, task_dir, group)
     
     # Gruppenordner erstellen, falls er nicht existiert
     os.makedirs(path, exist_ok=True)
@@ -39,14 +53,22 @@ def set_metadata(task: str):
 
     return group, path
 
-def set_image_data(task: str, group_path: str, device: int = 0):
+def set_image_data(task: str,
+                   group_path: str,
+                   device: int = 0,
+                   name: str = None,
+                   num_imgs: int = None,
+                   delay: float = None):
     """
-    Sets metadata for image capturing.
+    Sets metadata for image capturing. Values that are not given are asked for with input().
 
     Args:
         task (str): Specified task [CLS = classification, DETECT = object detection].
         group_path (str): Path to the group's working directory.
         device (int): Specifies the image capturing device. Defaults to 0 (integrated camera).
+        name (str): Name of the class (only for classification). Defaults to None.
+        num_imgs (int): Number of images to be taken. Defaults to None.
+        delay (float): Time (in seconds) between two image captures. Defaults to None.
         
     Return:
         name (str): Name of the class (only for classification). Returns None with task detection.
@@ -60,7 +82,8 @@ def set_image_data(task: str, group_path: str, device: int = 0):
     special_chars = {ord('ä'):'ae', ord('ü'):'ue', ord('ö'):'oe', ord('ß'):'ss'}
 
     if task == 'CLS':
-        name = str(input('Class: ')+'_').lower().strip().translate(special_chars)
+        name = str(input('Class: ') if name is None else name).lower().strip().translate(special_chars)
+        name = name if name.endswith('_') else name + '_'
         
         # Unterordner für die Klasse im Gruppenordner erstellen
         class_dir = os.path.join(group_path, name)
@@ -70,7 +93,7 @@ def set_image_data(task: str, group_path: str, device: int = 0):
     if task == 'DETECT':
         name = None
 
-    num_imgs = int(input('Number of images: '))
-    delay = float(input('Delay: '))
+    num_imgs = int(input('Number of images: ') if num_imgs is None else num_imgs)
+    delay = float(input('Delay: ') if delay is None else delay)
     
     return name, num_imgs, delay, device
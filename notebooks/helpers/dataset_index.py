@@ -0,0 +1,218 @@
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from config import IMAGE_EXTENSIONS
+
+# index database, lies in the dataset folder
+INDEX_NAME = '.dataset_index.sqlite'
+
+# folders that are not indexed (link splits would only show up as duplicates)
+SKIP_DIRS = {'splits', 'runs'}
+
+
+def hash_bytes(data: bytes) -> str:
+    """Content hash used by the index."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _complete(data: bytes, extension: str) -> bool:
+    """Checks the end marker of PNG and JPEG files, which is missing in truncated files."""
+    if extension == '.png':
+        return data.rstrip(b'\x00')[-8:-4] == b'IEND'
+    if extension in ('.jpg', '.jpeg'):
+        return data.rstrip(b'\x00')[-2:] == b'\xff\xd9'
+    return True
+
+
+def probe_file(path: str) -> dict:
+    """
+    Reads a file once and returns its size, content hash, image dimensions and whether it can be decoded.
+
+    Args:
+        path (str): Path to the image.
+
+    Returns:
+        info (dict): 'size', 'hash', 'width', 'height' and 'ok'.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    info = {'size': len(data), 'hash': hash_bytes(data), 'width': 0, 'height': 0, 'ok': False}
+    # imdecode releases the GIL, so probing in threads runs in parallel
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if img is not None:
+        info['height'], info['width'] = img.shape[:2]
+        info['ok'] = _complete(data, os.path.splitext(path)[1].lower())
+    return info
+
+
+def _label_for(rel_path: str) -> str:
+    """Returns the YOLO label path belonging to an image path (images/... -> labels/....txt)."""
+    parts = rel_path.split(os.sep)
+    if 'images' not in parts:
+        return ''
+    parts[parts.index('images')] = 'labels'
+    return os.path.splitext(os.sep.join(parts))[0] + '.txt'
+
+
+class DatasetIndex:
+    """
+    Content-addressed index of the images of a dataset folder, stored as a small SQLite table
+    (path, mtime, size, hash, width, height, label, ok) next to the data.
+
+    Args:
+        path (str): Dataset directory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(os.path.join(path, INDEX_NAME), check_same_thread=False)
+        self._db.execute('CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime REAL, size INTEGER, '
+                         'hash TEXT, width INTEGER, height INTEGER, label TEXT, ok INTEGER)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS files_hash ON files (hash)')
+
+    def _scan(self) -> dict:
+        """Lists all images below the dataset folder with their mtime (relative path -> mtime)."""
+        found, stack = dict(), [self.path]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for e in entries:
+                    if e.is_dir():
+                        if not e.name.startswith('.') and e.name not in SKIP_DIRS:
+                            stack.append(e.path)
+                    elif e.name.lower().endswith(IMAGE_EXTENSIONS):
+                        found[os.path.relpath(e.path, self.path)] = e.stat().st_mtime
+        return found
+
+    def update(self, workers: int = 8) -> dict:
+        """
+        Brings the index up to date: new and modified files (by mtime) are probed in parallel,
+        removed files are dropped.
+
+        Args:
+            workers (int): Number of threads reading files. Defaults to 8.
+
+        Returns:
+            stats (dict): Number of 'indexed', 'probed', 'removed' and 'corrupt' files.
+        """
+        found = self._scan()
+        known = dict(self._db.execute('SELECT path, mtime FROM files'))
+        todo = [p for p, mtime in found.items() if known.get(p) != mtime]
+        removed = [p for p in known if p not in found]
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(lambda p: self._row(p, found[p]), todo))
+        with self._db:
+            self._db.executemany('DELETE FROM files WHERE path = ?', [(p,) for p in removed])
+            self._db.executemany('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        corrupt = self._db.execute('SELECT COUNT(*) FROM files WHERE ok = 0').fetchone()[0]
+        return {'indexed': len(found), 'probed': len(todo), 'removed': len(removed), 'corrupt': corrupt}
+
+    def _row(self, rel_path: str, mtime: float) -> tuple:
+        info = probe_file(os.path.join(self.path, rel_path))
+        label = _label_for(rel_path)
+        label = label if label and os.path.exists(os.path.join(self.path, label)) else ''
+        return (rel_path, mtime, info['size'], info['hash'], info['width'], info['height'], label, int(info['ok']))
+
+    def add(self, file_path: str) -> bool:
+        """
+        Indexes a single file right away, e.g. after copying it into the dataset.
+
+        Args:
+            file_path (str): Path of the file.
+
+        Returns:
+            added (bool): False if the file is not an image below the dataset folder.
+        """
+        rel_path = os.path.relpath(file_path, self.path)
+        if rel_path.startswith('..') or not rel_path.lower().endswith(IMAGE_EXTENSIONS):
+            return False
+        row = self._row(rel_path, os.stat(file_path).st_mtime)
+        with self._db:
+            self._db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)', row)
+        return True
+
+    def empty(self) -> bool:
+        """Returns True if no file has been indexed yet."""
+        return self._db.execute('SELECT 1 FROM files LIMIT 1').fetchone() is None
+
+    def lookup(self, content_hash: str) -> list:
+        """Returns the paths of all indexed files with the given content hash."""
+        return [r[0] for r in self._db.execute('SELECT path FROM files WHERE hash = ? ORDER BY path', (content_hash,))]
+
+    def corrupt(self) -> list:
+        """Returns the paths of all files that could not be decoded or are truncated."""
+        return [r[0] for r in self._db.execute('SELECT path FROM files WHERE ok = 0 ORDER BY path')]
+
+    def duplicates(self) -> list:
+        """Returns groups of paths with identical content."""
+        rows = self._db.execute('SELECT hash, path FROM files WHERE hash IN '
+                                '(SELECT hash FROM files GROUP BY hash HAVING COUNT(*) > 1) ORDER BY hash, path')
+        groups = dict()
+        for content_hash, path in rows:
+            groups.setdefault(content_hash, []).append(path)
+        return list(groups.values())
+
+    def rejects(self, candidates: list) -> dict:
+        """
+        Selects the candidates that should not enter a split: corrupt files and copies of files that are
+        already in the dataset (outside the candidates) or of an earlier candidate.
+
+        Args:
+            candidates (list): Paths relative to the dataset folder.
+
+        Returns:
+            rejects (dict): Path -> reason ('corrupt' or 'duplicate of <path>').
+        """
+        candidate_set = set(candidates)
+        rows = dict((r[0], (r[1], r[2])) for r in self._db.execute('SELECT path, hash, ok FROM files'))
+        owner = dict()
+        for path, (content_hash, _) in sorted(rows.items()):
+            if path not in candidate_set:
+                owner.setdefault(content_hash, path)
+
+        rejects = dict()
+        for path in sorted(candidates):
+            if path not in rows:
+                continue
+            content_hash, ok = rows[path]
+            if not ok:
+                rejects[path] = 'corrupt'
+            elif content_hash in owner:
+                rejects[path] = f'duplicate of {owner[content_hash]}'
+            else:
+                owner[content_hash] = path
+        return rejects
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def filter_candidates(path: str, candidates: list, workers: int = 8) -> set:
+    """
+    Updates the index of a dataset folder and returns the candidates that are corrupt or duplicates.
+
+    Args:
+        path (str): Dataset directory.
+        candidates (list): Image paths relative to the dataset folder.
+        workers (int): Number of threads reading files. Defaults to 8.
+
+    Returns:
+        rejected (set): Rejected candidate paths.
+    """
+    with DatasetIndex(path) as index:
+        index.update(workers)
+        rejects = index.rejects(candidates)
+    for rel_path, reason in rejects.items():
+        print(f'Skipping {rel_path}: {reason}')
+    return set(rejects)
@@ -0,0 +1,249 @@
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# columns of the records and their types
+COLUMNS = {
+    'stream': np.int16,
+    'frame': np.int64,
+    'time': np.float64,
+    'class': np.int16,
+    'confidence': np.float32,
+    'x1': np.float32,
+    'y1': np.float32,
+    'x2': np.float32,
+    'y2': np.float32,
+    'track': np.int32,
+}
+
+# track id of untracked detections
+NO_TRACK = -1
+
+META_NAME = 'meta.json'
+
+# frames read through capture() whose frame index and timestamp are remembered until they are recorded
+MAX_CAPTURED = 64
+
+
+def _boxes(result) -> np.ndarray:
+    """Returns the detections of one result as an (n, 7) array x1, y1, x2, y2, confidence, class, track id."""
+    boxes = result.boxes
+    if boxes is not None:
+        # tracked boxes carry the id as fifth column of data, so the columns are taken by name
+        data = np.empty((len(boxes.xyxy), 7))
+        data[:, :4] = boxes.xyxy.cpu().numpy()
+        data[:, 4] = boxes.conf.cpu().numpy()
+        data[:, 5] = boxes.cls.cpu().numpy()
+        data[:, 6] = boxes.id.cpu().numpy() if boxes.id is not None else NO_TRACK
+        return data
+    if result.probs is not None:
+        # classification: top-1 class without box
+        return np.array([[np.nan] * 4 + [float(result.probs.top1conf), int(result.probs.top1), NO_TRACK]])
+    return np.zeros((0, 7))
+
+
+class DetectionRecorder:
+    """
+    Writes detections as compact columnar records instead of rendered frames. Rows are collected in memory
+    and written as one .npz file per chunk (chunk_00000.npz, ...) with one array per column (see COLUMNS),
+    so recording is append-only and a crash loses at most the current chunk.
+
+    The recorder is an output sink: call it with (name, frame_id, result), e.g. as output of
+    stream_helpers.run_streams, or wrap a model with record(). Frames read through capture(cap) are recorded
+    with the frame index and timestamp of the source.
+
+    Args:
+        path (str): Directory of the records, created if needed. Existing chunks are continued.
+        chunk_size (int): Number of rows per chunk file. Defaults to 65536.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 65536):
+        self.path = path
+        self.chunk_size = chunk_size
+        os.makedirs(path, exist_ok=True)
+        meta = load_meta(path)
+        self.streams = meta.get('streams', [])
+        self.names = meta.get('names', {})
+        self.frames = meta.get('frames', 0)
+        self.rows = meta.get('rows', 0)
+        self._chunk = meta.get('chunks', 0)
+        self._parts = []
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._captured = OrderedDict() # id(frame) -> (frame index, timestamp)
+
+    def __call__(self, name: str, frame_id: int, result, timestamp: float = None) -> None:
+        """Records the detections of one frame (timestamp defaults to the current time)."""
+        timestamp = time.time() if timestamp is None else timestamp
+        boxes = _boxes(result)
+        n = len(boxes)
+        with self._lock:
+            if name not in self.streams:
+                self.streams.append(name)
+            if not self.names:
+                self.names = {str(k): v for k, v in result.names.items()}
+            self.frames += 1
+            if not n:
+                return
+            part = np.empty((n, len(COLUMNS)))
+            part[:, 0] = self.streams.index(name)
+            part[:, 1] = frame_id
+            part[:, 2] = timestamp
+            part[:, 3] = boxes[:, 5]
+            part[:, 4] = boxes[:, 4]
+            part[:, 5:9] = boxes[:, :4]
+            part[:, 9] = boxes[:, 6]
+            self._parts.append(part)
+            self._pending += n
+            if self._pending >= self.chunk_size:
+                self._flush()
+
+    def capture(self, cap, live: bool = True):
+        """
+        Wraps a capturing device so that the frame index and timestamp of every read frame are known when
+        the frame is recorded, also if frames are skipped or dropped between reading and predicting.
+
+        Args:
+            cap (cv2.VideoCapture): Capturing device or video file.
+            live (bool): If True, frames are stamped with the time they were read, otherwise with their
+                position in the video (CAP_PROP_POS_MSEC). Defaults to True.
+
+        Returns:
+            cap: Capture with the same interface.
+        """
+        return _RecordedCapture(cap, self, live)
+
+    def _remember(self, frame, frame_id: int, timestamp: float) -> None:
+        with self._lock:
+            self._captured[id(frame)] = (frame_id, timestamp)
+            if len(self._captured) > MAX_CAPTURED:
+                self._captured.popitem(last=False)
+
+    def record(self, predict, name: str = 'stream'):
+        """
+        Wraps a model (or AdaptiveInference) so that every prediction is recorded.
+
+        Args:
+            predict: Callable predict(frame, verbose=...) returning a list of results.
+            name (str): Name of the stream. Defaults to 'stream'.
+
+        Returns:
+            predict: Callable with the same signature. Frames read through capture() keep their source frame
+                index and timestamp, other frames are numbered in the order they are predicted.
+        """
+        counter = itertools.count()
+
+        def recorded(frame, verbose=False, **kwargs):
+            results = predict(frame, verbose=verbose, **kwargs)
+            with self._lock:
+                captured = self._captured.pop(id(frame), None)
+            frame_id, timestamp = captured if captured is not None else (next(counter), None)
+            self(name, frame_id, results[0], timestamp)
+            return results
+
+        return recorded
+
+    def _flush(self) -> None:
+        if self._parts:
+            rows = np.concatenate(self._parts)
+            columns = {c: rows[:, i].astype(t) for i, (c, t) in enumerate(COLUMNS.items())}
+            target = os.path.join(self.path, f'chunk_{self._chunk:05d}.npz')
+            with open(target + '.tmp', 'wb') as file:
+                np.savez(file, **columns)
+            os.replace(target + '.tmp', target)
+            self._chunk += 1
+            self.rows += len(rows)
+            self._parts, self._pending = [], 0
+        meta = {'columns': list(COLUMNS), 'streams': self.streams, 'names': self.names,
+                'frames': self.frames, 'rows': self.rows, 'chunks': self._chunk}
+        with open(os.path.join(self.path, META_NAME + '.tmp'), 'w') as file:
+            json.dump(meta, file)
+        os.replace(os.path.join(self.path, META_NAME + '.tmp'), os.path.join(self.path, META_NAME))
+
+    def close(self) -> dict:
+        """
+        Writes the remaining rows.
+
+        Returns:
+            stats (dict): Number of recorded 'frames', detection 'rows' and 'chunks'.
+        """
+        with self._lock:
+            self._flush()
+        return {'frames': self.frames, 'rows': self.rows, 'chunks': self._chunk}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _RecordedCapture:
+    """Capture that reports the frame index and timestamp of every read frame to a DetectionRecorder."""
+
+    def __init__(self, cap, recorder: DetectionRecorder, live: bool):
+        self.cap = cap
+        self.recorder = recorder
+        self.live = live
+        self.reads = 0
+
+    def read(self):
+        read_at = time.time()
+        success, frame = self.cap.read()
+        if success and frame is not None:
+            # after reading, the position points to the next frame
+            position = self.cap.get(cv2.CAP_PROP_POS_FRAMES)
+            frame_id = int(position) - 1 if position > 0 else self.reads
+            timestamp = read_at if self.live else self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            self.recorder._remember(frame, frame_id, timestamp)
+            self.reads += 1
+        return success, frame
+
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+
+def load_meta(path: str) -> dict:
+    """Loads the metadata of a records directory, empty if there is none yet."""
+    meta = os.path.join(path, META_NAME)
+    if not os.path.exists(meta):
+        return {}
+    with open(meta, 'r') as file:
+        return json.load(file)
+
+
+def load_detections(path: str, stream: str = None) -> dict:
+    """
+    Loads the records of a DetectionRecorder.
+
+    Args:
+        path (str): Directory of the records.
+        stream (str): Only return the rows of this stream. Defaults to None (all streams).
+
+    Returns:
+        columns (dict): Column name -> array, see COLUMNS. Stream and class names are in load_meta(path),
+            'track' is NO_TRACK (-1) for untracked detections.
+
+    Raises:
+        FileNotFoundError: If the directory holds no records.
+    """
+    meta = load_meta(path)
+    if not meta:
+        raise FileNotFoundError(f'No detection records found in {path}.')
+    parts = dict((c, []) for c in COLUMNS)
+    for i in range(meta['chunks']):
+        with np.load(os.path.join(path, f'chunk_{i:05d}.npz')) as chunk:
+            for c, t in COLUMNS.items():
+                # records written before a column existed get a default (no track id)
+                parts[c].append(chunk[c] if c in chunk else np.full(len(chunk['frame']), NO_TRACK, t))
+    columns = {c: np.concatenate(parts[c]) if parts[c] else np.zeros(0, t) for c, t in COLUMNS.items()}
+    if stream is not None:
+        mask = columns['stream'] == meta['streams'].index(stream)
+        columns = {c: v[mask] for c, v in columns.items()}
+    return columns
@@ -0,0 +1,219 @@
+import glob
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+
+import cv2
+
+# file in which the last working device is remembered
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'computervision', 'device.json')
+
+BACKENDS = {
+    'any': cv2.CAP_ANY,
+    'v4l2': cv2.CAP_V4L2,
+    'dshow': cv2.CAP_DSHOW,
+    'msmf': cv2.CAP_MSMF,
+}
+
+
+def list_devices(max_index: int = 10) -> list:
+    """
+    Lists candidate capturing devices without opening them.
+
+    On Linux the /dev/video* nodes are enumerated directly, elsewhere the indices 0..max_index are returned.
+
+    Args:
+        max_index (int): Highest index tried if devices cannot be enumerated. Defaults to 10.
+
+    Returns:
+        devices (list): Sorted device indices.
+    """
+    if sys.platform.startswith('linux'):
+        nodes = glob.glob('/dev/video*')
+        return sorted(int(m.group(1)) for m in (re.search(r'video(\d+)$', n) for n in nodes) if m)
+    return list(range(max_index + 1))
+
+
+def _configure(cap, width: int = None, height: int = None, fps: float = None) -> None:
+    if width:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    if height:
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if fps:
+        cap.set(cv2.CAP_PROP_FPS, fps)
+
+
+def open_device(device,
+                backend: str = 'any',
+                width: int = None,
+                height: int = None,
+                fps: float = None):
+    """
+    Opens a capturing device and applies resolution and FPS.
+
+    Args:
+        device (int | str): Device index, device path or video file (used as stand-in for a camera).
+        backend (str): Capture backend: 'any', 'v4l2', 'dshow' or 'msmf'. Defaults to 'any'.
+        width (int): Requested frame width. Defaults to None (device default).
+        height (int): Requested frame height. Defaults to None (device default).
+        fps (float): Requested frame rate. Defaults to None (device default).
+
+    Returns:
+        cap (cv2.VideoCapture): Capturing device, check cap.isOpened().
+    """
+    cap = cv2.VideoCapture(device, BACKENDS.get(backend, cv2.CAP_ANY))
+    if cap.isOpened():
+        _configure(cap, width, height, fps)
+    return cap
+
+
+def _open_probe(device, backend: str = 'any'):
+    """Opens a device and reads one frame. Returns the open capture, None if the device does not work."""
+    cap = open_device(device, backend)
+    if cap.isOpened() and cap.read()[0]:
+        if cap.get(cv2.CAP_PROP_FRAME_COUNT) > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0) # a video file starts again at its first frame
+        return cap
+    cap.release()
+    return None
+
+
+def probe_device(device, backend: str = 'any') -> bool:
+    """Checks whether a device can be opened and delivers a frame."""
+    cap = _open_probe(device, backend)
+    if cap is None:
+        return False
+    cap.release()
+    return True
+
+
+def _load_cached_device():
+    try:
+        with open(CACHE_PATH, 'r') as file:
+            return json.load(file).get('device')
+    except (OSError, ValueError):
+        return None
+
+
+def _save_cached_device(device) -> None:
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        with open(CACHE_PATH, 'w') as file:
+            json.dump({'device': device}, file)
+    except OSError:
+        pass
+
+
+def _release_unused(future, keep) -> None:
+    """Releases the capture of a finished probe unless it is the one that is kept."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    cap = future.result()
+    if cap is not None and cap is not keep:
+        cap.release()
+
+
+def _discover(device, backend: str, timeout: float, candidates: list):
+    """Probes the devices like discover_device and returns the working device with its open capture."""
+    candidates = list_devices() if candidates is None else candidates
+    preferred = [device]
+    cached = _load_cached_device()
+    if cached is not None and cached != device:
+        preferred.append(cached)
+    # indices without a /dev/video node cannot be opened, no need to wait for the driver
+    preferred_probes = [d for d in preferred
+                        if not (isinstance(d, int) and sys.platform.startswith('linux') and d not in candidates)]
+    others = [d for d in candidates if d not in preferred]
+    if not preferred_probes and not others:
+        return None, None
+
+    # probing is mostly waiting for the driver, so threads probe all devices at the same time;
+    # a hung device only costs the timeout
+    pool = ThreadPoolExecutor(max_workers=len(preferred_probes) + len(others))
+    deadline = time.monotonic() + timeout
+    preferred_futures = [(d, pool.submit(_open_probe, d, backend)) for d in preferred_probes]
+    futures = {pool.submit(_open_probe, d, backend): d for d in others}
+    found = cap = None
+    # the preferred devices win over the others if they answer in time
+    for d, future in preferred_futures:
+        try:
+            cap = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            continue
+        if cap is not None:
+            found = d
+            break
+    if found is None and futures:
+        try:
+            for future in as_completed(futures, timeout=max(0.0, deadline - time.monotonic())):
+                cap = future.result()
+                if cap is not None:
+                    found = futures[future]
+                    break
+        except TimeoutError:
+            pass
+    # the other devices are closed again, also those that answer after the timeout
+    for future in [f for _, f in preferred_futures] + list(futures):
+        future.add_done_callback(lambda f: _release_unused(f, cap))
+    pool.shutdown(wait=False, cancel_futures=True)
+    return found, cap
+
+
+def discover_device(device=0,
+                    backend: str = 'any',
+                    timeout: float = 3.0,
+                    candidates: list = None):
+    """
+    Finds a working capturing device: the requested one, then the cached one, then all others in parallel.
+
+    Args:
+        device (int | str): Preferred device. Defaults to 0.
+        backend (str): Capture backend, e.g. 'v4l2'. Defaults to 'any'.
+        timeout (float): Maximum time in seconds spent probing, including the preferred and cached device. Defaults to 3.
+        candidates (list): Devices to probe. Defaults to list_devices().
+
+    Returns:
+        device (int | str): Working device, None if no device was found.
+    """
+    found, cap = _discover(device, backend, timeout, candidates)
+    if cap is not None:
+        cap.release()
+    return found
+
+
+def find_device_port(device=0,
+                     backend: str = 'any',
+                     width: int = None,
+                     height: int = None,
+                     fps: float = None,
+                     timeout: float = 3.0,
+                     candidates: list = None):
+    """
+    Finds correct device port and connects to it. The last working device is cached, so the next start is instant.
+
+    Args:
+        device (int | str): Preferred device index, device path or video file. Defaults to 0.
+        backend (str): Capture backend: 'any', 'v4l2', 'dshow' or 'msmf'. Defaults to 'any'.
+        width (int): Requested frame width. Defaults to None.
+        height (int): Requested frame height. Defaults to None.
+        fps (float): Requested frame rate. Defaults to None.
+        timeout (float): Maximum time in seconds spent probing (see discover_device). Defaults to 3.
+        candidates (list): Devices to probe. Defaults to list_devices().
+
+    Returns:
+        cap (cv2.VideoCapture): Opened capturing device (not opened if no device was found).
+    """
+    print(f'Trying device {device}')
+    found, cap = _discover(device, backend, timeout, candidates)
+    if found is None:
+        print('Connection to camera could not be established.')
+        return cv2.VideoCapture()
+    if isinstance(found, int):
+        _save_cached_device(found)
+    print(f'Successful with device port: {found}')
+    # the capture of the probe is used directly, opening the device again costs time and may fail
+    _configure(cap, width, height, fps)
+    return cap
@@ -0,0 +1,179 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+
+import yaml
+from ultralytics import YOLO
+
+# preferred order of the CPU backends when backend='auto'
+CPU_BACKENDS = ['openvino', 'onnx']
+
+# runtime package required by each backend
+BACKEND_PACKAGES = {
+    'openvino': 'openvino',
+    'onnx': 'onnxruntime',
+}
+
+PRECISIONS = ['fp32', 'fp16', 'int8']
+
+# precisions each backend really produces on CPU; ultralytics ignores half for ONNX on CPU and has no
+# int8 ONNX export, int8 ONNX models are quantized with onnxruntime instead
+BACKEND_PRECISIONS = {
+    'openvino': ['fp32', 'fp16', 'int8'],
+    'onnx': ['fp32', 'int8'],
+}
+
+
+def available_backends() -> list:
+    """
+    Lists the CPU backends whose runtime is installed, in order of preference.
+
+    Returns:
+        backends (list): Available backends, always ending with 'pt' (plain PyTorch).
+    """
+    backends = [b for b in CPU_BACKENDS if importlib.util.find_spec(BACKEND_PACKAGES[b]) is not None]
+    return backends + ['pt']
+
+
+def export_path(weights: str, backend: str, precision: str = 'fp32') -> str:
+    """
+    Returns the path under which the export of a model is cached (next to the .pt file).
+
+    Args:
+        weights (str): Path to the .pt file.
+        backend (str): Either 'openvino' or 'onnx'.
+        precision (str): One of 'fp32', 'fp16' or 'int8'. Defaults to 'fp32'.
+
+    Returns:
+        path (str): Path to the cached export (a directory for OpenVINO, a file for ONNX).
+    """
+    stem = os.path.splitext(weights)[0]
+    suffix = '' if precision == 'fp32' else f'_{precision}'
+    if backend == 'openvino':
+        return f'{stem}{suffix}_openvino_model'
+    return f'{stem}{suffix}.onnx'
+
+
+def check_precision(backend: str, precision: str) -> None:
+    """
+    Checks that a backend exists and produces the precision on CPU.
+
+    Raises:
+        ValueError: If backend or precision are unknown or the backend cannot produce the precision on CPU
+            (see BACKEND_PRECISIONS).
+    """
+    if backend not in CPU_BACKENDS:
+        raise ValueError(f'Unknown backend {backend}. Choose one of {CPU_BACKENDS}.')
+    if precision not in PRECISIONS:
+        raise ValueError(f'Unknown precision {precision}. Choose one of {PRECISIONS}.')
+    if precision not in BACKEND_PRECISIONS[backend]:
+        raise ValueError(f'{backend} does not support {precision} on CPU. Choose one of {BACKEND_PRECISIONS[backend]}.')
+
+
+def export_model(weights: str,
+                 backend: str = 'openvino',
+                 precision: str = 'fp32',
+                 data: str = None) -> str:
+    """
+    Exports a YOLO model once to a CPU-optimized format and caches the export next to the .pt file.
+    The export is reused as long as it is newer than the .pt file.
+
+    Args:
+        weights (str): Path to the .pt file.
+        backend (str): Either 'openvino' or 'onnx'. Defaults to 'openvino'.
+        precision (str): One of 'fp32', 'fp16' or 'int8'. Defaults to 'fp32'.
+        data (str): Path to a config.yaml used to calibrate the int8 quantization. Defaults to None
+            (ultralytics default dataset).
+
+    Returns:
+        path (str): Path to the exported model.
+
+    Raises:
+        ValueError: See check_precision.
+    """
+    check_precision(backend, precision)
+    target = export_path(weights, backend, precision)
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(weights):
+        return target
+
+    if backend == 'onnx' and precision == 'int8':
+        return _quantize_onnx(export_model(weights, 'onnx', 'fp32'), target)
+
+    print(f'Exporting {weights} to {backend} ({precision}), this is only done once.')
+    kwargs = {'format': backend, 'half': precision == 'fp16', 'int8': precision == 'int8'}
+    if data is not None and precision == 'int8':
+        kwargs['data'] = data
+    # ultralytics writes every precision to the same name next to the weights, which would replace the cached
+    # fp32 export; export a copy of the weights in a temporary folder (on the same drive) and move the result
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(weights))) as tmp:
+        copy = os.path.join(tmp, os.path.basename(weights))
+        shutil.copy2(weights, copy)
+        exported = YOLO(copy).export(**kwargs)
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        elif os.path.exists(target):
+            os.remove(target)
+        shutil.move(exported, target)
+    print(f'Exported model saved at {target}')
+    return target
+
+
+def _quantize_onnx(source: str, target: str) -> str:
+    """Quantizes the weights of an fp32 ONNX model to int8 with onnxruntime."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    print(f'Quantizing {source} to int8, this is only done once.')
+    quantize_dynamic(source, target + '.tmp', weight_type=QuantType.QInt8)
+    os.replace(target + '.tmp', target)
+    print(f'Exported model saved at {target}')
+    return target
+
+
+def _exported_task(path: str):
+    """Reads the task from the metadata of an OpenVINO export, None if not available."""
+    metadata = os.path.join(path, 'metadata.yaml')
+    if os.path.isdir(path) and os.path.exists(metadata):
+        with open(metadata, 'r') as file:
+            return yaml.safe_load(file).get('task')
+    return None
+
+
+def load_model(weights: str,
+               backend: str = 'auto',
+               precision: str = 'fp32',
+               data: str = None):
+    """
+    Loads a YOLO model with the fastest available CPU backend, exporting it first if necessary.
+
+    Args:
+        weights (str): Path to the .pt file (pretrained or trained, e.g. from get_trained_model).
+        backend (str): 'auto' (fastest installed backend), 'openvino', 'onnx' or 'pt'. Defaults to 'auto'.
+        precision (str): One of 'fp32', 'fp16' or 'int8'. Defaults to 'fp32'.
+        data (str): Path to a config.yaml used to calibrate the int8 quantization. Defaults to None.
+
+    Returns:
+        model: Instance of YOLO-model object. Falls back to the PyTorch model if the backend is not installed
+            or the export fails.
+
+    Raises:
+        ValueError: If backend or precision are unknown or not supported together (see check_precision).
+    """
+    if backend == 'auto':
+        backend = available_backends()[0]
+    if backend == 'pt':
+        return YOLO(weights)
+    check_precision(backend, precision) # a wrong choice is an error, not a reason to fall back
+    if not os.path.exists(weights):
+        YOLO(weights) # ultralytics downloads missing pretrained weights to this path before they are exported
+
+    try:
+        path = export_model(weights, backend, precision, data)
+    except Exception as e:
+        print(f'Export to {backend} failed, using PyTorch model instead: {e}')
+        return YOLO(weights)
+
+    # exported models do not know their task from the file name
+    task = _exported_task(path) or YOLO(weights).task
+    print(f'Using {path}')
+    return YOLO(path, task=task)
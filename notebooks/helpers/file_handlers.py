@@ -1,8 +1,12 @@
-from sklearn.model_selection import train_test_split
 import os
-import shutil
 import yaml
 
+from split_helpers import (plan_detect_split, plan_cls_split, execute_plan, write_manifests, link_split,
+                           manifest_path, scan_files, split_ratios,
+                           load_split_index, save_split_index, assign_stratified, SPLITS_DIR, IMAGE_EXTENSIONS)
+from dataset_index import DatasetIndex, filter_candidates, hash_bytes
+from label_helpers import validate_labels
+
 def show_directory(path: str, 
                    show_files=False) -> None:
     import os
@@ -19,13 +23,21 @@ def show_directory(path: str,
 
 
 def move_file(source_path: str,
-              destination_path: str) -> None:
+              destination_path: str,
+              dataset_path: str = None,
+              link: bool = False) -> None:
     """
     Copy a file from source_path to destination_path, prepending a unique ID to the filename.
 
     Args:
         source_path (str): The path to the source file.
         destination_path (str): The path to the destination directory where the file will be copied.
+        dataset_path (str): Dataset directory with a content index (see dataset_index). If given, files whose
+            content is already in the dataset are skipped and the copied file is added to the index. The index
+            is only built here if it is empty, keep it current with DatasetIndex.update() (ingest_images does).
+            Defaults to None.
+        link (bool): If True, the file is hardlinked instead of copied where possible, source and copy then
+            share their content. Defaults to False.
 
     Returns:
         None
@@ -36,32 +48,93 @@ def move_file(source_path: str,
         if not os.path.exists(source_path):
             raise FileNotFoundError(f"The file '{source_path}' does not exist.")
 
+        if dataset_path is not None:
+            with open(source_path, 'rb') as file:
+                content_hash = hash_bytes(file.read())
+            with DatasetIndex(dataset_path) as index:
+                if index.empty():
+                    index.update()
+                existing = index.lookup(content_hash)
+            if existing:
+                print(f"File '{source_path}' skipped, same content as '{existing[0]}'.")
+                return
+
         unique_id = str(uuid.uuid4())
         filename, extension = os.path.splitext(os.path.basename(source_path))
         new_filename = f"{unique_id}_{filename}{extension}"
         destination_path_with_id = os.path.join(os.path.dirname(destination_path), new_filename)
         os.makedirs(os.path.dirname(destination_path_with_id), exist_ok=True)
-        shutil.copy2(source_path, destination_path_with_id)
+        linked = False
+        if link:
+            try:
+                os.link(source_path, destination_path_with_id)
+                linked = True
+            except OSError:
+                pass # e.g. another file system, copy instead
+        if not linked:
+            shutil.copy2(source_path, destination_path_with_id)
+        if dataset_path is not None:
+            with DatasetIndex(dataset_path) as index:
+                index.add(destination_path_with_id)
 
-        print(f"File '{source_path}' successfully copied to '{destination_path_with_id}'.")
+        print(f"File '{source_path}' successfully {'linked' if linked else 'copied'} to '{destination_path_with_id}'.")
     except Exception as e:
         print(f"An error occurred: {e}")
 
 
+def _check_mode(task: str, mode: str) -> None:
+    if mode not in ('move', 'manifest', 'link'):
+        raise ValueError(f"Unknown mode {mode}. Choose 'move', 'manifest' or 'link'.")
+    if mode == 'manifest' and task == 'CLS':
+        raise ValueError("Classification datasets need one folder per class, use mode='link'.")
+
+
+def _apply_plan(path: str, plan: dict, mode: str, split: str, workers: int, append: bool = False) -> None:
+    """Moves, lists or links the files of a split plan depending on the mode."""
+    if mode == 'move':
+        execute_plan(path, plan, workers)
+    elif mode == 'manifest':
+        manifests = write_manifests(path, plan, split, append)
+        print(f"Split '{split}' written to {', '.join(manifests.values())}")
+    else:
+        print(f"Split '{split}' linked under {link_split(path, plan, split, workers, append)}")
+
+
 def prepare_folder_structure(path: str,
                              task: str,
                              val_size: float = None,
-                             test_size: float = None):
+                             test_size: float = None,
+                             workers: int = 8,
+                             mode: str = 'move',
+                             split: str = 'split',
+                             dedupe: bool = False):
     """
     Prepare the folder structure for a dataset depending on the task.
+    The whole split is planned first (see split_helpers) and the files are then moved in parallel.
+    If the split is interrupted, it can be completed with split_helpers.resume_split(path) or undone with
+    split_helpers.rollback_split(path).
+    With mode 'manifest' or 'link' the files stay in place and several named splits can share one image pool;
+    pass the same split name to create_config.
     Args:
         path (str): The directory path containing the images.
         task (str): Either 'CLS' for classification or 'DETECT' for object detection.
         val_size (float): The proportion of the dataset to include in the validation split from the initial split.
         test_size (float): The proportion of the dataset to include in the test split from the remaining data after the validation split.
+        workers (int): Number of threads moving files. Defaults to 8.
+        mode (str): 'move' (files are moved into the split folders), 'manifest' (only for 'DETECT': writes
+            <split>_train.txt and <split>_val.txt lists) or 'link' (hardlinks under splits/<split>). Defaults to 'move'.
+        split (str): Name of the split for the modes 'manifest' and 'link'. Defaults to 'split'.
+        dedupe (bool): If True, corrupt images and images whose content is already in the dataset are left out
+            (see dataset_index). Defaults to False.
     Returns:
         Function depending on task.
+    Raises:
+        ValueError: If the mode is unknown or 'manifest' is used for classification.
     """
+    _check_mode(task, mode)
+
+    def apply(plan: dict):
+        _apply_plan(path, plan, mode, split, workers)
 
     def prepare_detect_folder_structure(path: str, val_size: float):
         """
@@ -74,51 +147,11 @@ def prepare_folder_structure(path: str,
         Returns:
             None
         """
-        img_path = os.path.join(path, 'images')
-        label_path = os.path.join(path, 'labels')
-
-        # Sammle alle Bild-Label-Paare robust
-        valid_img, valid_label = [], []
-        for img in os.listdir(img_path):
-            if img.lower().endswith(('.png', '.jpg', '.jpeg')):
-                base = os.path.splitext(img)[0]
-                lbl_file = base + '.txt'
-                if os.path.exists(os.path.join(label_path, lbl_file)):
-                    valid_img.append(img)
-                    valid_label.append(lbl_file)
-
-        if not valid_img:
-            raise ValueError(f"Keine Bilder gefunden in {img_path}!")
-
-        # Split in Training und Validation
-        x_train, x_val, y_train, y_val = train_test_split(
-            valid_img,
-            valid_label,
-            test_size=val_size,
-            train_size=1 - val_size,
-            random_state=42,
-            shuffle=True
-        )
-
-        # Ordnerstruktur anlegen
-        train_img_dest = os.path.join(img_path, 'train')
-        val_img_dest   = os.path.join(img_path, 'val')
-        train_lbl_dest = os.path.join(label_path, 'train')
-        val_lbl_dest   = os.path.join(label_path, 'val')
-        os.makedirs(train_img_dest, exist_ok=True)
-        os.makedirs(val_img_dest,   exist_ok=True)
-        os.makedirs(train_lbl_dest, exist_ok=True)
-        os.makedirs(val_lbl_dest,   exist_ok=True)
-
-        # Verschiebe Dateien
-        for img in x_train:
-            shutil.move(os.path.join(img_path, img), train_img_dest)
-        for lbl in y_train:
-            shutil.move(os.path.join(label_path, lbl), train_lbl_dest)
-        for img in x_val:
-            shutil.move(os.path.join(img_path, img), val_img_dest)
-        for lbl in y_val:
-            shutil.move(os.path.join(label_path, lbl), val_lbl_dest)
+        exclude = None
+        if dedupe:
+            candidates = [os.path.join('images', f) for f in scan_files(os.path.join(path, 'images'), IMAGE_EXTENSIONS)]
+            exclude = filter_candidates(path, candidates, workers)
+        apply(plan_detect_split(path, val_size, exclude))
 
     def prepare_cls_folder_structure(path: str,
                                      val_size: float,
@@ -126,22 +159,8 @@ def prepare_folder_structure(path: str,
         """
         Prepare the folder structure for a classification dataset by splitting images into training, validation, and test sets.
         """
-        classes = dict()
-        for img in os.listdir(path):
-            if img.lower().endswith(('.png', '.jpg', '.jpeg')):
-                prefix = img.split('_')[0]
-                classes.setdefault(prefix, []).append(img)
-        split = dict()
-        for key, imgs in classes.items():
-            train, tmp = train_test_split(imgs, test_size=val_size)
-            val, test = train_test_split(tmp, test_size=test_size)
-            split[key] = (train, val, test)
-        for idx, subset in enumerate(['train', 'val', 'test']):
-            for key, (train, val, test) in split.items():
-                cls_dest = os.path.join(path, subset, key)
-                os.makedirs(cls_dest, exist_ok=True)
-                for img in split[key][idx]:
-                    shutil.move(os.path.join(path, img), os.path.join(cls_dest, img))
+        exclude = filter_candidates(path, scan_files(path, IMAGE_EXTENSIONS), workers) if dedupe else None
+        apply(plan_cls_split(path, val_size, test_size, exclude))
 
     if task == 'CLS':
         val_size = 0.4 if val_size is None else val_size
@@ -152,30 +171,51 @@ def prepare_folder_structure(path: str,
         return prepare_detect_folder_structure(path, val_size)
 
 
-def create_config(path: str, task: str):
+def create_config(path: str, task: str, split: str = None, validate: bool = False):
     """
     Generate a configuration file (`config.yaml`) for a specified machine learning task.
+    If split is given, the config points to the manifest files or the link folder of that split
+    (see prepare_folder_structure with mode 'manifest' or 'link').
+    If validate is True, all detection labels are checked first (see label_helpers.validate_labels);
+    class ids that do not exist in classes.txt raise a ValueError.
     """
     if not os.path.exists(path):
         raise FileNotFoundError(f'The specified path does not exist')
 
+    split_dir = os.path.join(SPLITS_DIR, split) if split else ''
+    if split and not os.path.isdir(os.path.join(path, split_dir)):
+        split_dir = None # manifest files instead of a link folder
+
     if task == 'DETECT':
         def read_class_names(classes_path):
             with open(classes_path, 'r') as file:
                 return [line.strip() for line in file]
         classes = read_class_names(os.path.join(path, 'classes.txt'))
+        if validate:
+            summary = validate_labels(path, nc=len(classes))
+            unknown = [row for row in summary['bad_rows'] if row[2] == 'unknown_class']
+            if unknown:
+                raise ValueError(f'{len(unknown)} boxes use class ids that are not in classes.txt, e.g. in {unknown[0][0]}.')
+            for i, name in enumerate(classes):
+                if summary['instances_per_class'].get(i, 0) == 0:
+                    print(f"Warning: class '{name}' has no labeled boxes.")
+        if split_dir is None:
+            train, val = (os.path.basename(manifest_path(path, split, subset)) for subset in ('train', 'val'))
+        else:
+            train, val = (os.path.join(split_dir, 'images', subset) for subset in ('train', 'val'))
         data = {
-            'train': 'images/train',
-            'val':   'images/val',
+            'train': train,
+            'val':   val,
             'nc':    len(classes),
             'names': {i: name for i, name in enumerate(classes)}
         }
     if task == 'CLS':
-        subdirs = sorted(os.listdir(os.path.join(path, 'train')))
+        split_dir = split_dir or ''
+        subdirs = sorted(os.listdir(os.path.join(path, split_dir, 'train')))
         data = {
-            'train': 'train',
-            'val':   'val',
-            'test':  'test',
+            'train': os.path.join(split_dir, 'train'),
+            'val':   os.path.join(split_dir, 'val'),
+            'test':  os.path.join(split_dir, 'test'),
             'nc':    len(subdirs),
             'names': subdirs
         }
@@ -184,7 +224,142 @@ def create_config(path: str, task: str):
     print(f'Created config.yaml under {path}')
 
 
+def _main_class(label_file: str) -> str:
+    """Returns the most frequent class id of a YOLO label file ('background' for empty files)."""
+    with open(label_file, 'r') as file:
+        ids = [line.split()[0] for line in file if line.strip()]
+    return max(set(ids), key=ids.count) if ids else 'background'
+
+
+def _build_split_index(path: str, task: str, mode: str, split: str) -> dict:
+    """Builds the index of a split from an existing split (only needed once, afterwards the index is updated)."""
+    files = dict()
+    base = os.path.join(path, SPLITS_DIR, split) if mode == 'link' else path
+    subsets = ['train', 'val', 'test'] if task == 'CLS' else ['train', 'val']
+    if task == 'CLS':
+        for subset in subsets:
+            subset_dir = os.path.join(base, subset)
+            classes = [d.name for d in os.scandir(subset_dir) if d.is_dir()] if os.path.isdir(subset_dir) else []
+            for cls in classes:
+                for img in scan_files(os.path.join(subset_dir, cls), IMAGE_EXTENSIONS):
+                    files[img] = [cls, subset]
+    else:
+        for subset in subsets:
+            if mode == 'manifest':
+                manifest = manifest_path(path, split, subset)
+                imgs = [os.path.basename(l.strip()) for l in open(manifest)] if os.path.exists(manifest) else []
+                label_dir = os.path.join(path, 'labels')
+            else:
+                imgs = scan_files(os.path.join(base, 'images', subset), IMAGE_EXTENSIONS)
+                label_dir = os.path.join(base, 'labels', subset)
+            for img in imgs:
+                label = os.path.join(label_dir, os.path.splitext(img)[0] + '.txt')
+                files[img] = [_main_class(label) if os.path.exists(label) else 'background', subset]
+
+    counts = dict()
+    for cls, subset in files.values():
+        counts.setdefault(cls, {}).setdefault(subset, 0)
+        counts[cls][subset] += 1
+    return {'task': task, 'classes': None, 'files': files, 'counts': counts}
+
+
+def ingest_images(path: str,
+                  task: str,
+                  val_size: float = None,
+                  test_size: float = None,
+                  mode: str = 'move',
+                  split: str = 'split',
+                  workers: int = 8,
+                  dedupe: bool = False) -> int:
+    """
+    Adds new images to an existing split without re-splitting the dataset.
+
+    A persistent index (.<split>_index.json) records which file belongs to which subset. Only files that are
+    not in the index are assigned, per class to the subset furthest below its target share, so the ratios
+    stay stratified. config.yaml is only rewritten when the set of classes changes.
+
+    Args:
+        path (str): The directory path containing the images.
+        task (str): Either 'CLS' for classification or 'DETECT' for object detection.
+        val_size (float): The proportion of the dataset in validation (and test). Defaults as in prepare_folder_structure.
+        test_size (float): The proportion of val_size that goes into test (only 'CLS'). Defaults as in prepare_folder_structure.
+        mode (str): 'move', 'manifest' or 'link', see prepare_folder_structure. Defaults to 'move'.
+        split (str): Name of the split. Defaults to 'split'.
+        workers (int): Number of threads moving or linking files. Defaults to 8.
+        dedupe (bool): If True, corrupt new images and copies of images already in the dataset are skipped
+            (see dataset_index). Defaults to False.
+
+    Returns:
+        added (int): Number of added images.
+
+    Raises:
+        ValueError: If the mode is unknown or 'manifest' is used for classification.
+    """
+    _check_mode(task, mode)
+    val_size = (0.4 if task == 'CLS' else 0.2) if val_size is None else val_size
+    test_size = 0.1 if test_size is None else test_size
+    index = load_split_index(path, split) or _build_split_index(path, task, mode, split)
+    files = index['files']
+
+    # collect the new files per class
+    new = dict()
+    if task == 'DETECT':
+        labels = set(scan_files(os.path.join(path, 'labels'), ('.txt',)))
+        for img in scan_files(os.path.join(path, 'images'), IMAGE_EXTENSIONS):
+            label = os.path.splitext(img)[0] + '.txt'
+            if img not in files and label in labels:
+                new.setdefault(_main_class(os.path.join(path, 'labels', label)), []).append(img)
+    if task == 'CLS':
+        for img in scan_files(path, IMAGE_EXTENSIONS):
+            if img not in files:
+                new.setdefault(img.split('_')[0], []).append(img)
+
+    if dedupe and new:
+        prefix = 'images' if task == 'DETECT' else ''
+        rejected = filter_candidates(path, [os.path.join(prefix, img) for imgs in new.values() for img in imgs], workers)
+        new = {cls: [img for img in imgs if os.path.join(prefix, img) not in rejected] for cls, imgs in new.items()}
+        new = {cls: imgs for cls, imgs in new.items() if imgs}
+
+    if not new:
+        print('No new images found.')
+        return 0
+
+    assignments = assign_stratified(new, index['counts'], split_ratios(task, val_size, test_size))
+    classes_of = {img: cls for cls, imgs in new.items() for img in imgs}
+    plan = {'dirs': set(), 'moves': []}
+    for img, subset in assignments.items():
+        if task == 'DETECT':
+            label = os.path.splitext(img)[0] + '.txt'
+            plan['moves'] += [[os.path.join('images', img), os.path.join('images', subset, img)],
+                              [os.path.join('labels', label), os.path.join('labels', subset, label)]]
+            plan['dirs'] |= {os.path.join('images', subset), os.path.join('labels', subset)}
+        else:
+            plan['moves'].append([img, os.path.join(subset, classes_of[img], img)])
+            plan['dirs'].add(os.path.join(subset, classes_of[img]))
+    plan['dirs'] = sorted(plan['dirs'])
+    _apply_plan(path, plan, mode, split, workers, append=True)
+
+    for img, subset in assignments.items():
+        cls = classes_of[img]
+        files[img] = [cls, subset]
+        index['counts'].setdefault(cls, {}).setdefault(subset, 0)
+        index['counts'][cls][subset] += 1
+
+    # config.yaml only changes with the set of classes
+    if task == 'DETECT':
+        with open(os.path.join(path, 'classes.txt'), 'r') as file:
+            classes = [line.strip() for line in file]
+    else:
+        classes = sorted(index['counts'])
+    if classes != index['classes']:
+        create_config(path, task, split=None if mode == 'move' else split)
+        index['classes'] = classes
+    save_split_index(path, index, split)
+    print(f'Added {len(assignments)} new images.')
+    return len(assignments)
+
+
 def cleanup_images(path: str) -> None:
     for file in os.listdir(path):
-        if file.lower().endswith(('.png', '.jpg', '.jpeg')):
+        if file.lower().endswith(IMAGE_EXTENSIONS):
             os.remove(os.path.join(path, file))
@@ -1,32 +1,27 @@
 import cv2, time, os
 import math
+import threading
+from collections import deque
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.image import imread
 
-def find_device_port(device):
-    """Finds correct device port and connects to it."""
-    print(f'Trying device {device}')
-    cap = cv2.VideoCapture(device)
-    device = 0
-    while not cap.isOpened() and device <= 200:
-        print(f'Trying device {device}')
-        cap = cv2.VideoCapture(device)
-        if cap.isOpened():
-            break
-        device += 1
-    if not cap.isOpened():
-        print('Connection to camera could not be established.')
-    print(f'Successful with device port: {device}')
-    return cap
+from device_helpers import find_device_port
+from image_writer import AsyncImageWriter
 
 def capture_images(num_imgs: int,
                    name: str,
                    img_path: str,
                    device: int = 0,
                    delay: float = 3.0,
-                   show: bool = False) -> None:
+                   show: bool = False,
+                   encoding: str = 'png',
+                   quality: int = None,
+                   writers: int = 2,
+                   burst: bool = False) -> None:
     """
-    Captures images from a specified video device and saves them to disk as .png.
+    Captures images from a specified video device and saves them to disk as .png (or .jpg/.webp).
+    Images are encoded and saved on background threads, so saving does not block capturing.
 
     Args:
         num_imgs (int): The number of images to capture per class.
@@ -35,6 +30,11 @@ def capture_images(num_imgs: int,
         device (int, optional): The index of the video capturing device. Defaults to 0.
         delay (float, optional): The delay in seconds between capturing each image. Defaults to 3.
         show (bool, optional): If True, displays the current captured image during the process. Defaults to False.
+        encoding (str, optional): Image format: 'png', 'jpeg' or 'webp' (lossless by default). Defaults to 'png'.
+        quality (int, optional): PNG compression level (0-9) or JPEG/WebP quality (0-100). Defaults to None (format default).
+        writers (int, optional): Number of background threads that encode and save the images. Defaults to 2.
+        burst (bool, optional): If True, frames are captured continuously and only kept if they differ enough
+            from the last kept image (see capture_burst); delay is ignored. Defaults to False.
 
     Returns:
         None
@@ -42,6 +42,10 @@ def capture_images(num_imgs: int,
     Raises:
         None
     """
+    if burst:
+        capture_burst(num_imgs, name, img_path, device=device, show=show,
+                      encoding=encoding, quality=quality, writers=writers)
+        return
 
     # accesses the camera
     cap = find_device_port(device)
@@ -59,7 +63,10 @@ def capture_images(num_imgs: int,
     
     print('Image: {}'.format(name))
 
-    print('Camera recognized: ', cap.open(device))
+    print('Camera recognized: ', cap.isOpened())
+
+    # images are encoded and saved in the background, a full queue slows the capturing down (backpressure)
+    writer = AsyncImageWriter(encoding=encoding, quality=quality, workers=writers)
 
     # looping over all frames captured
     for img_num in range(num_imgs):
@@ -67,22 +74,147 @@ def capture_images(num_imgs: int,
             print('Capturing {}, Image {}'.format(name, i+1))
             
             ret, frame = cap.read() # read frame
-            imgname = os.path.join(img_path, name + '_' + str(i) + '.png') # create image name
+            if not ret or frame is None:
+                print('Could not read a frame, skipped.')
+                continue
+            imgname = os.path.join(img_path, name + '_' + str(i)) # create image name (extension is added by the writer)
             i += 1 # increment counter variable
-            cv2.imwrite(imgname, frame) # save image to directory
+            writer.write(frame, imgname) # save image to directory
 
         if show:
             cv2.imshow('Current image', frame)
+            # waitKey keeps the window responsive while waiting for the next capture
+            key = cv2.waitKey(max(1, int(delay * 1000)))
+        else:
+            time.sleep(delay)
+            key = cv2.waitKey(1)
+        if key & 0xFF == ord("q"):
+            break
+
+    # clean-up: close all windows and display the directory path under which the images are saved       
+    cap.release()
+    cv2.destroyAllWindows()
+    stats = writer.close()
+    print(f"Saved {stats['written']} images ({stats['images_per_sec']} images/s)")
+    print(f'Images saved at {img_path}')
+
+
+def dhash(frame: np.ndarray, size: int = 8) -> int:
+    """
+    Computes the difference hash of an image: one bit per horizontally neighbouring pixel pair of a
+    (size x size+1) grayscale thumbnail. Similar images have hashes with a small Hamming distance.
+
+    Args:
+        frame (np.ndarray): BGR or grayscale image.
+        size (int, optional): Hash size, the hash has size*size bits. Defaults to 8.
+
+    Returns:
+        hash (int): Difference hash.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits of two hashes."""
+    return bin(a ^ b).count('1')
+
+
+def capture_burst(num_imgs: int,
+                  name: str,
+                  img_path: str,
+                  device: int = 0,
+                  max_duration: float = 60.0,
+                  min_distance: int = 6,
+                  buffer_size: int = 8,
+                  show: bool = False,
+                  encoding: str = 'png',
+                  quality: int = None,
+                  writers: int = 2) -> None:
+    """
+    Captures frames continuously at camera rate and keeps only frames that differ enough from the last kept one.
+
+    A reader thread puts the frames into a ring buffer (old frames are overwritten if the selection falls behind).
+    The selection compares difference hashes (see dhash), so near-duplicates are rejected before they are encoded.
 
-        time.sleep(delay)
+    Args:
+        num_imgs (int): The number of images to keep.
+        name (str): A string for identifying the images.
+        img_path (str): The directory path where the captured images will be saved.
+        device (int, optional): The index of the video capturing device. Defaults to 0.
+        max_duration (float, optional): Maximum capture time in seconds. Defaults to 60.
+        min_distance (int, optional): Minimum Hamming distance (of 64 bits) to the last kept image. Defaults to 6.
+        buffer_size (int, optional): Number of frames in the ring buffer. Defaults to 8.
+        show (bool, optional): If True, displays the current frame during the process. Defaults to False.
+        encoding (str, optional): Image format: 'png', 'jpeg' or 'webp'. Defaults to 'png'.
+        quality (int, optional): PNG compression level or JPEG/WebP quality. Defaults to None (format default).
+        writers (int, optional): Number of background threads that encode and save the images. Defaults to 2.
+
+    Returns:
+        None
+
+    Raises:
+        None
+    """
+    cap = find_device_port(device)
+    os.makedirs(img_path, exist_ok=True)
+    i = len([f for f in os.listdir(img_path) if os.path.isfile(os.path.join(img_path, f))])
+    print('Image: {}'.format(name))
+
+    # ring buffer filled by the reader thread at camera rate
+    ring = deque(maxlen=buffer_size)
+    new_frame = threading.Condition()
+    stop = threading.Event()
+
+    def read_frames():
+        while not stop.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            with new_frame:
+                ring.append(frame)
+                new_frame.notify()
+        stop.set()
+        with new_frame:
+            new_frame.notify()
+
+    reader = threading.Thread(target=read_frames, daemon=True)
+    reader.start()
+    writer = AsyncImageWriter(encoding=encoding, quality=quality, workers=writers)
+
+    kept, seen, last_hash = 0, 0, None
+    start = time.perf_counter()
+    while kept < num_imgs and time.perf_counter() - start < max_duration:
+        with new_frame:
+            while not ring and not stop.is_set():
+                new_frame.wait(timeout=0.1)
+            if not ring:
+                break
+            frame = ring.popleft()
+        seen += 1
+
+        h = dhash(frame)
+        if last_hash is None or hamming_distance(h, last_hash) >= min_distance:
+            writer.write(frame, os.path.join(img_path, name + '_' + str(i)))
+            last_hash = h
+            kept += 1
+            i += 1
+
+        if show:
+            cv2.imshow('Current image', frame)
         if cv2.waitKey(1) & 0xFF == ord("q"):
             break
-        # window wont open
 
-        
-    # clean-up: close all windows and display the directory path under which the images are saved       
+    stop.set()
+    reader.join(timeout=2)
     cap.release()
     cv2.destroyAllWindows()
+    stats = writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"Kept {kept} of {seen} frames in {elapsed:.1f} s ({stats['images_per_sec']} images/s), "
+          f"{seen - kept} near-duplicates rejected")
     print(f'Images saved at {img_path}')
 
 
@@ -0,0 +1,135 @@
+import queue
+import threading
+import time
+
+import cv2
+
+# file extension per encoding
+EXTENSIONS = {
+    'png': '.png',
+    'jpeg': '.jpg',
+    'webp': '.webp',
+}
+
+
+def encode_params(encoding: str, quality: int = None) -> list:
+    """
+    Returns the OpenCV encoding parameters for an image format.
+
+    Args:
+        encoding (str): 'png', 'jpeg' or 'webp'.
+        quality (int): PNG compression level (0-9, default 1), JPEG quality (0-100, default 95) or
+            WebP quality (0-100, default None = lossless).
+
+    Returns:
+        params (list): Parameters for cv2.imencode.
+
+    Raises:
+        ValueError: If the encoding is unknown.
+    """
+    if encoding == 'png':
+        return [cv2.IMWRITE_PNG_COMPRESSION, 1 if quality is None else quality]
+    if encoding == 'jpeg':
+        return [cv2.IMWRITE_JPEG_QUALITY, 95 if quality is None else quality]
+    if encoding == 'webp':
+        # OpenCV writes lossless WebP for quality values above 100
+        return [cv2.IMWRITE_WEBP_QUALITY, 101 if quality is None else quality]
+    raise ValueError(f'Unknown encoding {encoding}. Choose one of {list(EXTENSIONS)}.')
+
+
+class AsyncImageWriter:
+    """
+    Encodes and saves images on background threads so that the capture loop is not blocked.
+
+    Args:
+        encoding (str): 'png', 'jpeg' or 'webp'. Defaults to 'png'.
+        quality (int): Compression level or quality, see encode_params. Defaults to None.
+        workers (int): Number of writer threads. Defaults to 2.
+        queue_size (int): Maximum number of images waiting to be written. Defaults to 64.
+        block (bool): If True, write() waits when the queue is full, otherwise the image is dropped. Defaults to True.
+    """
+
+    def __init__(self,
+                 encoding: str = 'png',
+                 quality: int = None,
+                 workers: int = 2,
+                 queue_size: int = 64,
+                 block: bool = True):
+        self.extension = EXTENSIONS.get(encoding)
+        self.params = encode_params(encoding, quality)
+        self.block = block
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, path = item
+            try:
+                # imencode releases the GIL, so several workers encode in parallel
+                success, buffer = cv2.imencode(self.extension, frame, self.params)
+                if not success:
+                    raise ValueError('encoding failed')
+                with open(path, 'wb') as file:
+                    file.write(buffer.tobytes())
+                with self._lock:
+                    self.written += 1
+            except Exception as e:
+                print(f'Could not save {path}: {e}')
+                with self._lock:
+                    self.failed += 1
+
+    def write(self, frame, path: str) -> bool:
+        """
+        Queues an image for saving.
+
+        Args:
+            frame (np.ndarray): Image to save. Must not be modified afterwards.
+            path (str): Target path without extension; the extension of the encoding is added.
+
+        Returns:
+            queued (bool): False if the image was dropped because the queue was full.
+        """
+        try:
+            self._queue.put((frame, path + self.extension), block=self.block)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self) -> dict:
+        """
+        Waits until all queued images are saved and stops the workers.
+
+        Returns:
+            stats (dict): Written, dropped and failed images and the achieved images per second.
+        """
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        elapsed = time.perf_counter() - self._start
+        return {'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'images_per_sec': round(self.written / elapsed, 1) if elapsed > 0 else 0.0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,166 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# tolerance for rounding errors of the annotation tools
+EPS = 1e-6
+
+# edges of the box size histogram (sqrt of the relative box area)
+SIZE_BINS = np.array([0, 0.02, 0.05, 0.1, 0.2, 0.4, 0.6, 0.8, 1.0 + EPS])
+
+
+def find_label_files(label_path: str) -> list:
+    """Lists all .txt files below a labels directory (including train/val subfolders)."""
+    files = []
+    for root, _, names in os.walk(label_path):
+        files += [os.path.join(root, n) for n in names if n.endswith('.txt') and n != 'classes.txt']
+    return sorted(files)
+
+
+def _read_chunk(paths: list) -> list:
+    contents = []
+    for path in paths:
+        with open(path, 'r') as file:
+            contents.append(file.read())
+    return contents
+
+
+def load_labels(label_path: str, workers: int = 8):
+    """
+    Reads all YOLO label files of a directory into one array.
+
+    Args:
+        label_path (str): Labels directory.
+        workers (int): Number of threads reading files. Defaults to 8.
+
+    Returns:
+        files (list): Label file paths, the index is the file_id.
+        labels (np.ndarray): Array of shape (N, 6) with the columns file_id, class, cx, cy, w, h.
+        malformed (list): (file, line number, line) of lines that do not consist of 5 numbers.
+        line_numbers (np.ndarray): Line number (from 1) of every row of labels inside its file.
+    """
+    files = find_label_files(label_path)
+    # label files are tiny, so every thread reads a whole chunk of them
+    chunks = [files[i:i + 2000] for i in range(0, len(files), 2000)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        contents = [content for chunk in pool.map(_read_chunk, chunks) for content in chunk]
+
+    # collect the well-formed lines of all files and convert them in one go
+    tokens, ids, line_numbers, malformed = [], [], [], []
+    for file_id, content in enumerate(contents):
+        for line_no, line in enumerate(content.splitlines(), 1):
+            parts = line.split()
+            if len(parts) == 5:
+                tokens += parts
+                ids.append(file_id)
+                line_numbers.append(line_no)
+            elif parts:
+                malformed.append((files[file_id], line_no, line.strip()))
+
+    try:
+        values = np.array(tokens, dtype=np.float64).reshape(-1, 5)
+        ids = np.array(ids, dtype=np.float64)
+    except ValueError:
+        # non-numeric tokens: convert row by row and report the broken lines
+        rows, keep, keep_lines = [], [], []
+        for i in range(len(ids)):
+            try:
+                rows.append([float(t) for t in tokens[5 * i:5 * i + 5]])
+                keep.append(ids[i])
+                keep_lines.append(line_numbers[i])
+            except ValueError:
+                malformed.append((files[ids[i]], line_numbers[i], ' '.join(tokens[5 * i:5 * i + 5])))
+        values = np.array(rows, dtype=np.float64).reshape(-1, 5)
+        ids = np.array(keep, dtype=np.float64)
+        line_numbers = keep_lines
+
+    labels = np.column_stack([ids, values])
+    return files, labels, malformed, np.array(line_numbers, dtype=np.int64)
+
+
+def validate_labels(path: str, nc: int = None, workers: int = 8, verbose: bool = True) -> dict:
+    """
+    Validates all YOLO labels of an object detection dataset with vectorized checks.
+
+    Checks for NaN or infinite values, class ids (integer and below the number of classes from classes.txt),
+    coordinates in [0, 1], positive box sizes and boxes that reach outside the image.
+
+    Args:
+        path (str): Dataset directory with 'labels' (and 'classes.txt').
+        nc (int): Number of classes. Defaults to None (number of lines in classes.txt).
+        workers (int): Number of threads reading files. Defaults to 8.
+        verbose (bool): If True, a report is printed. Defaults to True.
+
+    Returns:
+        summary (dict): 'files', 'instances', 'empty_files', 'instances_per_class', 'size_histogram'
+            (counts per SIZE_BINS interval), 'malformed' lines and 'bad_rows' (file, line number, code, reason)
+            with the codes 'not_finite', 'class_not_integer', 'negative_class', 'coords_out_of_range',
+            'size_not_positive', 'box_outside' and 'unknown_class'.
+
+    Raises:
+        FileNotFoundError: If the labels directory does not exist.
+    """
+    label_path = os.path.join(path, 'labels')
+    if not os.path.isdir(label_path):
+        raise FileNotFoundError(f'The directory {label_path} does not exist.')
+    if nc is None and os.path.exists(os.path.join(path, 'classes.txt')):
+        with open(os.path.join(path, 'classes.txt'), 'r') as file:
+            nc = len([line for line in file if line.strip()])
+
+    files, labels, malformed, line_numbers = load_labels(label_path, workers)
+    file_id, cls, cx, cy, w, h = labels.T
+
+    # comparisons with NaN are False, so non-finite rows would pass every other check
+    finite = np.isfinite(labels).all(axis=1)
+
+    # code -> (reason, mask of the failing boxes)
+    checks = {
+        'not_finite': ('value is NaN or infinite', ~finite),
+        'class_not_integer': ('class id is not an integer', cls != np.round(cls)),
+        'negative_class': ('negative class id', cls < 0),
+        'coords_out_of_range': ('coordinates outside [0, 1]',
+                                ((labels[:, 2:] < -EPS) | (labels[:, 2:] > 1 + EPS)).any(axis=1)),
+        'size_not_positive': ('box size not positive', (w <= 0) | (h <= 0)),
+        'box_outside': ('box reaches outside the image', ((cx - w / 2 < -EPS) | (cx + w / 2 > 1 + EPS) |
+                                                          (cy - h / 2 < -EPS) | (cy + h / 2 > 1 + EPS))),
+    }
+    if nc is not None:
+        checks['unknown_class'] = (f'class id not below {nc} (classes.txt)', cls >= nc)
+
+    bad_rows = []
+    for code, (reason, mask) in checks.items():
+        bad_rows += [(files[int(file_id[i])], int(line_numbers[i]), code, reason) for i in np.flatnonzero(mask)]
+
+    valid_cls = cls[finite & (cls >= 0) & (cls == np.round(cls))].astype(int)
+    per_class = np.bincount(valid_cls, minlength=nc or 0)
+    sizes = np.sqrt(np.clip(w[finite] * h[finite], 0, None))
+    histogram, _ = np.histogram(sizes, bins=SIZE_BINS)
+
+    summary = {
+        'files': len(files),
+        'instances': len(labels),
+        'empty_files': len(files) - len(np.unique(file_id)),
+        'instances_per_class': {int(c): int(n) for c, n in enumerate(per_class)},
+        'size_histogram': histogram.tolist(),
+        'malformed': malformed,
+        'bad_rows': bad_rows,
+    }
+    if verbose:
+        print_label_report(summary)
+    return summary
+
+
+def print_label_report(summary: dict) -> None:
+    """Prints the summary of validate_labels."""
+    print(f"{summary['files']} label files, {summary['instances']} boxes, {summary['empty_files']} empty files")
+    print('Boxes per class:', summary['instances_per_class'])
+    print('Box sizes (sqrt of area):', ', '.join(f'<{edge:.2f}: {n}' for edge, n in
+                                                 zip(SIZE_BINS[1:], summary['size_histogram'])))
+    for file, line_no, line in summary['malformed'][:10]:
+        print(f"Malformed line {line_no} in {file}: '{line}'")
+    for file, line_no, _, reason in summary['bad_rows'][:10]:
+        print(f'Bad box in line {line_no} of {file}: {reason}')
+    problems = len(summary['malformed']) + len(summary['bad_rows'])
+    if problems > 20:
+        print(f'... {problems} problems in total')
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import threading
+import time
+from urllib.parse import quote, unquote
+
+import cv2
+
+from video_helpers import DETECTION_FIELDS, result_rows
+
+BOUNDARY = 'frame'
+
+
+class MJPEGServer:
+    """
+    Small local HTTP server that shows inference results in the browser instead of an OpenCV window.
+
+    The server is an output sink: call it with (name, frame_id, result) for every processed frame, e.g. as
+    output of stream_helpers.run_streams. Only the newest result per stream is kept. Frames are rendered and
+    JPEG-encoded only while a client watches the stream, and only as fast as the client reads them.
+
+    Endpoints:
+        /                   Overview page with all streams.
+        /stream/<name>      MJPEG stream (multipart/x-mixed-replace) of the annotated frames.
+        /detections         Newest detections of all streams as JSON.
+        /detections/<name>  Newest detections of one stream as JSON.
+
+    Args:
+        host (str): Interface to listen on. Defaults to '127.0.0.1' (local only).
+        port (int): Port to listen on, 0 picks a free one. Defaults to 8080.
+        quality (int): JPEG quality (0-100). Defaults to 80.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8080, quality: int = 80):
+        self.host = host
+        self.port = port
+        self.quality = quality
+        self.clients = 0
+        self.encoded = 0
+        self.sent = 0
+        self._latest = dict() # name -> (version, frame_id, timestamp, result)
+        self._encoded = dict() # name -> (version, jpeg)
+        self._events = dict()
+        self._locks = dict()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._stopped = None
+        self._ready = threading.Event()
+        self._thread = None
+        self._error = None
+
+    def __call__(self, name: str, frame_id: int, result) -> None:
+        """Publishes the newest result of a stream. Cheap: nothing is rendered here."""
+        with self._lock:
+            version = self._latest[name][0] + 1 if name in self._latest else 0
+            self._latest[name] = (version, frame_id, time.time(), result)
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._notify, name)
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}/'
+
+    def _event(self, name: str) -> asyncio.Event:
+        if name not in self._events:
+            self._events[name] = asyncio.Event()
+        return self._events[name]
+
+    def _notify(self, name: str) -> None:
+        # wake up all clients waiting for this stream; later waiters get a fresh event
+        self._event(name).set()
+        self._events[name] = asyncio.Event()
+
+    def _render(self, result):
+        success, buffer = cv2.imencode('.jpg', result.plot(), [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return buffer.tobytes() if success else None
+
+    async def _jpeg(self, name: str, version: int, result):
+        """Encodes a result once, no matter how many clients watch the stream."""
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            cached = self._encoded.get(name)
+            if cached is None or cached[0] != version:
+                # plot and imencode run on a worker thread so the server keeps serving other clients
+                jpeg = await asyncio.get_running_loop().run_in_executor(None, self._render, result)
+                self._encoded[name] = cached = (version, jpeg)
+                self.encoded += 1
+            return cached[1]
+
+    def _detections(self, name: str) -> dict:
+        with self._lock:
+            version, frame_id, timestamp, result = self._latest[name]
+        detections = [dict(zip(DETECTION_FIELDS[1:], row[1:])) for row in result_rows(frame_id, result)]
+        for detection in detections:
+            detection['class'] = int(detection['class']) # numpy integer, not serializable
+        return {'frame': frame_id, 'time': timestamp, 'detections': detections}
+
+    async def _send_stream(self, name: str, writer: asyncio.StreamWriter) -> None:
+        writer.write(b'HTTP/1.1 200 OK\r\n'
+                     b'Content-Type: multipart/x-mixed-replace; boundary=' + BOUNDARY.encode() + b'\r\n'
+                     b'Cache-Control: no-cache\r\nConnection: close\r\n\r\n')
+        sent_version = None
+        while True:
+            with self._lock:
+                latest = self._latest.get(name)
+            if latest is None or latest[0] == sent_version:
+                await self._event(name).wait()
+                continue
+            version, _, _, result = latest
+            jpeg = await self._jpeg(name, version, result)
+            sent_version = version
+            if jpeg is None:
+                continue
+            writer.write(f'--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n'.encode()
+                         + jpeg + b'\r\n')
+            # waits until the client has taken the frame; results published meanwhile are skipped
+            await writer.drain()
+            self.sent += 1
+
+    @staticmethod
+    def _respond(writer: asyncio.StreamWriter, status: str, content_type: str, body: bytes) -> None:
+        writer.write(f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n'
+                     f'Cache-Control: no-cache\r\nConnection: close\r\n\r\n'.encode() + body)
+
+    def _index(self) -> bytes:
+        with self._lock:
+            names = sorted(self._latest)
+        streams = ''.join(f'<h3>{name}</h3><img src="/stream/{quote(name)}"><br>'
+                          f'<a href="/detections/{quote(name)}">detections</a>' for name in names)
+        return f'<html><body>{streams or "No streams yet, reload once inference runs."}</body></html>'.encode()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.clients += 1
+        try:
+            request = (await reader.readline()).decode('latin-1').split()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass # headers are not needed
+            if len(request) < 2 or request[0] != 'GET':
+                self._respond(writer, '405 Method Not Allowed', 'text/plain', b'Only GET is supported.')
+                return
+            path = unquote(request[1].split('?')[0]).rstrip('/') or '/'
+            with self._lock:
+                names = set(self._latest)
+
+            if path == '/':
+                self._respond(writer, '200 OK', 'text/html', self._index())
+            elif path == '/detections':
+                body = {name: self._detections(name) for name in sorted(names)}
+                self._respond(writer, '200 OK', 'application/json', json.dumps(body).encode())
+            elif path.startswith('/detections/') and path[len('/detections/'):] in names:
+                body = self._detections(path[len('/detections/'):])
+                self._respond(writer, '200 OK', 'application/json', json.dumps(body).encode())
+            elif path.startswith('/stream/') and path[len('/stream/'):] in names:
+                await self._send_stream(path[len('/stream/'):], writer)
+            else:
+                self._respond(writer, '404 Not Found', 'text/plain', b'Unknown stream.')
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # client went away
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    async def _serve(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stopped = self._loop.create_future()
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await self._stopped
+            self._loop = None
+            for task in asyncio.all_tasks() - {asyncio.current_task()}:
+                task.cancel() # open MJPEG streams never end on their own
+
+    def _run(self) -> None:
+        try:
+            asyncio.run(self._serve())
+        except OSError as e:
+            self._error = e # e.g. port in use
+        finally:
+            self._ready.set()
+
+    def start(self):
+        """Starts the server on a background thread."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        print(f'Streaming results on {self.url}')
+        return self
+
+    def stop(self) -> dict:
+        """
+        Stops the server.
+
+        Returns:
+            stats (dict): Number of 'encoded' frames and of frames 'sent' to clients.
+        """
+        loop = self._loop
+        if loop is not None and self._thread.is_alive():
+            loop.call_soon_threadsafe(lambda: self._stopped.done() or self._stopped.set_result(None))
+            self._thread.join(timeout=2)
+        return {'encoded': self.encoded, 'sent': self.sent}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
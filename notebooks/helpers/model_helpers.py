@@ -1,76 +1,294 @@
 import os
-from ultralytics import YOLO
 import cv2
 from pprint import pprint
 import numpy as np
-import re
-
-def find_device_port(device):
-    """Finds correct device port and connects to it."""
-    print(f'Trying device {device}')
-    cap = cv2.VideoCapture(device)
-    device = 0
-    while not cap.isOpened() and device <= 200:
-        print(f'Trying device {device}')
-        cap = cv2.VideoCapture(device)
-        if cap.isOpened():
-            break
-        device += 1
-    if not cap.isOpened():
-        print('Connection to camera could not be established.')
-    print(f'Successful with device port: {device}')
-    return cap
-
-def get_trained_model(path: str, run=None) -> str:
+import threading
+from collections import OrderedDict
+
+from device_helpers import find_device_port
+from stream_helpers import run_pipeline, run_streams
+from video_helpers import process_video
+from export_helpers import load_model, export_path
+from motion_helpers import AdaptiveInference
+from mjpeg_server import MJPEGServer
+from detection_records import DetectionRecorder
+from tracking_helpers import TrackedInference
+from profiling_helpers import LoopProfiler
+from run_index import update_run_index, select_run
+from sweep_helpers import MODEL_SIZES
+from config import MODELS_DIR
+
+class ModelRegistry:
     """
-    Select the subdirectory with the highest number from a given directory and accesses the trained model If a run is specified, returns model of that run.
+    Process-wide cache of loaded models with warm-up and LRU eviction.
 
-    Args:
-        path (str): The directory path containing the numbered subdirectories.
-        run (int): Specific experiment run. Default: None.
+    Models are keyed by weights path, modification time, backend and precision, so a retrained best.pt
+    is loaded again while switching between already loaded models is free.
 
-    Returns:
-        model (str): Path to trained model.
+    Args:
+        budget_mb (float): Estimated memory (in MB) the cached models may use. Defaults to 1024.
     """
 
-    group = path.split('\\')[-1] if os.name == 'nt' else path.split('/')[-1] # extract group name depending on operating system
-    path = os.path.join(path, 'runs')
-    subdirs = [d for d in os.listdir(path) if os.path.isdir(os.path.join(path, d))]
-    highest_number = -1
-    highest_subdir = ""
-
-    # if run is specified, get selected run
-    # todo: error handling -> not for me, for you. When there are errors. inevitably. have fun!
-    if run is not None and run != 1:
-        specific_run = str(run)
-        for subdir in subdirs:
-            if subdir.endswith(specific_run):
-                target_subdir = subdir
-                break
-        model = os.path.join(path, target_subdir, 'weights', 'best.pt')
-        print(f'Using {model}')
+    def __init__(self, budget_mb: float = 1024):
+        self.budget_mb = budget_mb
+        self._models = OrderedDict() # key -> (model, size_mb), least recently used first
+        self._warmups = dict() # id(model) -> warm-up thread
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size_mb(model, path: str) -> float:
+        """Estimates the memory of a model from its parameters or, for exported models, its files."""
+        try:
+            return sum(p.numel() * p.element_size() for p in model.model.parameters()) / 2**20
+        except Exception:
+            if os.path.isdir(path):
+                return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files) / 2**20
+            return os.path.getsize(path) / 2**20
+
+    @staticmethod
+    def _warmup(model) -> None:
+        """Runs one dummy forward pass so that the first real frame does not pay the setup cost."""
+        try:
+            model(np.zeros((480, 640, 3), dtype=np.uint8), verbose=False)
+        except Exception as e:
+            print(f'Warm-up failed: {e}')
+
+    def get(self,
+            weights: str,
+            backend: str = 'pt',
+            precision: str = 'fp32',
+            warmup: bool = True,
+            background: bool = False):
+        """
+        Returns the cached model for the given weights or loads (and warms up) it.
+
+        Args:
+            weights (str): Path to the .pt file. Missing pretrained weights (e.g. yolov8n.pt) are downloaded.
+            backend (str): 'pt', 'auto', 'openvino' or 'onnx' (see export_helpers.load_model). Defaults to 'pt'.
+            precision (str): 'fp32', 'fp16' or 'int8'. Defaults to 'fp32'.
+            warmup (bool): If True, a dummy forward pass runs after loading. Defaults to True.
+            background (bool): If True, the warm-up runs on a background thread (for preloading) and the model
+                must not be used before wait(model). A later get() of the same model waits for it. Defaults to False.
+
+        Returns:
+            model: Instance of YOLO-model object.
+        """
+        weights = os.path.abspath(weights)
+        # missing pretrained weights are downloaded by ultralytics while loading
+        mtime = os.path.getmtime(weights) if os.path.exists(weights) else None
+        key = (weights, mtime, backend, precision)
+        model = None
+        with self._lock:
+            if key in self._models:
+                model, _ = self._models[key]
+                # a model that was trained in-place no longer holds the weights it was loaded from
+                if getattr(model, 'trainer', None) is None:
+                    self._models.move_to_end(key)
+                else:
+                    del self._models[key]
+                    model = None
+        if model is not None:
+            self.wait(model) # a preloaded model is handed out only after its warm-up
+            return model
+
+        model = load_model(weights, backend, precision)
+        if mtime is None and os.path.exists(weights):
+            key = (weights, os.path.getmtime(weights), backend, precision)
+        size = self._size_mb(model, weights if backend == 'pt' else export_path(weights, backend, precision))
+        with self._lock:
+            # drop entries of older versions of the same weights
+            for old in [k for k in self._models if k[0] == weights and k[2:] == key[2:]]:
+                del self._models[old]
+            self._models[key] = (model, size)
+            self._evict()
+        if warmup and background:
+            thread = threading.Thread(target=self._warmup, args=(model,), daemon=True)
+            self._warmups[id(model)] = thread
+            thread.start()
+        elif warmup:
+            self._warmup(model)
         return model
 
-    # if run is 1 or not specified, get latest model
-    for subdir in subdirs:
-        match = re.search(r'(\d+)$', subdir)
-        if match:
-            number = int(match.group())
-            if number > highest_number:
-                highest_number = number
-                highest_subdir = subdir
+    def _evict(self) -> None:
+        """Removes least recently used models until the cache fits into the budget (keeps at least one)."""
+        while len(self._models) > 1 and sum(size for _, size in self._models.values()) > self.budget_mb:
+            key, (model, _) = self._models.popitem(last=False)
+            self._warmups.pop(id(model), None)
+            print(f'Removed {key[0]} ({key[2]}) from model cache')
+
+    def wait(self, model, timeout: float = None) -> None:
+        """Blocks until the background warm-up of a model has finished."""
+        thread = self._warmups.get(id(model))
+        if thread is not None:
+            thread.join(timeout)
+            if not thread.is_alive():
+                self._warmups.pop(id(model), None)
+
+    def clear(self) -> None:
+        """Removes all models from the cache."""
+        with self._lock:
+            self._models.clear()
+            self._warmups.clear()
+
+    def info(self) -> list:
+        """Lists the cached models (least recently used first) with their estimated size in MB."""
+        with self._lock:
+            return [{'weights': k[0], 'backend': k[2], 'precision': k[3], 'size_mb': round(size, 1)}
+                    for k, (_, size) in self._models.items()]
+
+
+# shared by all notebook cells of one kernel
+MODEL_REGISTRY = ModelRegistry()
+
+
+def get_model(weights: str,
+              backend: str = 'pt',
+              precision: str = 'fp32',
+              warmup: bool = True):
+    """
+    Loads a model through the process-wide model cache. Use instead of YOLO(path), e.g.
+    get_model(get_trained_model(PATH)). The model is warmed up before it is returned.
+
+    Args:
+        weights (str): Path to the .pt file.
+        backend (str): 'pt', 'auto', 'openvino' or 'onnx'. Defaults to 'pt'.
+        precision (str): 'fp32', 'fp16' or 'int8'. Defaults to 'fp32'.
+        warmup (bool): If False, no dummy forward pass runs, e.g. for a model that is trained next. Defaults to True.
+
+    Return:
+        model: Instance of YOLO-model object.
+
+    Raises:
+        None.
+    """
+    return MODEL_REGISTRY.get(weights, backend, precision, warmup)
+
+
+def get_trained_model(path: str,
+                      run=None,
+                      select: str = 'latest',
+                      metric: str = None,
+                      preload: str = None,
+                      precision: str = 'fp32') -> str:
+    """
+    Selects a trained model of a group from its runs. The runs are kept in an index (runs/.run_index.json,
+    see run_index) with name, creation time, weights and final metrics, which is updated as new runs appear.
+
+    Args:
+        path (str): The group directory containing 'runs'.
+        run (int | str): Specific experiment run: 1 = <group>, 2 = <group>2, ... or the folder name. Default: None.
+        select (str): If no run is given: 'latest' (highest run number) or 'best' (highest final metric).
+            Defaults to 'latest'.
+        metric (str): Metric for select='best', e.g. 'metrics/mAP50(B)'. Defaults to None
+            (mAP50-95 for detection, top-1 accuracy for classification).
+        preload (str): If given, the model is loaded into the model cache with this backend ('pt', 'auto',
+            'openvino' or 'onnx') and warmed up in the background, so that get_model(model, preload) returns it
+            immediately. Defaults to None.
+        precision (str): Precision for preload. Defaults to 'fp32'.
+
+    Returns:
+        model (str): Path to trained model. Use get_model(model, backend='auto') to run it
+            with a CPU-optimized backend.
+
+    Raises:
+        FileNotFoundError: If there is no runs folder.
+        ValueError: If the run does not exist or no run has trained weights.
+    """
+    group = os.path.basename(os.path.normpath(path))
+    index = update_run_index(path)
+    name = select_run(index, group, run=run, select=select, metric=metric)
 
-    if highest_subdir == "" or run == 1:
-        highest_subdir = group
+    model = index['runs'][name]['weights']
+    metrics = {k.split('/')[-1]: round(v, 4) for k, v in index['runs'][name]['metrics'].items() if k != 'epoch'}
+    print(f'Using {model}', metrics if metrics else '')
+    if preload is not None:
+        MODEL_REGISTRY.get(model, preload, precision, background=True)
+    return model
 
-    latest_model = os.path.join(path, highest_subdir, 'weights', 'best.pt')
-    print(f'Using {latest_model}')
-    return latest_model
+
+def _finish(cap, recorder, adaptive, tracked, windows: bool = True) -> None:
+    """Cleanup of the inference loops: releases the capture, closes the recorder and prints the summaries."""
+    cap.release()
+    if windows:
+        cv2.destroyAllWindows()
+    if recorder is not None:
+        stats = recorder.close()
+        print(f"Recorded {stats['rows']} detections of {stats['frames']} frames in {recorder.path}")
+    if adaptive is not None:
+        adaptive.print_summary()
+    if tracked is not None:
+        tracked.print_summary()
+
+
+def _serve_stream(cap, name: str, live: bool, predict, verbose: bool, port: int) -> dict:
+    """Runs inference on one source and shows the results in the browser (see mjpeg_server.MJPEGServer)."""
+    with MJPEGServer(port=port) as server:
+        stream = {'name': name, 'cap': cap, 'live': live, 'output': server}
+        try:
+            return run_streams([stream], lambda frames, verbose: [predict(f, verbose=verbose)[0] for f in frames],
+                               verbose=verbose)
+        except KeyboardInterrupt:
+            return {stream['name']: stream['stats'].summary()}
+
+
+def _inference_loop(cap, infer, verbose: bool, render: bool, profiler) -> None:
+    """Reads, predicts and displays frames until the source ends or q is pressed."""
+    # looping over all frames captured
+    prof = profiler or LoopProfiler(enabled=False)
+    try:
+        while cap.isOpened():
+            prof.start_frame()
+            with prof.stage('read'):
+                success, frame = cap.read() # reading frame
+    
+            if success: # if frame was successfully read
+    
+                # inference
+                with prof.stage('model'):
+                    results = infer(frame, verbose=verbose)
+                prof.model_speed(results)
+
+                if not render:
+                    prof.end_frame()
+                    continue # detections are only recorded, nothing is drawn
+                with prof.stage('plot'):
+                    result_image = prof.draw_overlay(results[0].plot())
+                # Convert the result to a format suitable for OpenCV if needed
+                if isinstance(result_image, np.ndarray):
+                    with prof.stage('imshow'):
+                        cv2.imshow("Model Prediction", result_image) # display frame
+    
+                # break out of loop by pressing q
+                with prof.stage('waitKey'):
+                    key = cv2.waitKey(1)
+                prof.end_frame()
+                if key & 0xFF == ord("q"):
+                    break
+            else:
+                # break out of loop once end of video file is reached
+                break
+    except KeyboardInterrupt:
+        pass # without a window the loop is stopped with Ctrl+C
+    prof.close()
 
 
 def inference_video(video_path: str,
                     model,
-                    verbose=True) -> None:
+                    verbose=True,
+                    headless: bool = False,
+                    output_path: str = None,
+                    detections_path: str = None,
+                    batch_size: int = 8,
+                    workers: int = 1,
+                    adaptive: bool = False,
+                    imgsz: int = None,
+                    roi: bool = False,
+                    port: int = None,
+                    record_path: str = None,
+                    render: bool = True,
+                    track: bool = False,
+                    detect_every: int = 1,
+                    profiler: LoopProfiler = None):
     """
     Performs inference on a video file.
 
@@ -78,45 +296,87 @@ def inference_video(video_path: str,
         video_path (str): Path to the video file.
         model (.pt): Instance of YOLO-model that performs inference.
         verbose (bool): Flag to decide whether model output is shown.
+        headless (bool): If True, no window is opened and the video is processed in batches
+            (see video_helpers.process_video). Defaults to False.
+        output_path (str): Headless only. Path of the annotated output video. Defaults to None.
+        detections_path (str): Headless only. Path of the per-frame detections file (.csv). Defaults to None.
+        batch_size (int): Headless only. Number of frames per forward pass. Defaults to 8.
+        workers (int): Headless only. Number of worker processes the video segments are spread over. Defaults to 1.
+        adaptive (bool): If True, inference is skipped on frames without motion and the last detections are reused
+            (see motion_helpers.AdaptiveInference). Not used in headless mode. Defaults to False.
+        imgsz (int): Inference size, smaller is faster. Defaults to None (model default).
+        roi (bool): Adaptive only. If True, detection runs only on the moving region of the frame. Defaults to False.
+        port (int): If given, no window is opened and the annotated frames and detections are served on
+            http://127.0.0.1:<port>/ instead (see mjpeg_server.MJPEGServer). Defaults to None.
+        record_path (str): If given, the detections of every frame (frame index, timestamp, class, confidence, box,
+            track id) are written as columnar chunks to this directory (see detection_records.DetectionRecorder).
+            Defaults to None.
+        render (bool): If False, results are not drawn or displayed, which saves the cost of plot(). Useful together
+            with record_path. Defaults to True.
+        track (bool): If True, detections are tracked across frames with stable ids and object counts and dwell times
+            are printed at the end (see tracking_helpers.TrackedInference). Defaults to False.
+        detect_every (int): Track only. Run the detector on every n-th frame and move the tracks in between. Defaults to 1.
+        profiler (LoopProfiler): If given, the time of each stage of the loop (read, model with preprocess/forward/
+            postprocess, plot, imshow, waitKey) is measured and reported, see profiling_helpers.LoopProfiler.
+            Not used with port or pipelined. Defaults to None.
 
     Return:
-        None.
+        None. In headless mode a summary dict with processed frames, seconds and FPS, with port the stream stats.
 
     Raises:
         None.
     """
+    MODEL_REGISTRY.wait(model)
+    if headless:
+        return process_video(video_path, model,
+                             output_path=output_path,
+                             detections_path=detections_path,
+                             batch_size=batch_size,
+                             workers=workers,
+                             verbose=verbose)
+
+    if adaptive:
+        predict = AdaptiveInference(model, imgsz=imgsz, roi=roi, verbose=verbose)
+    elif imgsz is not None:
+        predict = lambda frame, verbose: model(frame, verbose=verbose, imgsz=imgsz)
+    else:
+        predict = model
+    recorder = DetectionRecorder(record_path) if record_path is not None else None
+    tracked = TrackedInference(predict, detect_every=detect_every, verbose=verbose) if track else None
+    infer = recorder.record(tracked or predict, os.path.basename(video_path)) if recorder is not None else tracked or predict
+
     # defining capturing device (in this case: path)
     cap = cv2.VideoCapture(video_path) 
+    if recorder is not None:
+        cap = recorder.capture(cap, live=False) # records keep the frame numbers of the video
+    if tracked is not None:
+        tracked.fps = cap.get(cv2.CAP_PROP_FPS) or None # dwell times in video time
 
-    # looping over the video frames and performing inference on each frame
-    while cap.isOpened():
-        success, frame = cap.read() # reading frame
-    
-        if success: # if frame was successfully read
-    
-            # inference
-            results = model(frame, verbose=verbose)
-    
-            result_image = results[0].plot()
-            # Convert the result to a format suitable for OpenCV if needed
-            if isinstance(result_image, np.ndarray):
-                cv2.imshow("Model Prediction", result_image) # display frame
-    
-            # break out of loop by pressing q
-            if cv2.waitKey(1) & 0xFF == ord("q"):
-                break
-        else:
-            # break out of loop once end of video file is reached
-            break
-    
-    # clean up: close all windows
-    cap.release()
-    cv2.destroyAllWindows()
+    if port is not None:
+        try:
+            return _serve_stream(cap, os.path.basename(video_path), False, infer, verbose, port)
+        finally:
+            _finish(cap, recorder, predict if adaptive else None, tracked, windows=False)
+
+    try:
+        _inference_loop(cap, infer, verbose, render, profiler)
+    finally:
+        _finish(cap, recorder, predict if adaptive else None, tracked)
 
 
 def inference_webcam(model,
                      device: int = 0,
-                     verbose=False) -> None:
+                     verbose=False,
+                     pipelined: bool = False,
+                     adaptive: bool = False,
+                     imgsz: int = None,
+                     roi: bool = False,
+                     port: int = None,
+                     record_path: str = None,
+                     render: bool = True,
+                     track: bool = False,
+                     detect_every: int = 1,
+                     profiler: LoopProfiler = None) -> None:
     """
     Performs inference on a video file.
 
@@ -124,6 +384,25 @@ def inference_webcam(model,
         model (.pt): Instance of YOLO-model that performs inference.
         device (int): Specifies capturing device.
         verbose (bool): Flag to decide whether model output is shown. Defaults to False.
+        pipelined (bool): If True, capturing, inference and display run in separate stages and stale frames
+            are dropped (see stream_helpers.run_pipeline). Prints per-stage FPS and latency. Defaults to False.
+        adaptive (bool): If True, inference is skipped on frames without motion and the last detections are reused
+            (see motion_helpers.AdaptiveInference). Defaults to False.
+        imgsz (int): Inference size, smaller is faster. Defaults to None (model default).
+        roi (bool): Adaptive only. If True, detection runs only on the moving region of the frame. Defaults to False.
+        port (int): If given, no window is opened and the annotated frames and detections are served on
+            http://127.0.0.1:<port>/ instead (see mjpeg_server.MJPEGServer). Stop with Ctrl+C. Defaults to None.
+        record_path (str): If given, the detections of every frame (frame index, timestamp, class, confidence, box,
+            track id) are written as columnar chunks to this directory (see detection_records.DetectionRecorder).
+            Defaults to None.
+        render (bool): If False, results are not drawn or displayed, which saves the cost of plot(). Useful together
+            with record_path. Defaults to True.
+        track (bool): If True, detections are tracked across frames with stable ids and object counts and dwell times
+            are printed at the end (see tracking_helpers.TrackedInference). Defaults to False.
+        detect_every (int): Track only. Run the detector on every n-th frame and move the tracks in between. Defaults to 1.
+        profiler (LoopProfiler): If given, the time of each stage of the loop (read, model with preprocess/forward/
+            postprocess, plot, imshow, waitKey) is measured and reported, see profiling_helpers.LoopProfiler.
+            Not used with port or pipelined. Defaults to None.
 
     Return:
         None.
@@ -131,48 +410,123 @@ def inference_webcam(model,
     Raises:
         None.
     """
+    MODEL_REGISTRY.wait(model)
+    if adaptive:
+        predict = AdaptiveInference(model, imgsz=imgsz, roi=roi, verbose=verbose)
+    elif imgsz is not None:
+        predict = lambda frame, verbose: model(frame, verbose=verbose, imgsz=imgsz)
+    else:
+        predict = model
+    recorder = DetectionRecorder(record_path) if record_path is not None else None
+    tracked = TrackedInference(predict, detect_every=detect_every, verbose=verbose) if track else None
+    infer = recorder.record(tracked or predict, f'camera {device}') if recorder is not None else tracked or predict
+
     # accessing the capturing device
     cap = find_device_port(device)
-    print('Camera recognized: ', cap.open(device))
-
-    # looping over all frames captured
-    while cap.isOpened():
-        success, frame = cap.read() # reading frame
-    
-        if success: # if frame was successfully read
-    
-            # inference
-            results = model(frame, verbose=verbose)
-    
-            result_image = results[0].plot()
-            # Convert the result to a format suitable for OpenCV if needed
-            if isinstance(result_image, np.ndarray):
-                cv2.imshow("Model Prediction", result_image) # display frame
-    
-            # break out of loop by pressing q
-            if cv2.waitKey(1) & 0xFF == ord("q"):
-                break
+    print('Camera recognized: ', cap.isOpened())
+    if recorder is not None:
+        cap = recorder.capture(cap)
+
+    if port is not None:
+        try:
+            _serve_stream(cap, f'camera {device}', True, infer, verbose, port)
+        finally:
+            _finish(cap, recorder, predict if adaptive else None, tracked, windows=False)
+        return
+
+    try:
+        if pipelined:
+            try:
+                run_pipeline(cap, infer, verbose=verbose, render=render)
+            except KeyboardInterrupt:
+                pass
         else:
-            # break out of loop once end of video file is reached
-            break
-    
-    # clean up: close all windows
-    cap.release()
-    cv2.destroyAllWindows()
+            _inference_loop(cap, infer, verbose, render, profiler)
+    finally:
+        _finish(cap, recorder, predict if adaptive else None, tracked)
+
+
+def inference_streams(sources: list,
+                      model,
+                      outputs: list = None,
+                      verbose: bool = False,
+                      batch_size: int = None,
+                      imgsz: int = None,
+                      report_every: float = 5.0) -> dict:
+    """
+    Performs inference on several cameras and video files at once with one shared model.
+    Frames of all sources are batched into one forward pass (see stream_helpers.run_streams).
 
+    Args:
+        sources (list): Camera indices (int) and/or video paths (str).
+        model (.pt): Instance of YOLO-model that performs inference.
+        outputs (list): Output per source: 'window', a path of an annotated output video, a callable
+            output(name, frame_id, result) such as a started mjpeg_server.MJPEGServer, or None.
+            Defaults to None (a window per source).
+        verbose (bool): Flag to decide whether model output is shown. Defaults to False.
+        batch_size (int): Maximum number of frames per forward pass. Defaults to None (one per source).
+        imgsz (int): Inference size, smaller is faster. Defaults to None (model default).
+        report_every (float): Interval in seconds in which statistics are printed. 0 disables it. Defaults to 5.
 
-def choose_model(task: str):
+    Return:
+        stats (dict): Per-stream FPS, latency, processed and dropped counts and the per-batch inference stats.
+
+    Raises:
+        ValueError: If the number of outputs does not match the number of sources.
+    """
+    outputs = outputs or ['window'] * len(sources)
+    if len(outputs) != len(sources):
+        raise ValueError(f'Got {len(outputs)} outputs for {len(sources)} sources.')
+    MODEL_REGISTRY.wait(model)
+    if imgsz is not None:
+        predict = lambda frames, verbose: model(frames, verbose=verbose, imgsz=imgsz)
+    else:
+        predict = model
+
+    streams = []
+    for i, (source, output) in enumerate(zip(sources, outputs)):
+        if isinstance(source, int):
+            # accessing the capturing device
+            cap, name, live = find_device_port(source), f'camera {source}', True
+        else:
+            # defining capturing device (in this case: path)
+            cap, name, live = cv2.VideoCapture(source), os.path.basename(source), False
+        print(f'{name} recognized: ', cap.isOpened())
+        if any(stream['name'] == name for stream in streams):
+            name = f'{name} ({i})'
+        streams.append({'name': name, 'cap': cap, 'live': live, 'output': output})
+
+    try:
+        stats = run_streams(streams, predict, verbose=verbose, batch_size=batch_size, report_every=report_every)
+    finally:
+        # clean up: release all sources and close all windows
+        for stream in streams:
+            stream['cap'].release()
+        if 'window' in outputs:
+            cv2.destroyAllWindows()
+    return stats
+
+
+def choose_model(task: str,
+                 backend: str = 'pt',
+                 precision: str = 'fp32',
+                 size: str = None):
     """
     Performs inference on a video file.
 
     Args:
         task (str): Defining the task [CLS = classification, DETECT = object detection].
+        backend (str): Runtime of the model: 'pt' (PyTorch, needed for training), 'auto' (fastest installed
+            CPU backend), 'openvino' or 'onnx'. Exports are cached next to the .pt file. Defaults to 'pt'.
+        precision (str): Precision of the exported model: 'fp32', 'fp16' or 'int8'. Defaults to 'fp32'.
+        size (str): Model size out of sweep_helpers.MODEL_SIZES ('n', 's', 'm', 'l', 'x'). Defaults to None
+            (asked for with input()).
         
     Return:
         model (.pt): Instacne of YOLO-model object.
 
     Raises:
-        None.
+        ValueError: If the model size is unknown.
     """
 
     # Defining list of possible tasks --> extendable
@@ -199,32 +553,41 @@ def choose_model(task: str):
         5: 'yolov8x (Very large)'
     }
 
+    if size is not None:
+        if size not in MODEL_SIZES:
+            raise ValueError(f'Unknown model size {size}. Choose from {MODEL_SIZES}.')
+        choice = MODEL_SIZES.index(size) + 1
+
     # displaying available models and taking in user choice, then returning model
-    print('The available models for this task are:\n')
+    if size is None:
+        print('The available models for this task are:\n')
     if task == 'CLS':
-        pprint(cls_model_dict)
-        choice = int(input('Choose a model by entering the model number: '))
+        if size is None:
+            pprint(cls_model_dict)
+            choice = int(input('Choose a model by entering the model number: '))
         model = cls_model_dict.get(choice)
-        return YOLO(os.path.join('..', 'models', model.split()[0]+'.pt'))
+        return get_model(os.path.join(MODELS_DIR, model.split()[0]+'.pt'), backend, precision, warmup=backend != 'pt')
         
     # displaying available models and taking in user choice, then returning model
     if task == 'DETECT':
-        pprint(detect_model_dict)
-        choice = int(input('Choose a model by entering the model number: '))
+        if size is None:
+            pprint(detect_model_dict)
+            choice = int(input('Choose a model by entering the model number: '))
         model = detect_model_dict.get(choice)
-        return YOLO(os.path.join('..', 'models', model.split()[0]+'.pt'))
+        return get_model(os.path.join(MODELS_DIR, model.split()[0]+'.pt'), backend, precision, warmup=backend != 'pt')
 
     if task not in task_list:
         print('Please choose a valid task.')
         return None
 
 
-def set_training_config(path: str):
+def set_training_config(path: str, epochs: int = None):
     """
     Sets configuration for model training.
 
     Args:
         path (str): Path to data directory.
+        epochs (int): Number of epochs. Defaults to None (asked for with input()).
         
     Return:
         epochs (.pt): Instacne of YOLO-model object.
@@ -235,7 +598,8 @@ def set_training_config(path: str):
     Raises:
         None.
     """
-    epochs = int(input('How many epochs: '))
+    if epochs is None:
+        epochs = int(input('How many epochs: '))
     data_path = os.path.join(path, 'config.yaml')
     group = path.split('\\')[-1] if os.name == 'nt' else path.split('/')[-1] # extract group name depending on operating system
     name = f'{group}'
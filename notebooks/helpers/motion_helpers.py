@@ -0,0 +1,174 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Decides with a cheap frame difference whether a frame changed enough to run inference on it.
+
+    The current frame is compared to the frame of the last inference on a small, blurred grayscale copy,
+    so slow changes add up until they trigger a new inference.
+
+    Args:
+        threshold (float): Fraction of changed pixels above which the frame counts as changed. Defaults to 0.005.
+        pixel_delta (int): Minimum gray value difference for a pixel to count as changed. Defaults to 25.
+        width (int): Width of the downscaled frame used for the difference. Defaults to 160.
+        max_skip (int): Maximum number of frames in a row that are skipped. Defaults to 30.
+    """
+
+    def __init__(self,
+                 threshold: float = 0.005,
+                 pixel_delta: int = 25,
+                 width: int = 160,
+                 max_skip: int = 30):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.width = width
+        self.max_skip = max_skip
+        self._reference = None
+        self._skipped_in_row = 0
+
+    def _small_gray(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, round(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def check(self, frame: np.ndarray):
+        """
+        Compares a frame to the reference frame.
+
+        Args:
+            frame (np.ndarray): BGR frame.
+
+        Returns:
+            infer (bool): True if inference should run on this frame.
+            score (float): Fraction of changed pixels.
+            region (tuple): (x0, y0, x1, y1) of the changed region in frame coordinates, None if nothing changed.
+        """
+        gray = self._small_gray(frame)
+        if self._reference is None or self._reference.shape != gray.shape:
+            self._reference = gray
+            self._skipped_in_row = 0
+            return True, 1.0, None
+
+        mask = cv2.absdiff(gray, self._reference) > self.pixel_delta
+        score = float(mask.mean())
+        region = None
+        if score > 0:
+            ys, xs = np.nonzero(mask)
+            factor = frame.shape[1] / gray.shape[1]
+            region = (int(xs.min() * factor), int(ys.min() * factor),
+                      int((xs.max() + 1) * factor), int((ys.max() + 1) * factor))
+
+        if score >= self.threshold or self._skipped_in_row >= self.max_skip:
+            self._reference = gray
+            self._skipped_in_row = 0
+            return True, score, region
+        self._skipped_in_row += 1
+        return False, score, region
+
+
+class AdaptiveInference:
+    """
+    Wraps a YOLO model so that inference only runs on frames with motion, optionally only on the moving region.
+
+    Instances are called like the model itself (results = adaptive(frame)), so they can replace the model in
+    the inference loops. On skipped frames the last results are returned with the current frame as image.
+
+    Args:
+        model (.pt): Instance of YOLO-model that performs inference.
+        imgsz (int): Inference size passed to the model. Defaults to None (model default).
+        roi (bool): If True, detection models only run on the moving region of the frame; detections outside of
+            it are carried over from the last inference. Defaults to False.
+        roi_padding (int): Pixels added around the moving region. Defaults to 32.
+        gate (MotionGate): Motion detector. Defaults to MotionGate().
+        verbose (bool): Flag to decide whether model output is shown. Defaults to False.
+    """
+
+    def __init__(self,
+                 model,
+                 imgsz: int = None,
+                 roi: bool = False,
+                 roi_padding: int = 32,
+                 gate: MotionGate = None,
+                 verbose: bool = False):
+        self.model = model
+        self.imgsz = imgsz
+        self.roi = roi and getattr(model, 'task', 'detect') == 'detect'
+        self.roi_padding = roi_padding
+        self.gate = gate or MotionGate()
+        self.verbose = verbose
+        self.frames = 0
+        self.inferred = 0
+        self._last = None
+        self._start = None
+
+    def _predict(self, frame: np.ndarray, verbose: bool):
+        kwargs = {'verbose': verbose}
+        if self.imgsz is not None:
+            kwargs['imgsz'] = self.imgsz
+        return self.model(frame, **kwargs)
+
+    def _predict_region(self, frame: np.ndarray, region: tuple, verbose: bool):
+        """
+        Runs the model on the padded region and maps the boxes back to frame coordinates. Boxes of the last
+        results that lie completely outside the padded region are kept, so static objects stay in the result.
+        """
+        h, w = frame.shape[:2]
+        x0, y0 = max(0, region[0] - self.roi_padding), max(0, region[1] - self.roi_padding)
+        x1, y1 = min(w, region[2] + self.roi_padding), min(h, region[3] + self.roi_padding)
+        results = self._predict(frame[y0:y1, x0:x1], verbose)
+        result = results[0]
+        boxes = result.boxes
+        data = np.column_stack([boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy()])
+        data[:, [0, 2]] += x0
+        data[:, [1, 3]] += y0
+
+        last = self._last[0].boxes if self._last is not None else None
+        if last is not None and len(last):
+            xyxy = last.xyxy.cpu().numpy()
+            outside = (xyxy[:, 2] <= x0) | (xyxy[:, 0] >= x1) | (xyxy[:, 3] <= y0) | (xyxy[:, 1] >= y1)
+            kept = np.column_stack([xyxy, last.conf.cpu().numpy(), last.cls.cpu().numpy()])[outside]
+            data = np.concatenate([kept, data])
+        result.orig_img = frame
+        result.orig_shape = frame.shape[:2]
+        result.update(boxes=data.astype(np.float32))
+        return results
+
+    def __call__(self, frame: np.ndarray, verbose: bool = None):
+        verbose = self.verbose if verbose is None else verbose
+        if self._start is None:
+            self._start = time.perf_counter()
+        self.frames += 1
+
+        infer, _, region = self.gate.check(frame)
+        if not infer and self._last is not None:
+            # reuse the last detections on the current image
+            self._last[0].orig_img = frame
+            return self._last
+
+        h, w = frame.shape[:2]
+        if self.roi and region is not None and (region[2] - region[0]) * (region[3] - region[1]) < 0.5 * h * w:
+            results = self._predict_region(frame, region, verbose)
+        else:
+            results = self._predict(frame, verbose)
+        self.inferred += 1
+        self._last = results
+        return results
+
+    def summary(self) -> dict:
+        """Returns processed, inferred and skipped frames as well as the effective inference rate."""
+        elapsed = time.perf_counter() - self._start if self._start else 0
+        return {'frames': self.frames,
+                'inferred': self.inferred,
+                'skipped': self.frames - self.inferred,
+                'inference_ratio': round(self.inferred / self.frames, 3) if self.frames else 0.0,
+                'inference_fps': round(self.inferred / elapsed, 1) if elapsed > 0 else 0.0}
+
+    def print_summary(self) -> None:
+        s = self.summary()
+        print(f"Adaptive inference: {s['inferred']} of {s['frames']} frames inferred, {s['skipped']} skipped "
+              f"({s['inference_fps']} inferences/s)")
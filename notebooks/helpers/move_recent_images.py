@@ -1,19 +1,23 @@
 import os
+import json
 import time
 import shutil
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
 
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+from config import IMAGE_EXTENSIONS
+
 # Ordner konfigurieren
 SOURCE_DIR = Path("/home/lernumgebung/Pictures/Webcam")
 DETECTION_DIR = Path("/home/lernumgebung/Desktop/modules/computervision/data/detection")
 
-# Bild-Endungen
-IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp']
-
 # Funktion, um den neuesten Unterordner zu finden
 def get_latest_subfolder(base_path: Path) -> Path | None:
     subdirs = [d for d in base_path.iterdir() if d.is_dir()]
@@ -21,70 +25,262 @@ def get_latest_subfolder(base_path: Path) -> Path | None:
         return None
     return max(subdirs, key=lambda d: d.stat().st_mtime)
 
-# Funktion zum Verschieben von Bildern, die in den letzten 8 Stunden erstellt wurden
-def move_recent_images(source_dir: Path, target_base_dir: Path, hours: int = 8):
-    now = time.time()
-    cutoff = now - (hours * 3600)  # Berechne die Zeit vor 8 Stunden
+# Zustand des Nachhol-Laufs (Wasserstand und Ergebnisse), damit Neustarts nichts doppelt oder gar nicht verschieben
+STATE_FILE = Path.home() / ".cache" / "computervision" / "move_recent_images.json"
+
+def load_state(state_file: Path, source_dir: Path) -> dict:
+    try:
+        with open(state_file, "r") as file:
+            return json.load(file).get(str(source_dir.resolve()), {})
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state_file: Path, source_dir: Path, state: dict):
+    try:
+        with open(state_file, "r") as file:
+            states = json.load(file)
+    except (OSError, ValueError):
+        states = {}
+    states[str(source_dir.resolve())] = state
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = state_file.with_suffix(".tmp")
+    with open(tmp, "w") as file:
+        json.dump(states, file, indent=2)
+    os.replace(tmp, state_file) # atomar, ein Abbruch hinterlässt keinen halben Zustand
+
+# Nachhol-Lauf beim Start: verschiebt alle Bilder, die seit dem letzten Lauf dazugekommen sind
+# (beim ersten Lauf die der letzten 8 Stunden)
+def move_recent_images(source_dir: Path, target_base_dir: Path, hours: int = 8,
+                       state_file: Path = STATE_FILE, workers: int = 8) -> dict:
+    state = load_state(state_file, source_dir)
+    failed_before = state.get("failed", {})
+    dir_mtime = source_dir.stat().st_mtime_ns # vor dem Durchsuchen lesen, damit kein neues Bild verloren geht
+
+    # Hat sich der Quellordner seit dem letzten Lauf nicht verändert, gibt es nichts zu tun
+    if state.get("dir_mtime") == dir_mtime and not failed_before:
+        print("ℹ️ Keine neuen Bilder gefunden.")
+        return {"moved": 0, "failed": 0}
 
-    files_moved = 0
     latest_target_folder = get_latest_subfolder(target_base_dir)
     if not latest_target_folder:
         print("⚠️ Kein Unterordner in detection gefunden.")
-        return
-
-    # Durchsuche alle Dateien im Quellordner
-    for file in source_dir.iterdir():
-        if file.is_file() and file.suffix.lower() in IMAGE_EXTENSIONS:
-            created_time = file.stat().st_ctime  # Datei-Erstellzeit
-            if created_time >= cutoff:
-                try:
-                    shutil.move(str(file), latest_target_folder / file.name)
-                    print(f"✅ {file.name} verschoben nach {latest_target_folder}")
-                    files_moved += 1
-                except Exception as e:
-                    print(f"❌ Fehler beim Verschieben {file.name}: {e}")
+        return {"moved": 0, "failed": 0}
+
+    # Ab dem Wasserstand des letzten Laufs suchen, beim ersten Lauf ab dem Zeitfenster
+    watermark = state.get("watermark", time.time() - hours * 3600)
+    new_watermark = watermark
+    candidates = []
+    # scandir liefert Dateityp und stat() aus dem Verzeichniseintrag, pro Datei höchstens ein Systemaufruf
+    with os.scandir(source_dir) as entries:
+        for entry in entries:
+            if os.path.splitext(entry.name)[1].lower() not in IMAGE_EXTENSIONS or not entry.is_file():
+                continue
+            created_time = entry.stat().st_ctime
+            if created_time >= watermark or entry.name in failed_before:
+                candidates.append(entry.name)
+                new_watermark = max(new_watermark, created_time)
+
+    def move(name):
+        try:
+            shutil.move(str(source_dir / name), latest_target_folder / name)
+            return name, None
+        except Exception as e:
+            return name, str(e)
+
+    failed = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for name, error in pool.map(move, candidates):
+            if error:
+                failed[name] = error
+                print(f"❌ Fehler beim Verschieben {name}: {error}")
+    files_moved = len(candidates) - len(failed)
+
+    save_state(state_file, source_dir, {
+        "watermark": new_watermark,
+        "dir_mtime": dir_mtime if not candidates else None, # nach Verschiebungen beim nächsten Start neu durchsuchen
+        "failed": failed,
+        "last_run": {"time": time.time(), "target": str(latest_target_folder), "moved": files_moved,
+                     "failed": len(failed)},
+    })
 
     if files_moved == 0:
         print("ℹ️ Keine neuen Bilder gefunden.")
     else:
-        print(f"📦 Insgesamt verschoben: {files_moved} Bild(er)")
+        print(f"📦 Insgesamt verschoben: {files_moved} Bild(er) nach {latest_target_folder}")
+    return {"moved": files_moved, "failed": len(failed)}
+
+# Zielordner zwischenspeichern, damit nicht bei jedem Bild alle Unterordner gelesen werden
+class TargetFolderCache:
+    def __init__(self, base_path: Path):
+        self.base_path = base_path
+        self._folder = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._stale = True
 
-# Event-Handler, der nur bei neuen Dateien aufgerufen wird
+    def get(self) -> Path | None:
+        with self._lock:
+            if self._stale:
+                self._folder = get_latest_subfolder(self.base_path)
+                self._stale = False
+            return self._folder
+
+
+# Event-Handler, der neue Dateien nur in eine Warteschlange legt; verschoben wird im Worker-Thread
 class CheeseImageHandler(FileSystemEventHandler):
-    def on_created(self, event):
-        print(f"[DEBUG] Event erkannt: {event.src_path}")
+    def __init__(self, events: queue.Queue):
+        super().__init__()
+        self.events = events
 
+    def on_created(self, event):
         if event.is_directory:
             return
-
         filepath = Path(event.src_path)
-        print(f"[DEBUG] Datei erstellt: {filepath.name}")
-
         if filepath.suffix.lower() in IMAGE_EXTENSIONS:
-            print(f"📷 Neues Bild erkannt: {filepath.name}")
-            target_folder = get_latest_subfolder(DETECTION_DIR)
-
-            if target_folder:
-                try:
-                    shutil.move(str(filepath), target_folder / filepath.name)
-                    print(f"✅ {filepath.name} verschoben nach {target_folder}")
-                except Exception as e:
-                    print(f"❌ Fehler beim Verschieben: {e}")
-            else:
-                print("⚠️ Kein Zielordner in 'detection/' gefunden!")
+            self.events.put((filepath, time.time()))
         else:
             print(f"[DEBUG] Nicht unterstützte Endung: {filepath.suffix}")
 
+    def on_moved(self, event):
+        # Manche Programme schreiben in eine temporäre Datei und benennen sie danach um
+        if not event.is_directory and Path(event.dest_path).suffix.lower() in IMAGE_EXTENSIONS:
+            self.events.put((Path(event.dest_path), time.time()))
+
+
+# Event-Handler für den Zielordner: neue Unterordner machen den zwischengespeicherten Zielordner ungültig
+class DetectionFolderHandler(FileSystemEventHandler):
+    def __init__(self, target_cache: TargetFolderCache):
+        super().__init__()
+        self.target_cache = target_cache
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            self.target_cache.invalidate()
+
+
+# Worker: wartet, bis die Dateigröße stabil ist, und verschiebt die Bilder gesammelt
+class ImageMover(threading.Thread):
+    def __init__(self,
+                 events: queue.Queue,
+                 target_cache: TargetFolderCache,
+                 settle_time: float = 0.5,
+                 batch_size: int = 32,
+                 report_every: float = 60.0):
+        super().__init__(daemon=True)
+        self.events = events
+        self.target_cache = target_cache
+        self.settle_time = settle_time
+        self.batch_size = batch_size
+        self.report_every = report_every
+        self.stop_event = threading.Event()
+        self.moved = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=1000)
+        self._pending = dict() # Pfad -> (Zeitpunkt des Events, letzte Größe, Zeitpunkt der letzten Größenänderung)
+        self._parked = dict() # Dateien, die auf einen Zielordner warten
+
+    def _collect(self):
+        try:
+            timeout = 0.1 if self._pending else 1.0
+            while True:
+                filepath, seen = self.events.get(timeout=timeout)
+                self._pending.setdefault(filepath, (seen, -1, time.time()))
+                timeout = 0
+        except queue.Empty:
+            pass
+
+    def _ready_files(self) -> list:
+        ready, now = [], time.time()
+        for filepath, (seen, size, changed) in list(self._pending.items()):
+            try:
+                current = filepath.stat().st_size
+            except FileNotFoundError:
+                del self._pending[filepath] # Datei wurde schon verschoben oder gelöscht
+                continue
+            if current != size:
+                self._pending[filepath] = (seen, current, now)
+            elif current > 0 and now - changed >= self.settle_time:
+                ready.append(filepath)
+        return ready[:self.batch_size]
+
+    def _unpark(self):
+        # Sobald es wieder einen Zielordner gibt, werden die geparkten Dateien verschoben
+        if self._parked and self.target_cache.get():
+            self._pending.update(self._parked)
+            self._parked.clear()
+
+    def _move_batch(self, files: list):
+        target_folder = self.target_cache.get()
+        if not target_folder:
+            # Einmal warnen und die Dateien parken, statt sie alle 0,1 s erneut zu prüfen
+            if not self._parked:
+                print("⚠️ Kein Zielordner in 'detection/' gefunden! Bilder bleiben im Quellordner, bis einer angelegt wird.")
+            for filepath in files:
+                self._parked[filepath] = self._pending.pop(filepath)
+            return
+        for filepath in files:
+            seen = self._pending.pop(filepath)[0]
+            try:
+                shutil.move(str(filepath), target_folder / filepath.name)
+                self.moved += 1
+                self.latencies.append(time.time() - seen)
+            except Exception as e:
+                self.failed += 1
+                print(f"❌ Fehler beim Verschieben {filepath.name}: {e}")
+        print(f"✅ {len(files)} Bild(er) verschoben nach {target_folder}")
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            'moved': self.moved,
+            'failed': self.failed,
+            'pending': len(self._pending) + len(self._parked) + self.events.qsize(),
+            'latency_p50': latencies[len(latencies) // 2] if latencies else 0.0,
+            'latency_max': latencies[-1] if latencies else 0.0,
+        }
+
+    def print_stats(self, elapsed: float):
+        s = self.stats()
+        print(f"📊 {s['moved']} verschoben ({s['moved'] / elapsed:.2f}/s), {s['failed']} Fehler, "
+              f"{s['pending']} wartend, Latenz p50 {s['latency_p50']:.2f} s, max {s['latency_max']:.2f} s")
+
+    def run(self):
+        start = last_report = time.time()
+        while not self.stop_event.is_set() or self._pending or not self.events.empty():
+            self._collect()
+            self._unpark()
+            ready = self._ready_files()
+            if ready:
+                self._move_batch(ready)
+            if self.report_every and time.time() - last_report >= self.report_every:
+                self.print_stats(time.time() - start)
+                last_report = time.time()
+            if self.stop_event.is_set() and not ready:
+                break
+        self.print_stats(max(time.time() - start, 1e-9))
+
+    def stop(self):
+        self.stop_event.set()
+
+
 # Hauptteil: Beobachte den Quellordner und verschiebe Bilder, die in den letzten 8 Stunden erstellt wurden
 if __name__ == "__main__":
     print(f"🔍 Beobachte Ordner: {SOURCE_DIR}")
 
-    # Beobachten des Ordners und Verschieben von Bildern, die in den letzten 8 Stunden erstellt wurden
+    # Bilder nachholen, die seit dem letzten Lauf (beim ersten Start: in den letzten 8 Stunden) dazugekommen sind
     move_recent_images(SOURCE_DIR, DETECTION_DIR, hours=8)
 
-    event_handler = CheeseImageHandler()
+    events = queue.Queue()
+    target_cache = TargetFolderCache(DETECTION_DIR)
+    mover = ImageMover(events, target_cache)
+    mover.start()
+
     observer = Observer()
-    observer.schedule(event_handler, path=str(SOURCE_DIR), recursive=False)
+    observer.schedule(CheeseImageHandler(events), path=str(SOURCE_DIR), recursive=False)
+    observer.schedule(DetectionFolderHandler(target_cache), path=str(DETECTION_DIR), recursive=False)
     observer.start()
 
     try:
@@ -94,3 +290,5 @@ if __name__ == "__main__":
         print("🛑 Beendet.")
         observer.stop()
     observer.join()
+    mover.stop()
+    mover.join()
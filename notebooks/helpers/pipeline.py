@@ -0,0 +1,307 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+
+import yaml
+
+from config import MODELS_DIR, set_metadata, set_image_data
+from file_handlers import prepare_folder_structure, create_config, ingest_images
+from run_index import update_run_index, select_run
+from sweep_helpers import MODEL_SIZES
+
+# stages in the order they run; a job runs the stages it lists
+STAGES = ('capture', 'split', 'config', 'train', 'export', 'benchmark')
+
+# stages that run every time: their parameters do not describe their output (capture takes new images)
+ALWAYS_RUN = ('capture',)
+
+# state file of the pipeline, lies in the group directory
+STATE_NAME = '.pipeline_state.json'
+
+# not part of the data fingerprint: training runs and files written by ultralytics while training
+IGNORED_DIRS = ('runs',)
+IGNORED_SUFFIXES = ('.cache',)
+
+
+def load_job(job_path: str) -> dict:
+    """
+    Loads a job file (.yaml/.yml, or .toml with Python 3.11+).
+
+    A job names the task, the groups and the parameters of each stage, e.g.
+
+        task: DETECT
+        groups: [gruppe1, gruppe2]        # or {gruppe1: {train: {epochs: 50}}} for per-group overrides
+        stages:
+          split: {val_size: 0.2}
+          config: {validate: true}
+          train: {size: n, epochs: 30, imgsz: 640}
+          export: {backend: openvino, precision: fp32}
+          benchmark: {frames: 300}
+
+    Args:
+        job_path (str): Path to the job file.
+
+    Returns:
+        job (dict): 'task', 'groups' (name -> stage overrides) and 'stages' (name -> parameters).
+
+    Raises:
+        ValueError: If the task, the groups or a stage are missing or unknown.
+    """
+    if job_path.endswith('.toml'):
+        import tomllib
+        with open(job_path, 'rb') as file:
+            job = tomllib.load(file)
+    else:
+        with open(job_path, 'r') as file:
+            job = yaml.safe_load(file) or {}
+
+    if job.get('task') not in ('CLS', 'DETECT'):
+        raise ValueError(f"Job {job_path} needs task 'CLS' or 'DETECT', got {job.get('task')}.")
+    groups = job.get('groups') or ([job['group']] if job.get('group') else [])
+    if not groups:
+        raise ValueError(f'Job {job_path} names no groups.')
+    job['groups'] = {str(g): {} for g in groups} if isinstance(groups, list) else \
+        {str(g): {name: params or {} for name, params in (overrides or {}).items()} for g, overrides in groups.items()}
+    job['stages'] = {name: params or {} for name, params in (job.get('stages') or {}).items()}
+    unknown = set(job['stages']).union(*job['groups'].values()) - set(STAGES)
+    if unknown:
+        raise ValueError(f'Unknown stages {sorted(unknown)}. Choose from {STAGES}.')
+    return job
+
+
+def fingerprint(path: str) -> str:
+    """
+    Hashes name, size and modification time of every file below a group directory (without the runs
+    folder and dot files), so that added, removed or changed images and labels change the fingerprint.
+    """
+    entries = []
+
+    def scan(directory, prefix):
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.startswith('.') or entry.name.endswith(IGNORED_SUFFIXES):
+                    continue
+                if entry.is_dir():
+                    if not (prefix == '' and entry.name in IGNORED_DIRS):
+                        scan(entry.path, prefix + entry.name + '/')
+                elif entry.is_file():
+                    stat = entry.stat()
+                    entries.append(f'{prefix}{entry.name}\t{stat.st_size}\t{stat.st_mtime_ns}')
+
+    if os.path.isdir(path):
+        scan(path, '')
+    return hashlib.blake2b('\n'.join(sorted(entries)).encode(), digest_size=16).hexdigest()
+
+
+def stage_key(name: str, params: dict, upstream: str) -> str:
+    """Key of a stage run: its parameters and the key of what it depends on."""
+    data = json.dumps({'stage': name, 'params': params, 'upstream': upstream}, sort_keys=True, default=str)
+    return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+
+
+def load_state(path: str) -> dict:
+    try:
+        with open(os.path.join(path, STATE_NAME), 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {'stages': {}, 'data': None}
+
+
+def save_state(path: str, state: dict) -> None:
+    target = os.path.join(path, STATE_NAME)
+    with open(target + '.tmp', 'w') as file:
+        json.dump(state, file, indent=2)
+    os.replace(target + '.tmp', target)
+
+
+def _capture(task, group, path, params, context):
+    params = dict(params)
+    if 'num_imgs' not in params or (task == 'CLS' and 'name' not in params):
+        raise ValueError("Stage capture needs 'num_imgs' (and 'name' of the class for 'CLS').")
+    name, num_imgs, delay, device = set_image_data(task, path, params.pop('device', 0), params.pop('name', None),
+                                                   params.pop('num_imgs'), params.pop('delay', 3.0))
+    from image_helpers import capture_images
+    capture_images(num_imgs, name or group, path, device=device, delay=delay, **params)
+    return {}
+
+
+def _split(task, group, path, params, context):
+    # the first run splits the dataset, later runs only assign the new images (see ingest_images)
+    if context['state']['stages'].get('split'):
+        return {'added': ingest_images(path, task, **params)}
+    prepare_folder_structure(path, task, **params)
+    return {}
+
+
+def _config(task, group, path, params, context):
+    create_config(path, task, **params)
+    return {'files': [os.path.join(path, 'config.yaml')]}
+
+
+def _train(task, group, path, params, context):
+    from ultralytics import YOLO
+    from model_helpers import set_training_config
+
+    params = dict(params)
+    size = params.pop('size', 'n')
+    if size not in MODEL_SIZES:
+        raise ValueError(f'Unknown model size {size}. Choose from {MODEL_SIZES}.')
+    epochs, data_path, name, save_dir = set_training_config(path, params.pop('epochs', 30))
+    suffix = '-cls' if task == 'CLS' else ''
+    # a new instance per group, a trained instance would carry over its weights
+    YOLO(os.path.join(MODELS_DIR, f'yolov8{size}{suffix}.pt')).train(data=data_path if task == 'DETECT' else path,
+                                                                    epochs=epochs, name=name, project=save_dir,
+                                                                    **params)
+    index = update_run_index(path)
+    weights = index['runs'][select_run(index, group)]['weights']
+    return {'weights': weights, 'files': [weights]}
+
+
+def _weights(group, path, context):
+    """Weights of the train stage, or of the latest run if the job does not train."""
+    if 'weights' not in context:
+        index = update_run_index(path)
+        context['weights'] = index['runs'][select_run(index, group)]['weights']
+    return context['weights']
+
+
+def _export(task, group, path, params, context):
+    from export_helpers import export_model
+
+    params = dict(params)
+    if params.get('precision') == 'int8' and task == 'DETECT':
+        params.setdefault('data', os.path.join(path, 'config.yaml'))
+    target = export_model(_weights(group, path, context), **params)
+    return {'export': target, 'files': [target]}
+
+
+def _benchmark(task, group, path, params, context):
+    from benchmark import run_benchmarks
+
+    out_path = os.path.join(path, 'runs', 'benchmark.json')
+    weights = context.get('export') or _weights(group, path, context)
+    results = run_benchmarks(out_path, weights, only=('inference',), **params)
+    return {'benchmark': results['benchmarks'].get('inference'), 'files': [out_path]}
+
+
+STAGE_FUNCTIONS = {'capture': _capture, 'split': _split, 'config': _config,
+                   'train': _train, 'export': _export, 'benchmark': _benchmark}
+
+
+def run_group(task: str, group: str, stages: dict, force: bool = False) -> dict:
+    """
+    Runs the stages of a job for one group without any input().
+
+    Every stage is keyed by its parameters and the key of the stage before it; the data stages start from a
+    fingerprint of the group directory. A stage whose key did not change since its last successful run and
+    whose output files still exist is skipped, so a nightly job only retrains groups with new data or changed
+    parameters. Stages of ALWAYS_RUN are never skipped. The state is saved after every stage, a failed job
+    continues at the failed stage.
+
+    Args:
+        task (str): 'CLS' or 'DETECT'.
+        group (str): Group name (see config.set_metadata).
+        stages (dict): Stage name -> parameters, see load_job.
+        force (bool): If True, all stages run even if nothing changed. Defaults to False.
+
+    Returns:
+        outputs (dict): Stage name -> output of the stage with 'skipped' (bool) and 'seconds'.
+    """
+    group, path = set_metadata(task, group)
+    state = load_state(path)
+    context = {'state': state}
+    outputs = dict()
+
+    # the data key stays valid as long as the directory looks as the pipeline left it
+    data_key = upstream = None
+    for name in STAGES:
+        if name not in stages:
+            continue
+        if name != 'capture' and data_key is None:
+            current = fingerprint(path)
+            data = state.get('data') or {}
+            data_key = upstream = data['key'] if data.get('fingerprint') == current else current
+
+        params = stages[name]
+        key = stage_key(name, params, upstream)
+        done = state['stages'].get(name)
+        unchanged = done and done['key'] == key and all(os.path.exists(f) for f in done['output'].get('files', []))
+        if not force and name not in ALWAYS_RUN and unchanged:
+            context.update(done['output'])
+            outputs[name] = dict(done['output'], skipped=True, seconds=0.0)
+            print(f'{group}: {name} unchanged, skipped.')
+            upstream = key
+            continue
+
+        print(f'{group}: running {name} ...')
+        start = time.perf_counter()
+        output = STAGE_FUNCTIONS[name](task, group, path, params, context)
+        context.update(output)
+        state['stages'][name] = {'key': key, 'output': output, 'time': time.strftime('%Y-%m-%d %H:%M:%S')}
+        # splitting moves files and config writes config.yaml, remember how the data looks after the stage
+        if data_key is not None:
+            state['data'] = {'key': data_key, 'fingerprint': fingerprint(path)}
+        save_state(path, state)
+        outputs[name] = dict(output, skipped=False, seconds=round(time.perf_counter() - start, 1))
+        upstream = key
+    return outputs
+
+
+def run_job(job, force: bool = False, groups: list = None) -> dict:
+    """
+    Runs a job for all its groups, e.g. nightly from cron. A failing group is reported and the next group runs.
+
+    Args:
+        job (str | dict): Path to a job file or a job loaded with load_job.
+        force (bool): If True, unchanged stages run as well. Defaults to False.
+        groups (list): Only run these groups of the job. Defaults to None (all).
+
+    Returns:
+        results (dict): Group -> outputs of run_group, or {'error': message} if the group failed.
+    """
+    job = load_job(job) if isinstance(job, str) else job
+    results = dict()
+    for group, overrides in job['groups'].items():
+        if groups and group not in groups:
+            continue
+        stages = {name: dict(params, **overrides.get(name, {})) for name, params in job['stages'].items()}
+        stages.update({name: params for name, params in overrides.items() if name not in stages})
+        try:
+            results[group] = run_group(job['task'], group, stages, force)
+        except Exception as e:
+            traceback.print_exc()
+            print(f'{group}: failed: {e}')
+            results[group] = {'error': str(e)}
+    return results
+
+
+def print_job(results: dict) -> None:
+    """Prints one line per group and stage."""
+    for group, outputs in results.items():
+        if 'error' in outputs:
+            print(f"{group:20s} failed: {outputs['error']}")
+            continue
+        for name, output in outputs.items():
+            status = 'skipped' if output['skipped'] else f"{output['seconds']:.1f} s"
+            print(f'{group:20s} {name:10s} {status}')
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Runs capture, split, config, train, export and benchmark '
+                                                 'of a job file without any input().')
+    parser.add_argument('job', help='job file (.yaml or .toml)')
+    parser.add_argument('--groups', nargs='+', help='only run these groups of the job')
+    parser.add_argument('--force', action='store_true', help='also run stages whose inputs did not change')
+    args = parser.parse_args(argv)
+
+    results = run_job(args.job, args.force, args.groups)
+    print_job(results)
+    return 1 if any('error' in outputs for outputs in results.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+from stream_helpers import StageStats
+
+# stages of the inference loops; preprocess, forward and postprocess are taken from the model's own timing
+STAGES = ('read', 'model', 'preprocess', 'forward', 'postprocess', 'plot', 'imshow', 'waitKey', 'frame')
+
+# keys of result.speed (milliseconds) -> stage
+SPEED_STAGES = {'preprocess': 'preprocess', 'inference': 'forward', 'postprocess': 'postprocess'}
+
+
+class _Timer:
+    """Context manager that records its elapsed time into a StageStats."""
+    __slots__ = ('stats', 't0')
+
+    def __init__(self, stats: StageStats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.stats.record(time.perf_counter() - self.t0)
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_TIMER = _NoTimer()
+
+
+class LoopProfiler:
+    """
+    Per-stage timing of the inference loops (see model_helpers.inference_video/inference_webcam).
+
+    Every stage keeps rolling FPS and latency percentiles (stream_helpers.StageStats). The counters can be
+    drawn onto the frames, written periodically to a metrics file (.json, or Prometheus text format for .prom)
+    and served as Prometheus text on http://127.0.0.1:<port>/metrics. With profile_every, cProfile runs on
+    every n-th frame only, so the profile shows the hot path without slowing every frame down.
+
+    Args:
+        window (int): Number of recent frames used for the rolling values. Defaults to 300.
+        overlay (bool): If True, FPS and stage latencies are drawn onto the displayed frames. Defaults to False.
+        metrics_path (str): File the metrics are written to every export_every seconds. Defaults to None.
+        export_every (float): Export interval in seconds. Defaults to 10.
+        port (int): If given, the metrics are served in Prometheus text format on this port. Defaults to None.
+        profile_every (int): Profile every n-th frame with cProfile, 0 disables profiling. Defaults to 0.
+        profile_path (str): File the cProfile statistics are saved to (for snakeviz etc.). Defaults to 'inference.prof'.
+        enabled (bool): If False, all calls are no-ops. Defaults to True.
+    """
+
+    def __init__(self,
+                 window: int = 300,
+                 overlay: bool = False,
+                 metrics_path: str = None,
+                 export_every: float = 10.0,
+                 port: int = None,
+                 profile_every: int = 0,
+                 profile_path: str = 'inference.prof',
+                 enabled: bool = True):
+        self.enabled = enabled
+        self.overlay = overlay
+        self.metrics_path = metrics_path
+        self.export_every = export_every
+        self.profile_every = profile_every
+        self.profile_path = profile_path
+        self.stats = {name: StageStats(name, window) for name in STAGES}
+        self._timers = {name: _Timer(s) for name, s in self.stats.items()}
+        self.frames = 0
+        self._frame_start = None
+        self._last_export = time.perf_counter()
+        self._profile = cProfile.Profile() if enabled and profile_every else None
+        self._profiling = False
+        self._server = None
+        if enabled and port is not None:
+            self._serve(port)
+        if self._profile is not None:
+            print(f'Profiling every {profile_every}. frame; for sampling with py-spy: py-spy top --pid {os.getpid()}')
+
+    def stage(self, name: str):
+        """Returns a context manager that times one stage: with profiler.stage('read'): ..."""
+        return self._timers[name] if self.enabled else _NO_TIMER
+
+    def start_frame(self) -> None:
+        if not self.enabled:
+            return
+        self._frame_start = time.perf_counter()
+        if self._profile is not None and self.frames % self.profile_every == 0:
+            self._profile.enable()
+            self._profiling = True
+
+    def end_frame(self) -> None:
+        """Records the time of the whole frame and exports the metrics when due."""
+        if not self.enabled or self._frame_start is None:
+            return
+        if self._profiling:
+            self._profile.disable()
+            self._profiling = False
+        self.stats['frame'].record(time.perf_counter() - self._frame_start)
+        self.frames += 1
+        if self.metrics_path and time.perf_counter() - self._last_export >= self.export_every:
+            self.export()
+
+    def model_speed(self, results) -> None:
+        """Splits the model time into preprocess, forward and postprocess using result.speed of ultralytics."""
+        speed = getattr(results[0], 'speed', None) if self.enabled else None
+        if speed:
+            for key, name in SPEED_STAGES.items():
+                if speed.get(key) is not None:
+                    self.stats[name].record(speed[key] / 1000)
+
+    def draw_overlay(self, image):
+        """Draws FPS and the median latency of each stage onto the image (in place)."""
+        if not (self.enabled and self.overlay) or image is None:
+            return image
+        lines = [f"FPS {self.stats['frame'].fps:5.1f}"]
+        lines += [f'{name} {s.percentiles((50,))["p50_ms"]:6.1f} ms'
+                  for name, s in self.stats.items() if s.count and name != 'frame']
+        for i, line in enumerate(lines):
+            y = 20 + 18 * i
+            cv2.putText(image, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3, cv2.LINE_AA)
+            cv2.putText(image, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
+        return image
+
+    def summary(self) -> dict:
+        """Returns the counters of all stages that were used."""
+        return {name: s.summary() for name, s in self.stats.items() if s.count}
+
+    def prometheus(self) -> str:
+        """Returns the counters in Prometheus text format."""
+        lines = ['# TYPE inference_stage_latency_seconds summary']
+        for name, s in self.stats.items():
+            if not s.count:
+                continue
+            for key, value in s.percentiles().items():
+                quantile = int(key[1:-3]) / 100
+                lines.append(f'inference_stage_latency_seconds{{stage="{name}",quantile="{quantile}"}} {value / 1000}')
+            lines.append(f'inference_stage_latency_seconds_count{{stage="{name}"}} {s.count}')
+        lines += ['# TYPE inference_fps gauge', f"inference_fps {self.stats['frame'].fps:.2f}"]
+        return '\n'.join(lines) + '\n'
+
+    def export(self) -> None:
+        """Writes the metrics file atomically (Prometheus text for .prom, JSON otherwise)."""
+        self._last_export = time.perf_counter()
+        if not self.metrics_path:
+            return
+        content = self.prometheus() if self.metrics_path.endswith('.prom') else \
+            json.dumps({'time': time.time(), 'frames': self.frames, 'stages': self.summary()}, indent=2)
+        with open(self.metrics_path + '.tmp', 'w') as file:
+            file.write(content)
+        os.replace(self.metrics_path + '.tmp', self.metrics_path)
+
+    def _serve(self, port: int) -> None:
+        profiler = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') != '/metrics':
+                    self.send_error(404)
+                    return
+                body = profiler.prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass # no log line per scrape
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f'Metrics on http://127.0.0.1:{self._server.server_address[1]}/metrics')
+
+    def print_summary(self) -> None:
+        """Prints one line per used stage."""
+        for name, s in self.summary().items():
+            print(f"{name:12s} {s['fps']:7.1f} /s  p50 {s['p50_ms']:7.2f} ms  p90 {s['p90_ms']:7.2f} ms  "
+                  f"p99 {s['p99_ms']:7.2f} ms  n={s['count']}")
+
+    def close(self) -> dict:
+        """
+        Exports the final metrics, stops the metrics endpoint and saves the profile.
+
+        Returns:
+            summary (dict): Counters of all used stages.
+        """
+        if not self.enabled:
+            return {}
+        if self.metrics_path:
+            self.export()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._profile is not None:
+            if self._profiling:
+                self._profile.disable()
+            self._profile.dump_stats(self.profile_path)
+            print(f'Profile of {(self.frames + self.profile_every - 1) // self.profile_every} frames saved to '
+                  f'{self.profile_path}, top functions:')
+            pstats.Stats(self._profile).sort_stats('cumulative').print_stats(15)
+        self.print_summary()
+        return self.summary()
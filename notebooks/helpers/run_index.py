@@ -0,0 +1,154 @@
+import csv
+import json
+import os
+import re
+
+# index file, lies in the runs folder of a group
+INDEX_NAME = '.run_index.json'
+
+# final metric used to rank runs, per task (first one present in results.csv)
+RANK_METRICS = ('metrics/mAP50-95(B)', 'metrics/accuracy_top1')
+
+
+def run_number(name: str, group: str):
+    """Returns the number of a run of ultralytics' naming scheme (group, group2, group3, ...), None for other names."""
+    if name == group:
+        return 1
+    match = re.fullmatch(re.escape(group) + r'(\d+)', name)
+    return int(match.group(1)) if match else None
+
+
+def read_final_metrics(results_path: str) -> dict:
+    """
+    Reads the metrics of the last epoch from a results.csv of ultralytics.
+
+    Args:
+        results_path (str): Path to results.csv.
+
+    Returns:
+        metrics (dict): Metric name -> value of the last row (with 'epoch'), empty if there are no rows.
+    """
+    with open(results_path, 'r', newline='') as file:
+        rows = list(csv.reader(file))
+    if len(rows) < 2:
+        return {}
+    header = [h.strip() for h in rows[0]]
+    metrics = dict()
+    for key, value in zip(header, rows[-1]):
+        try:
+            metrics[key] = float(value)
+        except ValueError:
+            continue
+    return {k: v for k, v in metrics.items() if k.startswith('metrics/') or k == 'epoch'}
+
+
+def _mtime(path: str):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def load_run_index(runs_path: str) -> dict:
+    """Loads the index of a runs folder, an empty index if there is none yet."""
+    try:
+        with open(os.path.join(runs_path, INDEX_NAME), 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {'runs': {}, 'latest': None, 'best': {}}
+
+
+def update_run_index(path: str) -> dict:
+    """
+    Brings the run index of a group folder up to date. New runs are added, runs whose results.csv changed
+    are read again and removed runs are dropped; the latest and the best run per metric are stored with
+    the index so that selecting them needs no further work.
+
+    Args:
+        path (str): Group directory containing 'runs'.
+
+    Returns:
+        index (dict): 'runs' (name -> 'number', 'created', 'weights' (absolute path), 'results_mtime', 'metrics'),
+            'latest' (name) and 'best' (metric -> name).
+
+    Raises:
+        FileNotFoundError: If there is no runs folder.
+    """
+    group = os.path.basename(os.path.normpath(path))
+    runs_path = os.path.join(path, 'runs')
+    if not os.path.isdir(runs_path):
+        raise FileNotFoundError(f'{runs_path} does not exist, train a model first.')
+    index = load_run_index(runs_path)
+    runs, changed = dict(), False
+
+    with os.scandir(runs_path) as entries:
+        for entry in entries:
+            if not entry.is_dir() or entry.name.startswith('.'):
+                continue
+            results = os.path.join(entry.path, 'results.csv')
+            results_mtime = _mtime(results)
+            # absolute, so the stored path does not depend on the working directory of the caller
+            weights = os.path.abspath(os.path.join(entry.path, 'weights', 'best.pt'))
+            known = index['runs'].get(entry.name)
+            if known is not None and known['results_mtime'] == results_mtime and known['weights'] == weights:
+                runs[entry.name] = known
+                continue
+            changed = True
+            runs[entry.name] = {'number': run_number(entry.name, group),
+                                'created': entry.stat().st_ctime,
+                                'weights': weights,
+                                'results_mtime': results_mtime,
+                                'metrics': read_final_metrics(results) if results_mtime is not None else {}}
+
+    if not changed and set(runs) == set(index['runs']):
+        return index
+
+    # latest: highest run number (ultralytics counts up), otherwise the most recently created folder
+    def age(name):
+        return (runs[name]['number'] or 0, runs[name]['created'])
+
+    trained = [n for n in runs if os.path.exists(runs[n]['weights'])]
+    best = dict()
+    for metric in {m for n in trained for m in runs[n]['metrics'] if m.startswith('metrics/')}:
+        best[metric] = max((n for n in trained if metric in runs[n]['metrics']), key=lambda n: runs[n]['metrics'][metric])
+    index = {'runs': runs, 'latest': max(trained, key=age) if trained else None, 'best': best}
+
+    with open(os.path.join(runs_path, INDEX_NAME + '.tmp'), 'w') as file:
+        json.dump(index, file, indent=2)
+    os.replace(os.path.join(runs_path, INDEX_NAME + '.tmp'), os.path.join(runs_path, INDEX_NAME))
+    return index
+
+
+def select_run(index: dict, group: str, run=None, select: str = 'latest', metric: str = None) -> str:
+    """
+    Selects a run from the index.
+
+    Args:
+        index (dict): Index of update_run_index.
+        group (str): Name of the group (base name of the runs).
+        run (int | str): Exact run: number (1 = group, 2 = group2, ...) or folder name. Defaults to None.
+        select (str): 'latest' or 'best' if no run is given. Defaults to 'latest'.
+        metric (str): Metric for 'best', e.g. 'metrics/mAP50(B)'. Defaults to None (see RANK_METRICS).
+
+    Returns:
+        name (str): Name of the run folder.
+
+    Raises:
+        ValueError: If the run, the selection or the metric does not exist.
+    """
+    runs = index['runs']
+    if run is not None:
+        name = str(run) if str(run) in runs else (group if str(run) == '1' else f'{group}{run}')
+        if name not in runs:
+            raise ValueError(f"Run {run} not found, available runs: {sorted(runs)}")
+        return name
+    if select == 'latest':
+        if index['latest'] is None:
+            raise ValueError('No run with trained weights found.')
+        return index['latest']
+    if select == 'best':
+        metric = metric or next((m for m in RANK_METRICS if m in index['best']), None)
+        if metric not in index['best']:
+            raise ValueError(f"No run with metric {metric}, available metrics: {sorted(index['best'])}")
+        return index['best'][metric]
+    raise ValueError(f"Unknown selection {select}, choose 'latest' or 'best'.")
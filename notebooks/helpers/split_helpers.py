@@ -0,0 +1,369 @@
+import errno
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from sklearn.model_selection import train_test_split
+
+from config import IMAGE_EXTENSIONS
+
+# journal of a running split, lies in the dataset folder until the split is complete
+JOURNAL_NAME = '.split_journal.json'
+
+# folder for non-destructive splits made of links (see link_split)
+SPLITS_DIR = 'splits'
+
+# persistent record of which file belongs to which subset of a split (see ingest_images)
+INDEX_NAME = '.{}_index.json'
+
+
+def scan_files(path: str, extensions: tuple = None) -> list:
+    """
+    Lists the files of a directory with a single os.scandir pass.
+
+    Args:
+        path (str): Directory to scan.
+        extensions (tuple): Only return files with these (lowercase) extensions. Defaults to None (all files).
+
+    Returns:
+        files (list): File names.
+    """
+    if not os.path.isdir(path):
+        return []
+    with os.scandir(path) as entries:
+        return [e.name for e in entries
+                if e.is_file() and (extensions is None or e.name.lower().endswith(extensions))]
+
+
+def plan_detect_split(path: str, val_size: float, exclude: set = None) -> dict:
+    """
+    Plans the split of an object detection dataset into training and validation sets without moving anything.
+
+    Args:
+        path (str): The directory path containing the 'images' and 'labels' subdirectories.
+        val_size (float): The proportion of the dataset to include in the validation split.
+        exclude (set): Image paths relative to path ('images/<file>') that are left out. Defaults to None.
+
+    Returns:
+        plan (dict): 'dirs' to create and 'moves' as [source, destination] pairs, relative to path.
+
+    Raises:
+        ValueError: If no valid image-label pairs are found.
+    """
+    img_path = os.path.join(path, 'images')
+    labels = set(scan_files(os.path.join(path, 'labels'), ('.txt',)))
+
+    # Sammle alle Bild-Label-Paare robust
+    valid_img, valid_label = [], []
+    exclude = exclude or set()
+    for img in scan_files(img_path, IMAGE_EXTENSIONS):
+        lbl_file = os.path.splitext(img)[0] + '.txt'
+        if lbl_file in labels and os.path.join('images', img) not in exclude:
+            valid_img.append(img)
+            valid_label.append(lbl_file)
+
+    if not valid_img:
+        raise ValueError(f"Keine Bilder gefunden in {img_path}!")
+
+    # Split in Training und Validation
+    x_train, x_val, y_train, y_val = train_test_split(
+        valid_img,
+        valid_label,
+        test_size=val_size,
+        train_size=1 - val_size,
+        random_state=42,
+        shuffle=True
+    )
+
+    moves = []
+    for folder, subset, files in [('images', 'train', x_train), ('labels', 'train', y_train),
+                                  ('images', 'val', x_val), ('labels', 'val', y_val)]:
+        moves += [[os.path.join(folder, f), os.path.join(folder, subset, f)] for f in files]
+    dirs = [os.path.join(folder, subset) for folder in ('images', 'labels') for subset in ('train', 'val')]
+    return {'dirs': dirs, 'moves': moves}
+
+
+def plan_cls_split(path: str, val_size: float, test_size: float, exclude: set = None) -> dict:
+    """
+    Plans the split of a classification dataset into training, validation and test sets without moving anything.
+    Classes are taken from the filename prefix before the first underscore.
+
+    Args:
+        path (str): The directory path containing the images.
+        val_size (float): The proportion of each class that goes into validation and test.
+        test_size (float): The proportion of those images that goes into test.
+        exclude (set): Image file names that are left out. Defaults to None.
+
+    Returns:
+        plan (dict): 'dirs' to create and 'moves' as [source, destination] pairs, relative to path.
+    """
+    classes = dict()
+    exclude = exclude or set()
+    for img in scan_files(path, IMAGE_EXTENSIONS):
+        if img in exclude:
+            continue
+        prefix = img.split('_')[0]
+        classes.setdefault(prefix, []).append(img)
+
+    moves, dirs = [], []
+    for key, imgs in classes.items():
+        train, tmp = train_test_split(imgs, test_size=val_size)
+        val, test = train_test_split(tmp, test_size=test_size)
+        for subset, files in [('train', train), ('val', val), ('test', test)]:
+            dirs.append(os.path.join(subset, key))
+            moves += [[img, os.path.join(subset, key, img)] for img in files]
+    return {'dirs': dirs, 'moves': moves}
+
+
+def _move(source: str, destination: str) -> None:
+    """Renames a file, falling back to copy and delete across file systems."""
+    try:
+        os.rename(source, destination)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(source, destination)
+
+
+def _write_journal(path: str, plan: dict) -> None:
+    journal = os.path.join(path, JOURNAL_NAME)
+    with open(journal + '.tmp', 'w') as file:
+        json.dump(plan, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(journal + '.tmp', journal) # the journal appears atomically
+
+
+def _run_moves(path: str, moves: list, workers: int) -> int:
+    """
+    Runs the moves in parallel, skipping those that are already done, and removes the journal afterwards.
+
+    Returns:
+        moved (int): Number of moved files.
+
+    Raises:
+        FileExistsError: If source and destination of a move both exist. The journal is kept, so the split
+            can be resumed or rolled back once the conflicts are resolved.
+    """
+    def move(pair):
+        source, destination = (os.path.join(path, p) for p in pair)
+        if not os.path.exists(source):
+            return 0, None # already moved
+        if os.path.exists(destination):
+            return 0, pair
+        _move(source, destination)
+        return 1, None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(move, moves))
+    conflicts = [pair for _, pair in results if pair is not None]
+    if conflicts:
+        raise FileExistsError(f'{len(conflicts)} files were not moved because their destination already exists, '
+                              f'e.g. {conflicts[0][0]} -> {conflicts[0][1]}. The split is unfinished.')
+    os.remove(os.path.join(path, JOURNAL_NAME))
+    return sum(n for n, _ in results)
+
+
+def execute_plan(path: str, plan: dict, workers: int = 8) -> int:
+    """
+    Executes a split plan. The plan is written to a journal first, so an interrupted split can be
+    resumed (resume_split) or rolled back (rollback_split). The journal is removed when the split is complete.
+
+    Args:
+        path (str): Dataset directory the plan is relative to.
+        plan (dict): Plan from plan_detect_split or plan_cls_split.
+        workers (int): Number of threads moving files. Defaults to 8.
+
+    Returns:
+        moved (int): Number of moved files.
+
+    Raises:
+        RuntimeError: If an unfinished split exists.
+        FileExistsError: If files could not be moved because their destination exists (see _run_moves).
+    """
+    if os.path.exists(os.path.join(path, JOURNAL_NAME)):
+        raise RuntimeError(f'An unfinished split exists in {path}. Use resume_split or rollback_split first.')
+
+    for d in plan['dirs']:
+        os.makedirs(os.path.join(path, d), exist_ok=True)
+    _write_journal(path, plan)
+    return _run_moves(path, plan['moves'], workers)
+
+
+def _read_journal(path: str) -> dict:
+    journal = os.path.join(path, JOURNAL_NAME)
+    if not os.path.exists(journal):
+        raise FileNotFoundError(f'No unfinished split found in {path}.')
+    with open(journal, 'r') as file:
+        return json.load(file)
+
+
+def resume_split(path: str, workers: int = 8) -> int:
+    """
+    Completes an interrupted split.
+
+    Args:
+        path (str): Dataset directory.
+        workers (int): Number of threads moving files. Defaults to 8.
+
+    Returns:
+        moved (int): Number of files moved now.
+
+    Raises:
+        FileNotFoundError: If there is no unfinished split.
+        FileExistsError: If files could not be moved because their destination exists.
+    """
+    plan = _read_journal(path)
+    for d in plan['dirs']:
+        os.makedirs(os.path.join(path, d), exist_ok=True)
+    moved = _run_moves(path, plan['moves'], workers)
+    print(f'Split resumed: {moved} files moved.')
+    return moved
+
+
+def rollback_split(path: str, workers: int = 8) -> int:
+    """
+    Moves the files of an interrupted split back to their original place.
+
+    Args:
+        path (str): Dataset directory.
+        workers (int): Number of threads moving files. Defaults to 8.
+
+    Returns:
+        moved (int): Number of files moved back.
+
+    Raises:
+        FileNotFoundError: If there is no unfinished split.
+        FileExistsError: If files could not be moved back because their original place is taken.
+    """
+    plan = _read_journal(path)
+    moved = _run_moves(path, [[dst, src] for src, dst in plan['moves']], workers)
+    print(f'Split rolled back: {moved} files moved back.')
+    return moved
+
+
+def manifest_path(path: str, name: str, subset: str) -> str:
+    """Returns the path of the manifest file listing the images of one subset of a split."""
+    return os.path.join(path, f'{name}_{subset}.txt')
+
+
+def write_manifests(path: str, plan: dict, name: str = 'split', append: bool = False) -> dict:
+    """
+    Writes a split of an object detection dataset as manifest files instead of moving the images.
+    Each manifest lists the images of one subset ('./images/<file>'), relative to the dataset folder,
+    and can be used directly as 'train'/'val' entry of config.yaml.
+
+    Args:
+        path (str): Dataset directory.
+        plan (dict): Plan from plan_detect_split.
+        name (str): Name of the split, used as prefix of the manifest files. Defaults to 'split'.
+        append (bool): If True, the files are added to existing manifests. Defaults to False.
+
+    Returns:
+        manifests (dict): Subset name -> manifest file.
+    """
+    subsets = dict()
+    for source, destination in plan['moves']:
+        folder, subset = destination.split(os.sep)[:2]
+        if folder == 'images':
+            subsets.setdefault(subset, []).append('./' + source.replace(os.sep, '/'))
+
+    manifests = dict()
+    for subset, files in subsets.items():
+        manifests[subset] = manifest_path(path, name, subset)
+        if append:
+            with open(manifests[subset], 'a') as file:
+                file.write('\n'.join(sorted(files)) + '\n')
+            continue
+        with open(manifests[subset] + '.tmp', 'w') as file:
+            file.write('\n'.join(sorted(files)) + '\n')
+        os.replace(manifests[subset] + '.tmp', manifests[subset])
+    return manifests
+
+
+def _link(source: str, destination: str) -> None:
+    """Creates a hardlink, falling back to a symlink (e.g. across file systems)."""
+    try:
+        os.link(source, destination)
+    except OSError:
+        os.symlink(os.path.abspath(source), destination)
+
+
+def link_split(path: str, plan: dict, name: str = 'split', workers: int = 8, append: bool = False) -> str:
+    """
+    Creates a split as a folder of links (splits/<name>/...) with the same layout the moved split would have.
+    The original files stay in place, so several splits can share one image pool.
+
+    Args:
+        path (str): Dataset directory.
+        plan (dict): Plan from plan_detect_split or plan_cls_split.
+        name (str): Name of the split. Defaults to 'split'.
+        workers (int): Number of threads creating links. Defaults to 8.
+        append (bool): If True, the links are added to an existing split folder. Defaults to False.
+
+    Returns:
+        split_dir (str): Folder of the split.
+    """
+    split_dir = os.path.join(path, SPLITS_DIR, name)
+    if os.path.isdir(split_dir) and not append:
+        shutil.rmtree(split_dir) # only removes the links, not the images
+    for d in plan['dirs']:
+        os.makedirs(os.path.join(split_dir, d), exist_ok=True)
+
+    def link(pair):
+        _link(os.path.join(path, pair[0]), os.path.join(split_dir, pair[1]))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(link, plan['moves']))
+    return split_dir
+
+
+def split_ratios(task: str, val_size: float, test_size: float = None) -> dict:
+    """Returns the target share of each subset, matching the two-stage split of plan_cls_split."""
+    if task == 'CLS':
+        return {'train': 1 - val_size, 'val': val_size * (1 - test_size), 'test': val_size * test_size}
+    return {'train': 1 - val_size, 'val': val_size}
+
+
+def load_split_index(path: str, split: str = 'split'):
+    """Loads the index of a split, None if it does not exist yet."""
+    index = os.path.join(path, INDEX_NAME.format(split))
+    if not os.path.exists(index):
+        return None
+    with open(index, 'r') as file:
+        return json.load(file)
+
+
+def save_split_index(path: str, index: dict, split: str = 'split') -> None:
+    """Saves the index of a split atomically."""
+    target = os.path.join(path, INDEX_NAME.format(split))
+    with open(target + '.tmp', 'w') as file:
+        json.dump(index, file)
+    os.replace(target + '.tmp', target)
+
+
+def assign_stratified(new_files: dict, counts: dict, ratios: dict) -> dict:
+    """
+    Assigns new files to subsets so that each class keeps the target ratios.
+
+    Every file goes to the subset that lies furthest below its target share of the class
+    (counting the files already assigned), so the ratios hold without re-splitting.
+
+    Args:
+        new_files (dict): Class -> list of new files.
+        counts (dict): Class -> {subset: number of files already assigned}.
+        ratios (dict): Subset -> target share.
+
+    Returns:
+        assignments (dict): File -> subset.
+    """
+    assignments = dict()
+    for cls, files in new_files.items():
+        count = {subset: counts.get(cls, {}).get(subset, 0) for subset in ratios}
+        for f in sorted(files):
+            total = sum(count.values()) + 1
+            subset = max(ratios, key=lambda s: ratios[s] * total - count[s])
+            count[subset] += 1
+            assignments[f] = subset
+    return assignments
@@ -0,0 +1,355 @@
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class StageStats:
+    """
+    Rolling FPS and latency counters for one stage of the inference pipeline.
+
+    Args:
+        name (str): Name of the stage (e.g. 'capture', 'inference', 'display').
+        window (int): Number of most recent samples used for the rolling values. Defaults to 120.
+    """
+
+    def __init__(self, name: str, window: int = 120):
+        self.name = name
+        self.count = 0
+        self.dropped = 0
+        self._stamps = deque(maxlen=window)
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        """Records one processed item together with its latency in seconds."""
+        with self._lock:
+            self.count += 1
+            self._stamps.append(time.perf_counter())
+            self._latencies.append(latency)
+
+    def drop(self, n: int = 1) -> None:
+        """Counts items that were discarded because a newer one was available."""
+        with self._lock:
+            self.dropped += n
+
+    @property
+    def fps(self) -> float:
+        with self._lock:
+            if len(self._stamps) < 2:
+                return 0.0
+            span = self._stamps[-1] - self._stamps[0]
+            return (len(self._stamps) - 1) / span if span > 0 else 0.0
+
+    @property
+    def latency_ms(self) -> float:
+        with self._lock:
+            if not self._latencies:
+                return 0.0
+            return 1000 * sum(self._latencies) / len(self._latencies)
+
+    def percentiles(self, qs: tuple = (50, 90, 99)) -> dict:
+        """Returns rolling latency percentiles in milliseconds, e.g. {'p50_ms': ..., 'p90_ms': ..., 'p99_ms': ...}."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return {f'p{q}_ms': 0.0 for q in qs}
+        return {f'p{q}_ms': round(1000 * latencies[min(len(latencies) - 1, len(latencies) * q // 100)], 2) for q in qs}
+
+    def summary(self) -> dict:
+        """Returns the current counters as a dictionary."""
+        return {'fps': round(self.fps, 1),
+                'latency_ms': round(self.latency_ms, 1),
+                **self.percentiles(),
+                'count': self.count,
+                'dropped': self.dropped}
+
+
+def put_latest(q: queue.Queue, item) -> bool:
+    """
+    Puts an item into a bounded queue without blocking, discarding the oldest item if the queue is full.
+
+    Args:
+        q (queue.Queue): Bounded queue.
+        item: Item to put into the queue.
+
+    Returns:
+        dropped (bool): True if an older item had to be discarded.
+    """
+    dropped = False
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped = True
+            except queue.Empty:
+                pass
+
+
+def _put_blocking(q: queue.Queue, item, stop: threading.Event) -> None:
+    """Puts an item into a bounded queue, waiting for space until stop is set."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def _capture_loop(cap, out_q: queue.Queue, stop: threading.Event, stats: StageStats, live: bool = True) -> None:
+    """
+    Reads frames and hands them to out_q. Live sources (cameras) keep only the newest frame,
+    other sources (video files) wait for the consumer so that no frame is lost.
+    """
+    frame_id = 0
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        success, frame = cap.read() # reading frame
+        if not success:
+            break
+        stats.record(time.perf_counter() - t0)
+        if not live:
+            _put_blocking(out_q, (frame_id, t0, frame), stop)
+        elif put_latest(out_q, (frame_id, t0, frame)):
+            stats.drop()
+        frame_id += 1
+    if live:
+        put_latest(out_q, None) # signal end of stream
+    else:
+        _put_blocking(out_q, None, stop)
+
+
+def _inference_loop(model, in_q: queue.Queue, out_q: queue.Queue, stop: threading.Event,
+                    stats: StageStats, verbose: bool) -> None:
+    """Runs the model on the newest captured frame and hands the results to the display stage."""
+    while not stop.is_set():
+        try:
+            item = in_q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is None:
+            break
+        frame_id, captured_at, frame = item
+        t0 = time.perf_counter()
+        results = model(frame, verbose=verbose)
+        stats.record(time.perf_counter() - t0)
+        if put_latest(out_q, (frame_id, captured_at, results)):
+            stats.drop()
+    put_latest(out_q, None)
+
+
+def print_stats(stats: list) -> None:
+    """Prints one line with the counters of each pipeline stage."""
+    print(' | '.join(f"{s.name}: {s.fps:5.1f} fps, {s.latency_ms:6.1f} ms, dropped {s.dropped}" for s in stats))
+
+
+def run_pipeline(cap,
+                 model,
+                 verbose: bool = False,
+                 window_name: str = "Model Prediction",
+                 queue_size: int = 1,
+                 report_every: float = 5.0,
+                 render: bool = True) -> dict:
+    """
+    Runs inference on a capturing device with separate capture, inference and display stages.
+
+    The capture thread only keeps the newest frame, the inference thread always works on the newest
+    captured frame and the display stage (main thread, as required by OpenCV's GUI) renders the newest
+    results. Stages are connected by bounded queues, so stale frames are dropped instead of adding latency.
+
+    Args:
+        cap (cv2.VideoCapture): Opened capturing device or video file.
+        model (.pt): Instance of YOLO-model that performs inference.
+        verbose (bool): Flag to decide whether model output is shown. Defaults to False.
+        window_name (str): Title of the display window. Defaults to "Model Prediction".
+        queue_size (int): Maximum number of items waiting between two stages. Defaults to 1.
+        report_every (float): Interval in seconds in which stage statistics are printed. 0 disables it. Defaults to 5.
+        render (bool): If False, results are neither drawn nor displayed (stop with Ctrl+C). Defaults to True.
+
+    Return:
+        stats (dict): Per-stage FPS, latency, processed and dropped counts. The 'display' stage latency
+            is the end-to-end latency from capture to display.
+
+    Raises:
+        None.
+    """
+    # keep the driver from buffering old frames
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    frame_q = queue.Queue(maxsize=queue_size)
+    result_q = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    capture_stats = StageStats('capture')
+    inference_stats = StageStats('inference')
+    display_stats = StageStats('display')
+
+    workers = [
+        threading.Thread(target=_capture_loop, args=(cap, frame_q, stop, capture_stats), daemon=True),
+        threading.Thread(target=_inference_loop, args=(model, frame_q, result_q, stop, inference_stats, verbose), daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+
+    last_report = time.perf_counter()
+    try:
+        while True:
+            try:
+                item = result_q.get(timeout=0.1)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    break
+                if cv2.waitKey(1) & 0xFF == ord("q"):
+                    break
+                continue
+            if item is None:
+                break
+
+            _, captured_at, results = item
+            if render:
+                result_image = results[0].plot()
+                if isinstance(result_image, np.ndarray):
+                    cv2.imshow(window_name, result_image) # display frame
+            display_stats.record(time.perf_counter() - captured_at)
+
+            if report_every and time.perf_counter() - last_report >= report_every:
+                print_stats([capture_stats, inference_stats, display_stats])
+                last_report = time.perf_counter()
+
+            # break out of loop by pressing q
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=2)
+
+    print_stats([capture_stats, inference_stats, display_stats])
+    return {s.name: s.summary() for s in (capture_stats, inference_stats, display_stats)}
+
+
+def _open_writer(path: str, cap, frame: np.ndarray):
+    """Opens a video writer for the annotated frames of a stream with the frame rate of its source."""
+    h, w = frame.shape[:2]
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    return cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+
+
+def run_streams(streams: list,
+                model,
+                verbose: bool = False,
+                batch_size: int = None,
+                queue_size: int = 2,
+                report_every: float = 5.0) -> dict:
+    """
+    Runs one model on several sources at once. Every source is read by its own thread, the main thread
+    collects the newest frame of each ready source into one batch per forward pass and hands each result
+    to the output of its stream.
+
+    Each stream is a dict with
+        'name' (str): Name of the stream, also the window title.
+        'cap' (cv2.VideoCapture): Opened capturing device or video file.
+        'live' (bool): True for cameras (stale frames are dropped), False for video files (every frame is processed).
+        'output': 'window' to display the annotated frames, a path (.mp4) to write them, a callable
+            output(name, frame_id, result) that gets the raw result (nothing is rendered), or None.
+
+    Args:
+        streams (list): Streams as described above.
+        model (.pt): Instance of YOLO-model that performs inference, called with a list of frames.
+        verbose (bool): Flag to decide whether model output is shown. Defaults to False.
+        batch_size (int): Maximum number of frames per forward pass. Defaults to None (one per stream).
+        queue_size (int): Maximum number of frames waiting per video file stream. Defaults to 2.
+        report_every (float): Interval in seconds in which statistics are printed. 0 disables it. Defaults to 5.
+
+    Return:
+        stats (dict): Per-stream FPS, end-to-end latency, processed and dropped counts and the
+            'inference' stage with the latency per forward pass.
+
+    Raises:
+        None.
+    """
+    batch_size = batch_size or len(streams)
+    stop = threading.Event()
+    inference_stats = StageStats('inference')
+    workers = []
+    for stream in streams:
+        if stream['live']:
+            stream['cap'].set(cv2.CAP_PROP_BUFFERSIZE, 1) # keep the driver from buffering old frames
+        stream['queue'] = queue.Queue(maxsize=1 if stream['live'] else queue_size)
+        stream['stats'] = StageStats(stream['name'])
+        stream['capture_stats'] = StageStats('capture')
+        stream['done'] = False
+        stream['writer'] = None
+        workers.append(threading.Thread(target=_capture_loop,
+                                        args=(stream['cap'], stream['queue'], stop, stream['capture_stats'],
+                                              stream['live']),
+                                        daemon=True))
+    for worker in workers:
+        worker.start()
+
+    show = any(stream['output'] == 'window' for stream in streams)
+    next_stream = 0
+    last_report = time.perf_counter()
+    try:
+        while not all(stream['done'] for stream in streams):
+            # take the newest frame of each ready stream, starting round robin so that no stream starves
+            batch = []
+            for i in range(len(streams)):
+                stream = streams[(next_stream + i) % len(streams)]
+                if stream['done'] or len(batch) >= batch_size:
+                    continue
+                try:
+                    item = stream['queue'].get_nowait()
+                except queue.Empty:
+                    continue
+                if item is None:
+                    stream['done'] = True
+                    continue
+                batch.append((stream, item))
+            next_stream = (next_stream + 1) % len(streams)
+
+            if batch:
+                t0 = time.perf_counter()
+                results = model([frame for _, (_, _, frame) in batch], verbose=verbose)
+                inference_stats.record(time.perf_counter() - t0)
+
+                for (stream, (frame_id, captured_at, frame)), result in zip(batch, results):
+                    output = stream['output']
+                    if callable(output):
+                        output(stream['name'], frame_id, result)
+                    elif output is not None:
+                        result_image = result.plot()
+                        if output == 'window':
+                            cv2.imshow(stream['name'], result_image) # display frame
+                        else:
+                            if stream['writer'] is None:
+                                stream['writer'] = _open_writer(output, stream['cap'], result_image)
+                            stream['writer'].write(result_image)
+                    stream['stats'].record(time.perf_counter() - captured_at)
+                    stream['stats'].dropped = stream['capture_stats'].dropped
+            elif not show:
+                time.sleep(0.002)
+
+            if report_every and time.perf_counter() - last_report >= report_every:
+                print_stats([inference_stats] + [stream['stats'] for stream in streams])
+                last_report = time.perf_counter()
+
+            # break out of loop by pressing q
+            if show and cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=2)
+        for stream in streams:
+            if stream['writer'] is not None:
+                stream['writer'].release()
+
+    all_stats = [inference_stats] + [stream['stats'] for stream in streams]
+    print_stats(all_stats)
+    return {s.name: s.summary() for s in all_stats}
@@ -0,0 +1,220 @@
+import csv
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from config import MODELS_DIR
+from run_index import RANK_METRICS, read_final_metrics
+
+MODEL_SIZES = ('n', 's', 'm', 'l', 'x')
+
+# folder below runs/ that holds the sweep runs and the comparison table
+SWEEP_DIR = 'sweep'
+
+RESULT_FIELDS = ['name', 'size', 'epochs', 'imgsz', 'metric', 'accuracy', 'latency_p50_ms', 'latency_p90_ms',
+                 'train_minutes', 'weights', 'error']
+
+
+def sweep_grid(sizes=('n', 's'), epochs=(30,), imgsz=(640,)) -> list:
+    """
+    Builds the runs of a sweep as the cross product of model sizes, epochs and image sizes.
+
+    Args:
+        sizes (tuple): Model sizes out of MODEL_SIZES. Defaults to ('n', 's').
+        epochs (tuple): Numbers of epochs. Defaults to (30,).
+        imgsz (tuple): Training and inference image sizes. Defaults to (640,).
+
+    Returns:
+        grid (list): One dict with 'size', 'epochs' and 'imgsz' per run.
+
+    Raises:
+        ValueError: If a model size is unknown.
+    """
+    unknown = set(sizes) - set(MODEL_SIZES)
+    if unknown:
+        raise ValueError(f'Unknown model sizes {sorted(unknown)}. Choose from {MODEL_SIZES}.')
+    return [{'size': s, 'epochs': e, 'imgsz': i} for s, e, i in itertools.product(sizes, epochs, imgsz)]
+
+
+def _pin(cores: list, threads: int) -> None:
+    """Pins the current process to its cores and limits torch to as many threads."""
+    if cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+
+
+def measure_latency(model, imgsz: int, frames: int = 30) -> dict:
+    """Returns p50/p90 CPU inference latency in milliseconds on random frames (after two warmup passes)."""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    latencies = []
+    for i in range(frames + 2):
+        t0 = time.perf_counter()
+        model(frame, imgsz=imgsz, verbose=False)
+        if i >= 2:
+            latencies.append(time.perf_counter() - t0)
+    p50, p90 = np.percentile(np.array(latencies) * 1000, [50, 90])
+    return {'latency_p50_ms': round(float(p50), 2), 'latency_p90_ms': round(float(p90), 2)}
+
+
+def _train_run(run: dict, weights: str, data_path: str, project: str, threads: int, slots) -> dict:
+    """Trains one run of the sweep in a worker process."""
+    cores = slots.get()
+    row = {'name': run['name'], 'size': run['size'], 'epochs': run['epochs'], 'imgsz': run['imgsz'], 'error': ''}
+    try:
+        _pin(cores, threads)
+        from ultralytics import YOLO
+
+        run_dir = os.path.join(project, run['name'])
+        best = os.path.join(run_dir, 'weights', 'best.pt')
+        results = os.path.join(run_dir, 'results.csv')
+        done = os.path.exists(best) and os.path.exists(results) and \
+            read_final_metrics(results).get('epoch', 0) >= run['epochs'] # epochs count from 1 in results.csv
+        # runs finished by an earlier sweep keep an empty training time
+        row['train_minutes'] = None
+        if not done:
+            start = time.perf_counter()
+            YOLO(weights).train(data=data_path, epochs=run['epochs'], imgsz=run['imgsz'], project=project,
+                                name=run['name'], exist_ok=True, device='cpu', workers=min(threads, 8),
+                                verbose=False, plots=False)
+            row['train_minutes'] = round((time.perf_counter() - start) / 60, 1)
+
+        metrics = read_final_metrics(results)
+        metric = next((m for m in RANK_METRICS if m in metrics), None)
+        row.update({'metric': metric, 'accuracy': metrics.get(metric), 'weights': best})
+    except Exception as e:
+        row['error'] = str(e)
+    finally:
+        slots.put(cores)
+    return row
+
+
+def _measure_runs(results: list, threads: int) -> None:
+    """
+    Measures the latency of all trained runs one after the other in this process, so that every run is
+    measured on an idle machine with the same number of threads.
+    """
+    import torch
+    from ultralytics import YOLO
+
+    previous = torch.get_num_threads()
+    torch.set_num_threads(threads)
+    try:
+        for row in results:
+            if row['error']:
+                continue
+            try:
+                row.update(measure_latency(YOLO(row['weights']), row['imgsz']))
+            except Exception as e:
+                row['error'] = str(e)
+            print(f"{row['name']}: " + (row['error'] or f"{row['latency_p50_ms']} ms"))
+    finally:
+        torch.set_num_threads(previous)
+
+
+def run_sweep(path: str,
+              task: str = 'DETECT',
+              sizes=('n', 's'),
+              epochs=(30,),
+              imgsz=(640,),
+              workers: int = None,
+              threads: int = None,
+              latency_threads: int = None,
+              latency_budget_ms: float = None) -> list:
+    """
+    Trains every combination of model size, epochs and image size on the config.yaml of a group without
+    any input() and compares accuracy against CPU inference latency.
+
+    Runs are spread over a process pool; every worker is pinned to its own cores and torch uses exactly
+    that many threads, so the machine is used fully without oversubscription. Finished runs are not
+    trained again, so an interrupted sweep can simply be started again. The latency of all runs is measured
+    afterwards, one run at a time, so that the runs are compared under the same load.
+
+    Args:
+        path (str): Group directory with config.yaml (see create_config).
+        task (str): 'CLS' or 'DETECT'. Defaults to 'DETECT'.
+        sizes (tuple): Model sizes out of MODEL_SIZES. Defaults to ('n', 's').
+        epochs (tuple): Numbers of epochs. Defaults to (30,).
+        imgsz (tuple): Image sizes. Defaults to (640,).
+        workers (int): Number of runs trained in parallel. Defaults to None (one per 4 cores, at most one per run).
+        threads (int): Threads per run. Defaults to None (cores / workers).
+        latency_threads (int): Threads used to measure the latency, as on the deployment machine. Defaults to
+            None (all cores).
+        latency_budget_ms (float): If given, the most accurate run within this p50 latency is recommended.
+            Defaults to None.
+
+    Returns:
+        results (list): One row per run (see RESULT_FIELDS), sorted by latency. The table is also saved to
+            runs/sweep/sweep_results.csv.
+
+    Raises:
+        FileNotFoundError: If config.yaml does not exist.
+    """
+    data_path = os.path.join(path, 'config.yaml')
+    if not os.path.exists(data_path):
+        raise FileNotFoundError(f'{data_path} does not exist, run create_config first.')
+    group = os.path.basename(os.path.normpath(path))
+    project = os.path.abspath(os.path.join(path, 'runs', SWEEP_DIR))
+    os.makedirs(project, exist_ok=True)
+
+    grid = sweep_grid(sizes, epochs, imgsz)
+    for run in grid:
+        run['name'] = f"{group}-{run['size']}-e{run['epochs']}-i{run['imgsz']}"
+    cpus = os.cpu_count() or 1
+    workers = workers or max(1, min(len(grid), cpus // 4))
+    threads = threads or max(1, cpus // workers)
+    suffix = '-cls' if task == 'CLS' else ''
+
+    # core sets of the workers; a run takes a free set and gives it back when it is done
+    manager = multiprocessing.Manager()
+    slots = manager.Queue()
+    for w in range(workers):
+        slots.put([c % cpus for c in range(w * threads, (w + 1) * threads)])
+
+    results = []
+    print(f'Sweep of {len(grid)} runs on {workers} workers with {threads} threads each.')
+    # spawn: every worker starts without torch loaded, so the thread limits take effect
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = [pool.submit(_train_run, run, os.path.join(MODELS_DIR, f"yolov8{run['size']}{suffix}.pt"),
+                               os.path.abspath(data_path), project, threads, slots) for run in grid]
+        for future in as_completed(futures):
+            row = future.result()
+            results.append(row)
+            print(f"Finished {row['name']}: " + (row['error'] or f"{row['metric']} {row['accuracy']}"))
+    manager.shutdown()
+
+    print(f'Measuring latency with {latency_threads or cpus} threads.')
+    _measure_runs(results, latency_threads or cpus)
+
+    results.sort(key=lambda r: (bool(r['error']), r.get('latency_p50_ms') or 0))
+    with open(os.path.join(project, 'sweep_results.csv'), 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    print_sweep(results, latency_budget_ms)
+    return results
+
+
+def print_sweep(results: list, latency_budget_ms: float = None) -> None:
+    """Prints the comparison table of run_sweep and the recommendation for a latency budget."""
+    print(f"{'run':32s} {'accuracy':>9s} {'p50 ms':>8s} {'p90 ms':>8s} {'train min':>10s}")
+    for r in results:
+        if r['error']:
+            print(f"{r['name']:32s} failed: {r['error']}")
+        else:
+            minutes = '' if r['train_minutes'] is None else f"{r['train_minutes']:.1f}"
+            print(f"{r['name']:32s} {r['accuracy'] or 0:9.4f} {r['latency_p50_ms']:8.1f} {r['latency_p90_ms']:8.1f} "
+                  f"{minutes:>10s}")
+    if latency_budget_ms is not None:
+        fitting = [r for r in results if not r['error'] and r['latency_p50_ms'] <= latency_budget_ms]
+        if fitting:
+            best = max(fitting, key=lambda r: r['accuracy'] or 0)
+            print(f"Best run within {latency_budget_ms} ms: {best['name']} ({best['weights']})")
+        else:
+            print(f'No run fits into {latency_budget_ms} ms.')
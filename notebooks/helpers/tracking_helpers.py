@@ -0,0 +1,269 @@
+import time
+
+import numpy as np
+
+# process noise relative to the box height (as in SORT/DeepSORT)
+STD_POSITION = 1 / 20
+STD_VELOCITY = 1 / 160
+
+# constant velocity model on (cx, cy, w, h) with one time step per frame
+F = np.eye(8)
+F[:4, 4:] = np.eye(4)
+H = np.eye(4, 8)
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Computes the IoU of every box in a with every box in b.
+
+    Args:
+        a (np.ndarray): Boxes of shape (n, 4) as x1, y1, x2, y2.
+        b (np.ndarray): Boxes of shape (m, 4) as x1, y1, x2, y2.
+
+    Returns:
+        iou (np.ndarray): Array of shape (n, m).
+    """
+    a, b = a[:, None, :], b[None, :, :]
+    w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = w * h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+def greedy_match(iou: np.ndarray, threshold: float):
+    """Pairs rows and columns by descending IoU. Returns matched (rows, cols) and unmatched rows and cols."""
+    rows, cols = [], []
+    if iou.size:
+        order = np.argsort(-iou, axis=None)
+        order = order[iou.ravel()[order] >= threshold]
+        used_r, used_c = np.zeros(iou.shape[0], bool), np.zeros(iou.shape[1], bool)
+        for r, c in zip(*np.unravel_index(order, iou.shape)):
+            if not used_r[r] and not used_c[c]:
+                used_r[r] = used_c[c] = True
+                rows.append(r)
+                cols.append(c)
+    rows, cols = np.array(rows, dtype=int), np.array(cols, dtype=int)
+    return rows, cols, np.setdiff1d(np.arange(iou.shape[0]), rows), np.setdiff1d(np.arange(iou.shape[1]), cols)
+
+
+def _xyxy_to_z(boxes: np.ndarray) -> np.ndarray:
+    return np.column_stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2,
+                            boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]])
+
+
+def _z_to_xyxy(z: np.ndarray) -> np.ndarray:
+    w, h = np.clip(z[:, 2], 0, None), np.clip(z[:, 3], 0, None)
+    return np.column_stack([z[:, 0] - w / 2, z[:, 1] - h / 2, z[:, 0] + w / 2, z[:, 1] + h / 2])
+
+
+class Tracker:
+    """
+    IoU tracker with a constant velocity Kalman filter per track. All tracks are kept in arrays, so prediction,
+    update and the IoU cost matrix are computed for all tracks at once.
+
+    Args:
+        iou_threshold (float): Minimum IoU between a predicted track and a detection of the same class. Defaults to 0.3.
+        max_age (int): Number of detector calls a track survives without a matching detection. Defaults to 5.
+        min_hits (int): Number of matched detections before a track is reported. Defaults to 3.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_age: int = 5, min_hits: int = 3):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.next_id = 1
+        self.finished = [] # confirmed tracks that ended: id, class, first and last seen
+        self.x = np.zeros((0, 8))
+        self.P = np.zeros((0, 8, 8))
+        self.ids = np.zeros(0, int)
+        self.cls = np.zeros(0, int)
+        self.conf = np.zeros(0)
+        self.hits = np.zeros(0, int)
+        self.misses = np.zeros(0, int)
+        self.first = np.zeros(0)
+        self.last = np.zeros(0)
+
+    def _noise(self, std: float) -> np.ndarray:
+        """Diagonal covariances scaled by the box height of each track."""
+        h = np.maximum(self.x[:, 3], 1.0)
+        return np.eye(8)[None] * (std * h)[:, None, None] ** 2
+
+    def predict(self) -> None:
+        """Moves all tracks one frame ahead."""
+        q = self._noise(STD_POSITION)
+        q[:, 4:, 4:] *= (STD_VELOCITY / STD_POSITION) ** 2
+        self.x = self.x @ F.T
+        self.P = F @ self.P @ F.T + q
+
+    def update(self, boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray, timestamp: float) -> None:
+        """
+        Matches the detections of a frame to the predicted tracks, corrects matched tracks, starts new tracks
+        and ends tracks that were missed too often. Call predict() for the frame first.
+
+        Args:
+            boxes (np.ndarray): Detected boxes of shape (n, 4) as x1, y1, x2, y2.
+            scores (np.ndarray): Confidences of shape (n,).
+            classes (np.ndarray): Class ids of shape (n,).
+            timestamp (float): Time of the frame in seconds.
+        """
+        iou = iou_matrix(_z_to_xyxy(self.x[:, :4]), boxes)
+        iou[self.cls[:, None] != classes[None, :]] = 0
+        rows, cols, lost, new = greedy_match(iou, self.iou_threshold)
+
+        if len(rows):
+            # Kalman update of all matched tracks at once
+            P, x = self.P[rows], self.x[rows]
+            S = H @ P @ H.T + self._noise(STD_POSITION)[rows][:, :4, :4]
+            K = P @ H.T @ np.linalg.inv(S)
+            y = _xyxy_to_z(boxes[cols]) - x[:, :4]
+            self.x[rows] = x + (K @ y[:, :, None])[:, :, 0]
+            self.P[rows] = (np.eye(8) - K @ H) @ P
+            self.conf[rows], self.hits[rows], self.misses[rows], self.last[rows] = scores[cols], self.hits[rows] + 1, 0, timestamp
+        self.misses[lost] += 1
+
+        ended = self.misses > self.max_age
+        for i in np.flatnonzero(ended & (self.hits >= self.min_hits)):
+            self.finished.append({'id': int(self.ids[i]), 'class': int(self.cls[i]),
+                                  'first': float(self.first[i]), 'last': float(self.last[i])})
+        self._keep(~ended)
+
+        if len(new):
+            z = _xyxy_to_z(boxes[new])
+            x = np.zeros((len(new), 8))
+            x[:, :4] = z
+            P = np.eye(8)[None] * (np.maximum(z[:, 3], 1.0) * STD_POSITION * 2)[:, None, None] ** 2
+            P[:, 4:, 4:] *= 25 # unknown velocity
+            self.x, self.P = np.concatenate([self.x, x]), np.concatenate([self.P, P])
+            self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + len(new))])
+            self.next_id += len(new)
+            self.cls = np.concatenate([self.cls, classes[new].astype(int)])
+            self.conf = np.concatenate([self.conf, scores[new]])
+            self.hits = np.concatenate([self.hits, np.ones(len(new), int)])
+            self.misses = np.concatenate([self.misses, np.zeros(len(new), int)])
+            self.first = np.concatenate([self.first, np.full(len(new), timestamp)])
+            self.last = np.concatenate([self.last, np.full(len(new), timestamp)])
+
+    def _keep(self, mask: np.ndarray) -> None:
+        for name in ('x', 'P', 'ids', 'cls', 'conf', 'hits', 'misses', 'first', 'last'):
+            setattr(self, name, getattr(self, name)[mask])
+
+    def tracks(self) -> np.ndarray:
+        """
+        Returns the confirmed tracks that were seen at the last detector call.
+
+        Returns:
+            tracks (np.ndarray): Array of shape (n, 7) as x1, y1, x2, y2, track id, confidence, class
+                (the layout of ultralytics tracking results).
+        """
+        mask = (self.hits >= self.min_hits) & (self.misses == 0)
+        return np.column_stack([_z_to_xyxy(self.x[mask, :4]), self.ids[mask], self.conf[mask], self.cls[mask]])
+
+    def counts(self) -> dict:
+        """Returns the number of confirmed tracks per class id."""
+        classes = self.tracks()[:, 6].astype(int)
+        return {int(c): int(n) for c, n in zip(*np.unique(classes, return_counts=True))}
+
+    def dwell_times(self, now: float = None) -> list:
+        """
+        Returns how long every confirmed track was visible, for ended and (with now) still active tracks.
+
+        Args:
+            now (float): Current timestamp; if given, active tracks are included. Defaults to None.
+
+        Returns:
+            dwell (list): Dicts with 'id', 'class', 'first', 'last' and 'seconds'.
+        """
+        tracks = list(self.finished)
+        if now is not None:
+            for i in np.flatnonzero(self.hits >= self.min_hits):
+                tracks.append({'id': int(self.ids[i]), 'class': int(self.cls[i]),
+                               'first': float(self.first[i]), 'last': float(self.last[i])})
+        return [dict(t, seconds=round(t['last'] - t['first'], 3)) for t in tracks]
+
+
+class TrackedInference:
+    """
+    Wraps a YOLO model with a Tracker so that detections keep stable ids across frames. The detector only runs
+    every detect_every frames; in between the tracks are moved by their Kalman prediction.
+
+    Instances are called like the model itself (results = tracked(frame)), so they can replace the model in
+    the inference loops. The returned boxes carry the track id (result.boxes.id), which plot() shows.
+
+    Args:
+        model (.pt): Instance of YOLO-model (or AdaptiveInference) that performs detection.
+        detect_every (int): Run the detector on every n-th frame. Defaults to 1.
+        tracker (Tracker): Tracker to use. Defaults to Tracker().
+        fps (float): Frame rate of a video file; timestamps are then frame times instead of wall clock. Defaults to None.
+        verbose (bool): Flag to decide whether model output is shown. Defaults to False.
+    """
+
+    def __init__(self,
+                 model,
+                 detect_every: int = 1,
+                 tracker: Tracker = None,
+                 fps: float = None,
+                 verbose: bool = False):
+        self.model = model
+        self.detect_every = max(1, detect_every)
+        self.tracker = tracker or Tracker()
+        self.fps = fps
+        self.verbose = verbose
+        self.frames = 0
+        self.detections = 0
+        self._last = None
+        self._start = None
+
+    def _timestamp(self) -> float:
+        return self.frames / self.fps if self.fps else time.time()
+
+    def __call__(self, frame: np.ndarray, verbose: bool = None):
+        verbose = self.verbose if verbose is None else verbose
+        if self._start is None:
+            self._start = time.perf_counter()
+        self.frames += 1
+        self.tracker.predict()
+
+        if self._last is None or (self.frames - 1) % self.detect_every == 0:
+            results = self.model(frame, verbose=verbose)
+            self.detections += 1
+            if results[0].boxes is None:
+                return results # classification results cannot be tracked
+            boxes = results[0].boxes
+            self.tracker.update(boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy(),
+                                self._timestamp())
+            self._last = results
+        # otherwise propagate: the tracks were moved on the current image
+
+        # the tracks go into a new result: the model's results stay raw detections, AdaptiveInference reuses them
+        result = self._last[0].new()
+        result.orig_img = frame
+        result.update(boxes=self.tracker.tracks().astype(np.float32))
+        return [result]
+
+    def counts(self, names: dict = None) -> dict:
+        """Returns the number of currently tracked objects per class (names instead of ids if given)."""
+        counts = self.tracker.counts()
+        names = names or (self._last[0].names if self._last else None)
+        return {names[c]: n for c, n in counts.items()} if names else counts
+
+    def summary(self) -> dict:
+        """Returns processed frames, detector calls, number of tracks and the mean dwell time per class."""
+        elapsed = time.perf_counter() - self._start if self._start else 0
+        dwell = self.tracker.dwell_times(now=self._timestamp())
+        names = self._last[0].names if self._last else {}
+        per_class = dict()
+        for t in dwell:
+            per_class.setdefault(names.get(t['class'], t['class']), []).append(t['seconds'])
+        return {'frames': self.frames,
+                'detections': self.detections,
+                'fps': round(self.frames / elapsed, 1) if elapsed > 0 else 0.0,
+                'tracks': len(dwell),
+                'active': self.counts(),
+                'mean_dwell_seconds': {c: round(float(np.mean(s)), 2) for c, s in per_class.items()}}
+
+    def print_summary(self) -> None:
+        s = self.summary()
+        print(f"Tracking: {s['frames']} frames, {s['detections']} detector calls ({s['fps']} frames/s), "
+              f"{s['tracks']} tracks, mean dwell time {s['mean_dwell_seconds']}")
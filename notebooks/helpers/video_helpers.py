@@ -0,0 +1,216 @@
+import csv
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+DETECTION_FIELDS = ['frame', 'class', 'name', 'confidence', 'x1', 'y1', 'x2', 'y2']
+
+
+def result_rows(frame_idx: int, result) -> list:
+    """
+    Converts the result of one frame into rows for the detections file.
+
+    Args:
+        frame_idx (int): Index of the frame in the video.
+        result: Single ultralytics result object (one element of model(...)).
+
+    Returns:
+        rows (list): One row per detected box. For classification models one row with the top-1 class and empty box.
+    """
+    names = result.names
+    if result.boxes is not None:
+        boxes = result.boxes
+        xyxy = boxes.xyxy.cpu().numpy()
+        cls = boxes.cls.cpu().numpy().astype(int)
+        conf = boxes.conf.cpu().numpy()
+        return [[frame_idx, c, names[c], round(float(p), 4), *(round(float(v), 1) for v in box)]
+                for c, p, box in zip(cls, conf, xyxy)]
+    if result.probs is not None:
+        c = int(result.probs.top1)
+        return [[frame_idx, c, names[c], round(float(result.probs.top1conf), 4), '', '', '', '']]
+    return []
+
+
+def _read_batches(cap, start: int, end: int, batch_size: int, out_q: queue.Queue) -> None:
+    """Decodes frames [start, end) on a separate thread and groups them into batches."""
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    batch, idx = [], start
+    while idx < end:
+        success, frame = cap.read() # reading frame
+        if not success:
+            break
+        batch.append(frame)
+        idx += 1
+        if len(batch) == batch_size:
+            out_q.put((idx - len(batch), batch))
+            batch = []
+    if batch:
+        out_q.put((idx - len(batch), batch))
+    out_q.put(None) # signal end of segment
+
+
+def _run_segment(model,
+                 video_path: str,
+                 start: int,
+                 end: int,
+                 batch_size: int,
+                 video_part: str = None,
+                 detections_part: str = None,
+                 verbose: bool = False) -> int:
+    """Runs batched inference on the frames [start, end) of a video and writes the segment outputs."""
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    batches = queue.Queue(maxsize=4) # bounded so the reader does not run ahead of the model
+    reader = threading.Thread(target=_read_batches, args=(cap, start, end, batch_size, batches), daemon=True)
+    reader.start()
+
+    writer, det_file, det_writer = None, None, None
+    if detections_part:
+        det_file = open(detections_part, 'w', newline='')
+        det_writer = csv.writer(det_file)
+
+    processed = 0
+    try:
+        while True:
+            item = batches.get()
+            if item is None:
+                break
+            first_idx, frames = item
+
+            # one forward pass for the whole batch
+            results = model(frames, verbose=verbose)
+
+            for offset, result in enumerate(results):
+                if det_writer:
+                    det_writer.writerows(result_rows(first_idx + offset, result))
+                if video_part:
+                    result_image = result.plot()
+                    if writer is None:
+                        h, w = result_image.shape[:2]
+                        writer = cv2.VideoWriter(video_part, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+                    writer.write(result_image)
+            processed += len(frames)
+    finally:
+        reader.join(timeout=1)
+        cap.release()
+        if writer is not None:
+            writer.release()
+        if det_file is not None:
+            det_file.close()
+    return processed
+
+
+def _run_segment_process(weights: str, task: str, threads: int, *args) -> int:
+    """Entry point of a pool worker: loads its own model copy and processes one segment."""
+    import torch
+    from ultralytics import YOLO
+
+    # pin the number of torch threads so that the workers do not oversubscribe the CPU
+    torch.set_num_threads(threads)
+    return _run_segment(YOLO(weights, task=task), *args)
+
+
+def _concat_videos(parts: list, output_path: str, fps: float) -> None:
+    """Concatenates the annotated segment videos into one output video."""
+    writer = None
+    for part in parts:
+        cap = cv2.VideoCapture(part)
+        while True:
+            success, frame = cap.read()
+            if not success:
+                break
+            if writer is None:
+                h, w = frame.shape[:2]
+                writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+            writer.write(frame)
+        cap.release()
+        os.remove(part)
+    if writer is not None:
+        writer.release()
+
+
+def _concat_detections(parts: list, detections_path: str) -> None:
+    """Concatenates the segment detection files and adds the header."""
+    with open(detections_path, 'w', newline='') as out:
+        csv.writer(out).writerow(DETECTION_FIELDS)
+        for part in parts:
+            with open(part, 'r') as f:
+                out.write(f.read())
+            os.remove(part)
+
+
+def process_video(video_path: str,
+                  model,
+                  output_path: str = None,
+                  detections_path: str = None,
+                  batch_size: int = 8,
+                  workers: int = 1,
+                  verbose: bool = False) -> dict:
+    """
+    Performs headless, batched inference on a video file.
+
+    Frames are decoded on a reader thread and passed to the model in batches. With workers > 1 the video
+    is split into contiguous segments that are processed by a pool of processes, each with its own model copy.
+
+    Args:
+        video_path (str): Path to the video file.
+        model (.pt): Instance of YOLO-model that performs inference.
+        output_path (str): Path of the annotated output video (.mp4). Defaults to None (no video).
+        detections_path (str): Path of the per-frame detections file (.csv). Defaults to None (no file).
+        batch_size (int): Number of frames per forward pass. Defaults to 8.
+        workers (int): Number of worker processes. Defaults to 1 (in-process).
+        verbose (bool): Flag to decide whether model output is shown. Defaults to False.
+
+    Returns:
+        summary (dict): Number of processed frames, elapsed seconds and achieved FPS.
+
+    Raises:
+        FileNotFoundError: If the video file does not exist.
+    """
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"The file '{video_path}' does not exist.")
+
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    cap.release()
+
+    # split the video into one contiguous segment per worker
+    # (streams without a frame count are processed in one segment until the end)
+    if total <= 0:
+        workers, total = 1, 2**31 - 1
+    workers = max(1, min(workers, total // batch_size or 1))
+    bounds = [round(i * total / workers) for i in range(workers + 1)]
+    video_parts = [f'{output_path}.part{i}.mp4' if output_path else None for i in range(workers)]
+    det_parts = [f'{detections_path}.part{i}' if detections_path else None for i in range(workers)]
+
+    start_time = time.perf_counter()
+    if workers == 1:
+        processed = _run_segment(model, video_path, 0, total, batch_size, video_parts[0], det_parts[0], verbose)
+    else:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        # spawn: workers start without the parent's torch thread pools, fork can deadlock on them
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(_run_segment_process, model.ckpt_path, model.task, threads, video_path,
+                                   bounds[i], bounds[i + 1], batch_size, video_parts[i], det_parts[i], verbose)
+                       for i in range(workers)]
+            processed = sum(f.result() for f in futures)
+
+    if output_path:
+        _concat_videos([p for p in video_parts if os.path.exists(p)], output_path, fps)
+        print(f'Annotated video saved at {output_path}')
+    if detections_path:
+        _concat_detections(det_parts, detections_path)
+        print(f'Detections saved at {detections_path}')
+
+    elapsed = time.perf_counter() - start_time
+    summary = {'frames': processed,
+               'seconds': round(elapsed, 2),
+               'fps': round(processed / elapsed, 1) if elapsed > 0 else 0.0}
+    print(f"Processed {summary['frames']} frames in {summary['seconds']} s ({summary['fps']} fps)")
+    return summary
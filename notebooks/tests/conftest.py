@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the helper modules import each other by module name (see helpers/__init__.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'helpers'))
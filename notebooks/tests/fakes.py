@@ -0,0 +1,57 @@
+import numpy as np
+
+
+class FakeTensor(np.ndarray):
+    """Array with the cpu()/numpy() calls of a torch tensor."""
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return np.asarray(self)
+
+
+class FakeBoxes:
+    """Boxes of an ultralytics result: data is x1, y1, x2, y2, [id,] confidence, class."""
+
+    def __init__(self, data):
+        data = np.asarray(data, dtype=np.float32).reshape(-1, np.shape(data)[-1] if np.size(data) else 6)
+        tracked = data.shape[1] == 7
+        self.data = data.view(FakeTensor)
+        self.xyxy = data[:, :4].view(FakeTensor)
+        self.conf = data[:, -2].view(FakeTensor)
+        self.cls = data[:, -1].view(FakeTensor)
+        self.id = data[:, 4].view(FakeTensor) if tracked else None
+
+    def __len__(self):
+        return len(self.data)
+
+
+class FakeResult:
+    """Result of an ultralytics detection model with the parts the helpers use."""
+
+    def __init__(self, data=(), orig_img=None, names=None):
+        self.boxes = FakeBoxes(data)
+        self.probs = None
+        self.orig_img = orig_img
+        self.names = names or {0: 'a', 3: 'd'}
+
+    def new(self):
+        return FakeResult(orig_img=self.orig_img, names=self.names)
+
+    def update(self, boxes=None):
+        self.boxes = FakeBoxes(boxes)
+
+
+class StubModel:
+    """Detection model that returns the same boxes for every frame and counts its calls."""
+
+    task = 'detect'
+
+    def __init__(self, data):
+        self.data = data
+        self.calls = 0
+
+    def __call__(self, frame, verbose=False, **kwargs):
+        self.calls += 1
+        return [FakeResult(self.data, orig_img=frame)]
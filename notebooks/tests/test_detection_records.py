@@ -0,0 +1,56 @@
+import cv2
+import numpy as np
+
+from detection_records import DetectionRecorder, NO_TRACK, load_detections
+from fakes import FakeResult
+
+
+def test_records_tracked_result(tmp_path):
+    recorder = DetectionRecorder(str(tmp_path))
+    recorder('cam', 5, FakeResult([[10, 10, 50, 50, 7, 0.9, 3]]), timestamp=1.5)
+    recorder.close()
+
+    records = load_detections(str(tmp_path))
+    assert records['frame'].tolist() == [5]
+    assert records['time'].tolist() == [1.5]
+    assert records['class'].tolist() == [3]
+    assert np.allclose(records['confidence'], [0.9])
+    assert records['track'].tolist() == [7]
+    assert [records[c][0] for c in ('x1', 'y1', 'x2', 'y2')] == [10, 10, 50, 50]
+
+
+def test_records_untracked_result(tmp_path):
+    recorder = DetectionRecorder(str(tmp_path))
+    recorder('cam', 0, FakeResult([[1, 2, 3, 4, 0.5, 0]]))
+    recorder.close()
+
+    records = load_detections(str(tmp_path))
+    assert records['class'].tolist() == [0]
+    assert np.allclose(records['confidence'], [0.5])
+    assert records['track'].tolist() == [NO_TRACK]
+
+
+def test_record_keeps_frame_index_and_time_of_the_capture(tmp_path):
+    video = str(tmp_path / 'video.avi')
+    writer = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+    for i in range(10):
+        writer.write(np.full((48, 64, 3), i * 20, np.uint8))
+    writer.release()
+
+    recorder = DetectionRecorder(str(tmp_path / 'records'))
+    cap = recorder.capture(cv2.VideoCapture(video), live=False)
+    predict = recorder.record(lambda frame, verbose=False: [FakeResult([[1, 2, 3, 4, 0.5, 0]])], 'video')
+    frame_id = 0
+    while True:
+        success, frame = cap.read()
+        if not success:
+            break
+        if frame_id % 3 == 0: # skipped frames must not shift the numbering
+            predict(frame)
+        frame_id += 1
+    cap.release()
+    recorder.close()
+
+    records = load_detections(str(tmp_path / 'records'))
+    assert records['frame'].tolist() == [0, 3, 6, 9]
+    assert np.allclose(records['time'], [0.0, 0.3, 0.6, 0.9])
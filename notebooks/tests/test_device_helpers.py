@@ -0,0 +1,73 @@
+import json
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import device_helpers
+
+
+@pytest.fixture
+def video(tmp_path):
+    """Short video file that stands in for a camera."""
+    path = str(tmp_path / 'camera.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+    for i in range(5):
+        writer.write(np.full((48, 64, 3), i * 40, np.uint8))
+    writer.release()
+    return path
+
+
+@pytest.fixture(autouse=True)
+def cache_path(tmp_path, monkeypatch):
+    path = str(tmp_path / 'device.json')
+    monkeypatch.setattr(device_helpers, 'CACHE_PATH', path)
+    return path
+
+
+def test_find_device_port_returns_the_probed_capture(video, monkeypatch):
+    opened = []
+    open_device = device_helpers.open_device
+    monkeypatch.setattr(device_helpers, 'open_device', lambda *args: opened.append(args[0]) or open_device(*args))
+
+    cap = device_helpers.find_device_port(video, candidates=[])
+    try:
+        assert cap.isOpened()
+        assert opened == [video] # opened once, not again after the probe
+        success, frame = cap.read()
+        assert success and frame.mean() < 20 # the video starts again at its first frame
+    finally:
+        cap.release()
+
+
+def test_cached_device_is_used_when_preferred_fails(video, cache_path, tmp_path):
+    with open(cache_path, 'w') as file:
+        json.dump({'device': video}, file)
+    assert device_helpers.discover_device(str(tmp_path / 'missing.avi'), candidates=[]) == video
+
+
+def test_working_device_is_cached(cache_path, monkeypatch):
+    monkeypatch.setattr(device_helpers, '_open_probe', lambda d, backend='any': cv2.VideoCapture() if d == 2 else None)
+    device_helpers.find_device_port(0, candidates=[0, 1, 2]).release()
+    with open(cache_path, 'r') as file:
+        assert json.load(file) == {'device': 2}
+
+
+def test_hung_device_only_costs_the_timeout(video, monkeypatch):
+    open_probe = device_helpers._open_probe
+
+    def probe(device, backend='any'):
+        if device == 'hung':
+            time.sleep(2)
+            return None
+        return open_probe(device, backend)
+
+    monkeypatch.setattr(device_helpers, '_open_probe', probe)
+    start = time.monotonic()
+    assert device_helpers.discover_device('hung', timeout=0.5, candidates=[video]) == video
+    assert time.monotonic() - start < 1.5
+
+    start = time.monotonic()
+    assert device_helpers.discover_device('hung', timeout=0.3, candidates=[]) is None
+    assert time.monotonic() - start < 1.0
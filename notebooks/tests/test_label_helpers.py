@@ -0,0 +1,52 @@
+import pytest
+
+from label_helpers import load_labels, validate_labels
+
+
+def write_dataset(path, labels, classes=('a', 'b')):
+    (path / 'labels').mkdir()
+    (path / 'classes.txt').write_text('\n'.join(classes) + '\n')
+    for name, content in labels.items():
+        (path / 'labels' / name).write_text(content)
+
+
+def codes(summary):
+    return sorted((file.rsplit('/', 1)[-1], line_no, code) for file, line_no, code, _ in summary['bad_rows'])
+
+
+def test_valid_labels(tmp_path):
+    write_dataset(tmp_path, {'x.txt': '0 0.5 0.5 0.2 0.2\n1 0.3 0.3 0.1 0.1\n', 'y.txt': ''})
+    summary = validate_labels(str(tmp_path), verbose=False)
+    assert summary['files'] == 2
+    assert summary['instances'] == 2
+    assert summary['empty_files'] == 1
+    assert summary['instances_per_class'] == {0: 1, 1: 1}
+    assert summary['bad_rows'] == [] and summary['malformed'] == []
+
+
+def test_bad_rows_carry_line_and_code(tmp_path):
+    write_dataset(tmp_path, {'x.txt': '0 0.5 0.5 0.2 0.2\n'
+                                      '5 0.5 0.5 0.2 0.2\n'
+                                      '1 0.95 0.5 0.2 0.2\n'
+                                      '0.5 0.5 0.5 0.2 0.2\n'
+                                      '0 0.5 0.5 0 0.2\n'})
+    summary = validate_labels(str(tmp_path), verbose=False)
+    assert codes(summary) == [('x.txt', 2, 'unknown_class'), ('x.txt', 3, 'box_outside'),
+                              ('x.txt', 4, 'class_not_integer'), ('x.txt', 5, 'size_not_positive')]
+
+
+@pytest.mark.parametrize('line', ['0 nan 0.5 0.1 0.1', '0 0.5 inf 0.1 0.1', 'nan 0.5 0.5 0.1 0.1'])
+def test_non_finite_rows_are_bad(tmp_path, line):
+    write_dataset(tmp_path, {'x.txt': '0 0.5 0.5 0.2 0.2\n' + line + '\n'})
+    summary = validate_labels(str(tmp_path), verbose=False)
+    assert ('x.txt', 2, 'not_finite') in codes(summary)
+    assert summary['instances_per_class'] == {0: 1, 1: 0}
+    assert sum(summary['size_histogram']) == 1
+
+
+def test_malformed_lines_keep_their_line_number(tmp_path):
+    write_dataset(tmp_path, {'x.txt': '0 0.5 0.5 0.2\n0 0.5 0.5 0.2 0.2\n0 a 0.5 0.2 0.2\n'})
+    files, labels, malformed, line_numbers = load_labels(str(tmp_path / 'labels'))
+    assert [(line_no, line) for _, line_no, line in malformed] == [(1, '0 0.5 0.5 0.2'), (3, '0 a 0.5 0.2 0.2')]
+    assert line_numbers.tolist() == [2]
+    assert labels.shape == (1, 6)
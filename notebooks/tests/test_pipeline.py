@@ -0,0 +1,93 @@
+import pytest
+
+import pipeline
+
+
+@pytest.fixture
+def group(tmp_path, monkeypatch):
+    """Group directory with stub stages that record their calls."""
+    path = tmp_path / 'gruppe1'
+    path.mkdir()
+    (path / 'image.jpg').write_bytes(b'jpg')
+    calls = []
+
+    def stage(name):
+        def run(task, group, path, params, context):
+            calls.append(name)
+            return {}
+        return run
+
+    monkeypatch.setattr(pipeline, 'set_metadata', lambda task, group: (group, str(path)))
+    for name in pipeline.STAGES:
+        monkeypatch.setitem(pipeline.STAGE_FUNCTIONS, name, stage(name))
+    return path, calls
+
+
+STAGES = {'capture': {'num_imgs': 1}, 'split': {'val_size': 0.2}, 'config': {}}
+
+
+def test_unchanged_stages_are_skipped_but_capture_runs(group):
+    path, calls = group
+    pipeline.run_group('DETECT', 'gruppe1', STAGES)
+    assert calls == ['capture', 'split', 'config']
+
+    calls.clear()
+    outputs = pipeline.run_group('DETECT', 'gruppe1', STAGES)
+    assert calls == ['capture']
+    assert outputs['split']['skipped'] and outputs['config']['skipped']
+    assert not outputs['capture']['skipped']
+
+
+def test_new_data_and_changed_parameters_rerun(group):
+    path, calls = group
+    pipeline.run_group('DETECT', 'gruppe1', STAGES)
+
+    calls.clear()
+    (path / 'new.jpg').write_bytes(b'jpg')
+    pipeline.run_group('DETECT', 'gruppe1', STAGES)
+    assert calls == ['capture', 'split', 'config']
+
+    calls.clear()
+    pipeline.run_group('DETECT', 'gruppe1', dict(STAGES, config={'validate': True}))
+    assert calls == ['capture', 'config']
+
+    calls.clear()
+    pipeline.run_group('DETECT', 'gruppe1', STAGES, force=True)
+    assert calls == ['capture', 'split', 'config']
+
+
+def test_failed_stage_continues_there(group, monkeypatch):
+    path, calls = group
+
+    def fail(*args):
+        raise RuntimeError('split failed')
+
+    monkeypatch.setitem(pipeline.STAGE_FUNCTIONS, 'split', fail)
+    with pytest.raises(RuntimeError):
+        pipeline.run_group('DETECT', 'gruppe1', {'split': {}, 'config': {}})
+    assert calls == []
+
+    monkeypatch.setitem(pipeline.STAGE_FUNCTIONS, 'split', lambda *args: calls.append('split') or {})
+    pipeline.run_group('DETECT', 'gruppe1', {'split': {}, 'config': {}})
+    assert calls == ['split', 'config']
+
+
+def test_load_job_normalizes_empty_overrides(tmp_path):
+    job_path = tmp_path / 'job.yaml'
+    job_path.write_text('task: DETECT\n'
+                        'groups:\n'
+                        '  gruppe1: {train: }\n'
+                        '  gruppe2:\n'
+                        'stages:\n'
+                        '  train: {epochs: 5}\n'
+                        '  export:\n')
+    job = pipeline.load_job(str(job_path))
+    assert job['groups'] == {'gruppe1': {'train': {}}, 'gruppe2': {}}
+    assert job['stages'] == {'train': {'epochs': 5}, 'export': {}}
+
+
+def test_load_job_rejects_unknown_stages(tmp_path):
+    job_path = tmp_path / 'job.yaml'
+    job_path.write_text('task: DETECT\ngroups: [gruppe1]\nstages:\n  deploy: {}\n')
+    with pytest.raises(ValueError):
+        pipeline.load_job(str(job_path))
@@ -0,0 +1,86 @@
+import os
+import time
+
+import pytest
+
+from run_index import INDEX_NAME, load_run_index, run_number, select_run, update_run_index
+
+
+def make_run(path, name, metric=None, epochs=1, weights=True):
+    run = path / 'runs' / name
+    (run / 'weights').mkdir(parents=True)
+    if weights:
+        (run / 'weights' / 'best.pt').write_bytes(b'pt')
+    if metric is not None:
+        rows = ''.join(f'{e},{metric}\n' for e in range(1, epochs + 1))
+        (run / 'results.csv').write_text('                  epoch,  metrics/mAP50-95(B)\n' + rows)
+    return run
+
+
+@pytest.fixture
+def group(tmp_path):
+    path = tmp_path / 'gruppe1'
+    make_run(path, 'gruppe1', 0.5)
+    make_run(path, 'gruppe12', 0.7)
+    make_run(path, 'gruppe13', 0.6)
+    return path
+
+
+def test_run_number_of_groups_ending_in_digits():
+    assert run_number('gruppe1', 'gruppe1') == 1
+    assert run_number('gruppe12', 'gruppe1') == 2
+    assert run_number('gruppe112', 'gruppe1') == 12
+    assert run_number('gruppe2', 'gruppe1') is None
+    assert run_number('other', 'gruppe1') is None
+
+
+def test_select_run_by_number_name_latest_and_best(group):
+    index = update_run_index(str(group))
+    assert select_run(index, 'gruppe1', run=1) == 'gruppe1'
+    assert select_run(index, 'gruppe1', run=2) == 'gruppe12'
+    assert select_run(index, 'gruppe1', run='gruppe12') == 'gruppe12'
+    with pytest.raises(ValueError):
+        select_run(index, 'gruppe1', run=12)
+    assert select_run(index, 'gruppe1') == 'gruppe13'
+    assert select_run(index, 'gruppe1', select='best') == 'gruppe12'
+    with pytest.raises(ValueError):
+        select_run(index, 'gruppe1', select='best', metric='metrics/accuracy_top1')
+
+
+def test_weights_are_absolute(group, monkeypatch):
+    monkeypatch.chdir(group.parent)
+    index = update_run_index('gruppe1')
+    weights = index['runs']['gruppe12']['weights']
+    assert os.path.isabs(weights) and os.path.exists(weights)
+
+
+def test_index_follows_new_changed_and_removed_runs(group):
+    update_run_index(str(group))
+    assert os.path.exists(group / 'runs' / INDEX_NAME)
+
+    make_run(group, 'gruppe14', 0.9, weights=False) # training still running, no weights yet
+    index = update_run_index(str(group))
+    assert select_run(index, 'gruppe1') == 'gruppe13'
+    assert select_run(index, 'gruppe1', select='best') == 'gruppe12'
+
+    (group / 'runs' / 'gruppe14' / 'weights' / 'best.pt').write_bytes(b'pt')
+    results = group / 'runs' / 'gruppe14' / 'results.csv'
+    results.write_text('epoch,metrics/mAP50-95(B)\n1,0.9\n2,0.95\n')
+    os.utime(results, (time.time() + 10, time.time() + 10))
+    index = update_run_index(str(group))
+    assert select_run(index, 'gruppe1') == 'gruppe14'
+    assert index['runs']['gruppe14']['metrics']['epoch'] == 2
+
+    for f in os.scandir(group / 'runs' / 'gruppe14' / 'weights'):
+        os.remove(f.path)
+    os.rmdir(group / 'runs' / 'gruppe14' / 'weights')
+    os.remove(results)
+    os.rmdir(group / 'runs' / 'gruppe14')
+    index = update_run_index(str(group))
+    assert 'gruppe14' not in index['runs']
+    assert load_run_index(str(group / 'runs')) == index
+
+
+def test_missing_runs_folder(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        update_run_index(str(tmp_path))
@@ -0,0 +1,129 @@
+import os
+
+import pytest
+
+from split_helpers import (JOURNAL_NAME, _move, _write_journal, assign_stratified, execute_plan, plan_cls_split,
+                           plan_detect_split, resume_split, rollback_split)
+
+
+def make_detect_dataset(path, n=10):
+    (path / 'images').mkdir()
+    (path / 'labels').mkdir()
+    for i in range(n):
+        (path / 'images' / f'img{i}.jpg').write_bytes(b'jpg')
+        (path / 'labels' / f'img{i}.txt').write_text('0 0.5 0.5 0.1 0.1\n')
+    return str(path)
+
+
+def files_below(path, folder):
+    return sorted(os.path.relpath(os.path.join(root, f), path)
+                  for root, _, names in os.walk(os.path.join(path, folder)) for f in names)
+
+
+def test_detect_plan_pairs_images_and_labels(tmp_path):
+    path = make_detect_dataset(tmp_path)
+    (tmp_path / 'images' / 'unlabeled.jpg').write_bytes(b'jpg')
+    plan = plan_detect_split(path, val_size=0.2, exclude={os.path.join('images', 'img0.jpg')})
+
+    destinations = dict(plan['moves'])
+    assert os.path.join('images', 'unlabeled.jpg') not in destinations
+    assert os.path.join('images', 'img0.jpg') not in destinations
+    assert len(destinations) == 18
+    for i in range(1, 10):
+        subset = destinations[os.path.join('images', f'img{i}.jpg')].split(os.sep)[1]
+        assert destinations[os.path.join('labels', f'img{i}.txt')] == os.path.join('labels', subset, f'img{i}.txt')
+    assert sum(d.startswith(os.path.join('images', 'val')) for d in destinations.values()) == 2
+    assert os.listdir(tmp_path / 'images') # nothing moved yet
+
+
+def test_cls_plan_splits_every_class(tmp_path):
+    for cls in ('cat', 'dog'):
+        for i in range(10):
+            (tmp_path / f'{cls}_{i}.jpg').write_bytes(b'jpg')
+    plan = plan_cls_split(str(tmp_path), val_size=0.4, test_size=0.5)
+    for cls in ('cat', 'dog'):
+        subsets = [d.split(os.sep)[0] for s, d in plan['moves'] if s.startswith(cls)]
+        assert sorted(set(subsets)) == ['test', 'train', 'val']
+        assert len(subsets) == 10
+
+
+def test_execute_plan_moves_all_and_removes_journal(tmp_path):
+    path = make_detect_dataset(tmp_path)
+    plan = plan_detect_split(path, val_size=0.2)
+    assert execute_plan(path, plan, workers=2) == 20
+    assert not os.path.exists(os.path.join(path, JOURNAL_NAME))
+    assert files_below(path, 'images') == sorted(d for _, d in plan['moves'] if d.startswith('images'))
+
+
+def interrupted_split(path, done=5):
+    plan = plan_detect_split(path, val_size=0.2)
+    for d in plan['dirs']:
+        os.makedirs(os.path.join(path, d), exist_ok=True)
+    _write_journal(path, plan)
+    for source, destination in plan['moves'][:done]:
+        _move(os.path.join(path, source), os.path.join(path, destination))
+    return plan
+
+
+def test_resume_split_completes_interrupted_split(tmp_path):
+    path = make_detect_dataset(tmp_path)
+    plan = interrupted_split(path)
+    with pytest.raises(RuntimeError):
+        execute_plan(path, plan)
+    assert resume_split(path, workers=2) == 15
+    assert not os.path.exists(os.path.join(path, JOURNAL_NAME))
+    assert all(os.path.exists(os.path.join(path, d)) for _, d in plan['moves'])
+
+
+def test_rollback_split_restores_original_places(tmp_path):
+    path = make_detect_dataset(tmp_path)
+    interrupted_split(path)
+    assert rollback_split(path, workers=2) == 5
+    assert files_below(path, 'images') == [os.path.join('images', f'img{i}.jpg') for i in range(10)]
+    with pytest.raises(FileNotFoundError):
+        resume_split(path)
+
+
+def test_conflicting_moves_keep_the_journal(tmp_path):
+    path = make_detect_dataset(tmp_path)
+    plan = interrupted_split(path, done=0)
+    source, destination = plan['moves'][0]
+    (tmp_path / destination).write_bytes(b'other')
+
+    with pytest.raises(FileExistsError):
+        resume_split(path)
+    assert os.path.exists(os.path.join(path, JOURNAL_NAME))
+    assert os.path.exists(os.path.join(path, source))
+
+    os.remove(os.path.join(path, destination))
+    assert resume_split(path) == 1
+    assert not os.path.exists(os.path.join(path, JOURNAL_NAME))
+
+
+def test_webp_images_are_split(tmp_path):
+    path = make_detect_dataset(tmp_path, n=4)
+    (tmp_path / 'images' / 'captured.webp').write_bytes(b'webp')
+    (tmp_path / 'labels' / 'captured.txt').write_text('0 0.5 0.5 0.1 0.1\n')
+    plan = plan_detect_split(path, val_size=0.2)
+    assert os.path.join('images', 'captured.webp') in dict(plan['moves'])
+
+
+def test_assign_stratified_keeps_the_ratios():
+    ratios = {'train': 0.8, 'val': 0.2}
+    new_files = {'cat': [f'cat_{i}.jpg' for i in range(10)], 'dog': [f'dog_{i}.jpg' for i in range(5)]}
+    assignments = assign_stratified(new_files, {'dog': {'train': 5, 'val': 0}}, ratios)
+
+    assert set(assignments) == {f for files in new_files.values() for f in files}
+    cats = [assignments[f] for f in new_files['cat']]
+    assert cats.count('train') == 8 and cats.count('val') == 2
+    # dog had no validation images yet, the new ones fill it up to 2 of 10
+    dogs = [assignments[f] for f in new_files['dog']]
+    assert dogs.count('val') == 2 and dogs.count('train') == 3
+
+
+def test_assign_stratified_is_deterministic():
+    ratios = {'train': 0.7, 'val': 0.2, 'test': 0.1}
+    files = {'a': [f'a_{i}.jpg' for i in range(20)]}
+    first = assign_stratified(files, {}, ratios)
+    assert assign_stratified({'a': list(reversed(files['a']))}, {}, ratios) == first
+    assert [first[f] for f in files['a']].count('test') == 2
@@ -0,0 +1,38 @@
+import numpy as np
+
+from motion_helpers import AdaptiveInference
+from tracking_helpers import TrackedInference, Tracker
+from fakes import StubModel
+
+DETECTION = [[100, 100, 200, 200, 0.9, 3]]
+
+
+def test_adaptive_results_stay_raw_detections():
+    model = StubModel(DETECTION)
+    adaptive = AdaptiveInference(model)
+    tracked = TrackedInference(adaptive, tracker=Tracker(min_hits=1))
+    frame = np.zeros((240, 320, 3), np.uint8)
+
+    for _ in range(10):
+        results = tracked(frame.copy())
+
+    # the static scene is inferred once, the reused result still holds the detection of the model
+    assert model.calls == 1
+    assert adaptive._last[0].boxes.data.tolist() == np.float32(DETECTION).tolist()
+    assert results[0] is not adaptive._last[0]
+    assert results[0].boxes.id.tolist() == [1]
+    assert results[0].boxes.cls.tolist() == [3]
+
+
+def test_tracks_expire_without_detections():
+    model = StubModel(DETECTION)
+    tracked = TrackedInference(model, tracker=Tracker(min_hits=1, max_age=2))
+    frame = np.zeros((240, 320, 3), np.uint8)
+
+    tracked(frame)
+    assert len(tracked(frame)[0].boxes) == 1
+    model.data = np.zeros((0, 6))
+    for _ in range(4):
+        results = tracked(frame)
+    assert len(results[0].boxes) == 0
+    assert [t['id'] for t in tracked.tracker.dwell_times()] == [1]